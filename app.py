@@ -1,25 +1,90 @@
+import os
 from flask import Flask
 from modelos.medico import inicializar_medicos
 from modelos.paciente import inicializar_pacientes
 from modelos.agenda_medico import inicializar_agenda_medicos
 from modelos.turno import importar_datos_turnos_desde_csv
+from modelos.bitacora_turnos import configurar_bitacora
+from modelos.persistencia import configurar_persistencia, instalar_volcado_al_terminar
+from modelos.repositorio import configurar_backend, usa_backend_csv
+from modelos.multiproceso import configurar_multiproceso, cerrojo_entre_procesos, registrar_firmas
+from modelos.generador_datos import configurar_datos_sinteticos
+from modelos.columnas_turnos import configurar_columnas_turnos
+from modelos.archivo_turnos import configurar_archivo_turnos
+from controladores.cache_respuestas import configurar_cache_respuestas
+from controladores.json_registros import ProveedorJSONRegistros
+from controladores.sincronizacion import instalar_sincronizacion
 from controladores.rutas_medicos import medicos_bp
 from controladores.rutas_pacientes import pacientes_bp
 from controladores.rutas_agenda_medico import agenda_medicos_bp
 from controladores.rutas_turnos import turnos_bp
+from controladores.rutas_analitica import analitica_bp
 
 app = Flask(__name__) #creamos una instancia de la clase Flask
 
-inicializar_medicos()
-inicializar_pacientes()
-inicializar_agenda_medicos()
-importar_datos_turnos_desde_csv()
+# Los modelos devuelven registros con __slots__; se pasan a JSON con la forma de siempre
+app.json = ProveedorJSONRegistros(app)
+
+# Política de fsync de la bitácora de turnos (siempre, periodica o nunca) y registros entre checkpoints
+configurar_bitacora(
+    politica=os.environ.get("API_BITACORA_FSYNC", "siempre"),
+    umbral=os.environ.get("API_BITACORA_CHECKPOINT", 1000)
+)
+# Segundos que se agrupan las escrituras antes de volcar los CSV en segundo plano
+configurar_persistencia(retardo=os.environ.get("API_RETARDO_VOLCADO", 0.5))
+
+# Con API_TURNOS_COLUMNAR=1 (y NumPy instalado) los turnos también se guardan en columnas
+# y las consultas por médico y por rango de fechas se resuelven con operaciones vectorizadas
+configurar_columnas_turnos(os.environ.get("API_TURNOS_COLUMNAR", "0").lower() in ("1", "true", "si"))
+
+# Con API_ARCHIVAR_TURNOS=1 los turnos de días pasados se mueven a segmentos mensuales de solo
+# lectura: la memoria y turnos.csv guardan solo los de hoy en adelante (solo con el backend csv)
+configurar_archivo_turnos(os.environ.get("API_ARCHIVAR_TURNOS", "0").lower() in ("1", "true", "si"))
+
+# Si faltan los CSV de médicos o pacientes, se generan localmente con una semilla
+# (API_DATOS_SINTETICOS=1, API_SEMILLA) en lugar de pedirlos a randomuser.me.
+# Va antes del backend: con sqlite, la base vacía se llena con esos CSV al configurarlo
+configurar_datos_sinteticos(
+    os.environ.get("API_DATOS_SINTETICOS", "0").lower() in ("1", "true", "si"),
+    semilla=os.environ.get("API_SEMILLA")
+)
+
+# Backend de almacenamiento: csv (listas en memoria respaldadas por CSV) o sqlite
+configurar_backend(
+    os.environ.get("API_BACKEND", "csv"),
+    ruta_sqlite=os.environ.get("API_SQLITE_RUTA")
+)
+
+# Con varios workers (API_MULTIPROCESO=1) cada proceso recarga lo que escriben los demás
+# y las escrituras se vuelcan enseguida bajo un cerrojo compartido entre procesos.
+# Con sqlite no hace falta: la base ya coordina a los procesos.
+if usa_backend_csv() and os.environ.get("API_MULTIPROCESO", "0").lower() in ("1", "true", "si"):
+    configurar_multiproceso(True)
+    configurar_persistencia(sincronico=True)
+    instalar_sincronizacion(app)
+
+# Con el backend csv los datos se cargan en memoria al iniciar
+if usa_backend_csv():
+    # Un solo proceso a la vez carga (y compacta la bitácora, si hace falta)
+    with cerrojo_entre_procesos():
+        inicializar_medicos()
+        inicializar_pacientes()
+        inicializar_agenda_medicos()
+        importar_datos_turnos_desde_csv()
+        registrar_firmas()
+
+# Megabytes de respuestas JSON ya serializadas que se guardan en memoria (0 la desactiva)
+configurar_cache_respuestas(os.environ.get("API_CACHE_RESPUESTAS_MB", 64))
+
+# Los cambios pendientes de volcar se escriben al terminar el proceso
+instalar_volcado_al_terminar()
 
 # registramos el blueprint
 app.register_blueprint(medicos_bp)
 app.register_blueprint(pacientes_bp)
 app.register_blueprint(agenda_medicos_bp)
 app.register_blueprint(turnos_bp)
+app.register_blueprint(analitica_bp)
 
 if __name__ == '__main__':
     app.run(debug=True) #iniciamos la aplicación
\ No newline at end of file
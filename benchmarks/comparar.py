@@ -0,0 +1,97 @@
+# -----------------------------------------------------------------
+# Comparación de dos corridas de la suite de benchmarks
+# -----------------------------------------------------------------
+# Compara caso por caso (y tamaño por tamaño) dos archivos JSON escritos por
+# benchmarks/suite.py e informa las regresiones: latencias o memoria que
+# crecieron, o throughput que bajó, más que el umbral. Termina con código 1
+# si hay alguna, para poder usarlo en integración continua.
+#
+# Uso: python -m benchmarks.comparar anterior.json actual.json [--umbral 0.2]
+
+import argparse
+import json
+import sys
+
+# Variables globales que usaremos en este módulo
+# métrica -> True si un valor mayor es peor
+metricas = {"ops_s": False, "p50_ms": True, "p99_ms": True, "memoria_pico_kb": True}
+metricas_tamanio = {"carga_inicial_s": True, "memoria_carga_mb": True}
+
+#----------------------------------------------------------------------------------------------
+
+# Cambio relativo de una métrica, positivo si empeoró; None si no se puede comparar
+def empeoramiento(anterior, actual, mayor_es_peor):
+    if anterior is None or actual is None or anterior <= 0:
+        return None
+    cambio = (actual - anterior) / anterior
+    return cambio if mayor_es_peor else -cambio
+
+#----------------------------------------------------------------------------------------------
+
+# Compara las métricas de dos diccionarios; devuelve (métrica, anterior, actual, empeoramiento)
+def comparar_metricas(anterior, actual, metricas_a_comparar):
+    filas = []
+    for metrica, mayor_es_peor in metricas_a_comparar.items():
+        cambio = empeoramiento(anterior.get(metrica), actual.get(metrica), mayor_es_peor)
+        if cambio is not None:
+            filas.append((metrica, anterior[metrica], actual[metrica], cambio))
+    return filas
+
+#----------------------------------------------------------------------------------------------
+
+# Compara dos corridas; devuelve una lista de (tamaño, caso, métrica, anterior, actual, empeoramiento)
+def comparar(anterior, actual):
+    filas = []
+    tamanios_anteriores = {tamanio["tamanio"]: tamanio for tamanio in anterior["tamanios"]}
+    for tamanio in actual["tamanios"]:
+        previo = tamanios_anteriores.get(tamanio["tamanio"])
+        if previo is None or "error" in tamanio or "error" in previo:
+            continue
+        for fila in comparar_metricas(previo, tamanio, metricas_tamanio):
+            filas.append((tamanio["tamanio"], "(carga)") + fila)
+        for nombre, caso in tamanio["casos"].items():
+            caso_previo = previo["casos"].get(nombre)
+            if caso_previo is None or "error" in caso or "error" in caso_previo:
+                continue
+            for fila in comparar_metricas(caso_previo, caso, metricas):
+                filas.append((tamanio["tamanio"], nombre) + fila)
+    return filas
+
+#----------------------------------------------------------------------------------------------
+
+# Punto de entrada de la línea de comandos
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Compara dos corridas de la suite de benchmarks")
+    parser.add_argument("anterior", help="JSON de la corrida de referencia")
+    parser.add_argument("actual", help="JSON de la corrida a revisar")
+    parser.add_argument("--umbral", type=float, default=0.2,
+                        help="Empeoramiento relativo a partir del cual hay regresión (0.2 = 20%%)")
+    parser.add_argument("--todo", action="store_true", help="Mostrar también las métricas sin regresión")
+    args = parser.parse_args(argumentos)
+
+    with open(args.anterior, encoding="utf-8") as archivo:
+        anterior = json.load(archivo)
+    with open(args.actual, encoding="utf-8") as archivo:
+        actual = json.load(archivo)
+    if anterior.get("backend") != actual.get("backend"):
+        print(f"Aviso: se comparan backends distintos ({anterior.get('backend')} y {actual.get('backend')})")
+
+    regresiones = 0
+    for tamanio, caso, metrica, valor_anterior, valor_actual, cambio in comparar(anterior, actual):
+        if cambio > args.umbral:
+            marca = "REGRESIÓN"
+            regresiones += 1
+        elif cambio < -args.umbral:
+            marca = "mejora"
+        elif args.todo:
+            marca = ""
+        else:
+            continue
+        print(f"{tamanio:<20} {caso:<42} {metrica:<16} {valor_anterior:>12} -> {valor_actual:<12} "
+              f"{cambio:+7.1%} {marca}")
+
+    print(f"{regresiones} regresiones con umbral {args.umbral:.0%}")
+    sys.exit(1 if regresiones else 0)
+
+if __name__ == '__main__':
+    main()
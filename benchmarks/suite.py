@@ -0,0 +1,435 @@
+# -----------------------------------------------------------------
+# Suite de benchmarks de los modelos y de las rutas de la API
+# -----------------------------------------------------------------
+# Para cada tamaño de datos (médicos:pacientes:turnos) se generan datos
+# sintéticos en un directorio temporal y, en un proceso nuevo, se mide la
+# carga inicial, cada función de los modelos y cada ruta de los blueprints
+# (con el cliente de prueba de Flask). Cada tamaño corre en su propio proceso
+# porque los modelos guardan las colecciones en variables globales.
+#
+# De cada caso se informa el throughput (llamadas por segundo), las latencias
+# p50 y p99 y el pico de memoria de una llamada (tracemalloc, durante el
+# calentamiento). Los resultados se guardan en JSON para comparar corridas
+# con benchmarks/comparar.py.
+#
+# Uso: python -m benchmarks.suite --salida resultados.json
+#          [--tamanios 100:1000:5000,1000:10000:50000] [--iteraciones 200] [--segundos 5]
+#          [--backend csv|sqlite] [--casos GET,crear_turno]
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # En Windows no hay resource; no se informa la memoria del proceso
+    resource = None
+
+# Variables globales que usaremos en este módulo
+tamanios_por_defecto = "100:1000:5000,1000:10000:50000,5000:100000:500000"
+directorio_proyecto = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#----------------------------------------------------------------------------------------------
+
+# Se lanza cuando un caso de escritura se queda sin datos de entrada (horarios libres, DNIs)
+class DatosAgotados(Exception):
+    pass
+
+#----------------------------------------------------------------------------------------------
+
+# Convierte 'medicos:pacientes:turnos' en una tupla de enteros
+def leer_tamanio(texto):
+    partes = texto.split(":")
+    if len(partes) != 3 or not all(parte.isdigit() for parte in partes):
+        raise argparse.ArgumentTypeError(f"Tamaño inválido: {texto}. Debe ser medicos:pacientes:turnos")
+    return tuple(int(parte) for parte in partes)
+
+#----------------------------------------------------------------------------------------------
+
+# Percentil por rango más cercano de una lista ya ordenada
+def percentil(ordenados, proporcion):
+    indice = max(0, math.ceil(proporcion * len(ordenados)) - 1)
+    return ordenados[min(indice, len(ordenados) - 1)]
+
+#----------------------------------------------------------------------------------------------
+
+# Máximo de memoria residente del proceso en MB, o None si no se puede saber
+def memoria_maxima_mb():
+    if resource is None:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB y macOS bytes
+    return round(maximo / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+#----------------------------------------------------------------------------------------------
+
+# Mide un caso: primero unas llamadas de calentamiento con tracemalloc (pico de memoria),
+# después hasta 'iteraciones' llamadas cronometradas o hasta agotar 'segundos'.
+# La función recibe el número de llamada; devolver False cuenta como error.
+# 'preparar', si está, se llama antes de cada llamada y no se cronometra
+def medir_caso(funcion, iteraciones, segundos, calentamiento, preparar=None):
+    errores = 0
+    pico = None
+    latencias = []
+    try:
+        tracemalloc.start()
+        try:
+            for llamada in range(calentamiento):
+                if preparar:
+                    preparar()
+                actual = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                if funcion(llamada) is False:
+                    errores += 1
+                pico = max(pico or 0, tracemalloc.get_traced_memory()[1] - actual)
+        finally:
+            tracemalloc.stop()
+
+        limite = time.perf_counter_ns() + int(segundos * 1e9)
+        for llamada in range(calentamiento, calentamiento + iteraciones):
+            if preparar:
+                preparar()
+            inicio = time.perf_counter_ns()
+            resultado = funcion(llamada)
+            fin = time.perf_counter_ns()
+            latencias.append(fin - inicio)
+            if resultado is False:
+                errores += 1
+            if fin > limite:
+                break
+    except DatosAgotados:
+        pass
+
+    if not latencias:
+        return {"llamadas": 0, "errores": errores, "error": "Sin datos suficientes para medir el caso"}
+    ordenadas = sorted(latencias)
+    return {
+        "llamadas": len(latencias),
+        "errores": errores,
+        "ops_s": round(len(latencias) / (sum(latencias) / 1e9), 1),
+        "p50_ms": round(percentil(ordenadas, 0.50) / 1e6, 4),
+        "p99_ms": round(percentil(ordenadas, 0.99) / 1e6, 4),
+        "memoria_pico_kb": None if pico is None else round(pico / 1024, 1)
+    }
+
+#----------------------------------------------------------------------------------------------
+
+# Elige un elemento de la lista según el número de llamada, repartido por toda la lista
+def elegir(lista, llamada):
+    return lista[(llamada * 7919) % len(lista)]
+
+#----------------------------------------------------------------------------------------------
+
+# Toma el elemento 'llamada' de una lista de entradas de un solo uso
+def tomar(lista, llamada):
+    if llamada >= len(lista):
+        raise DatosAgotados()
+    return lista[llamada]
+
+#----------------------------------------------------------------------------------------------
+
+# Caso de una ruta: hace la solicitud con el cliente de prueba; las respuestas 4xx y 5xx son errores
+def solicitud(cliente, metodo, armar_url, armar_json=None):
+    def llamar(llamada):
+        url = armar_url(llamada)
+        respuesta = cliente.open(url, method=metodo, json=armar_json(llamada) if armar_json else None)
+        respuesta.get_data()
+        return respuesta.status_code < 400
+    return llamar
+
+#----------------------------------------------------------------------------------------------
+
+# DNIs de 8 dígitos que ningún paciente usa, desde el más alto hacia abajo
+def dnis_libres(cantidad):
+    from modelos.paciente import obtener_paciente_por_dni
+    libres = []
+    dni = 99_999_999
+    while len(libres) < cantidad and dni >= 10_000_000:
+        if not obtener_paciente_por_dni(str(dni)):
+            libres.append(str(dni))
+        dni -= 1
+    return libres
+
+#----------------------------------------------------------------------------------------------
+
+# Horarios libres (id_medico, fecha, hora) de los médicos habilitados, sin contar hoy
+# para que ninguno pase a ser un horario vencido durante la corrida
+def horarios_libres(cantidad):
+    from modelos.medico import obtener_medicos
+    from modelos.disponibilidad import obtener_disponibilidad
+    hoy = datetime.now().strftime("%d-%m-%Y")
+    libres = []
+    for medico in obtener_medicos(habilitado=True):
+        for dia in obtener_disponibilidad(medico["id"]):
+            if dia["fecha"] != hoy:
+                libres.extend((medico["id"], dia["fecha"], hora) for hora in dia["horas"])
+        if len(libres) >= cantidad:
+            break
+    return libres[:cantidad]
+
+#----------------------------------------------------------------------------------------------
+
+# Datos de un paciente nuevo que pasan la validación de la API
+def datos_paciente(dni):
+    return {"dni": dni, "nombre": "Prueba", "apellido": "Benchmark", "telefono": "111222333",
+            "email": "prueba@benchmark.com", "dir_calle": "Calle", "dir_numero": "100"}
+
+#----------------------------------------------------------------------------------------------
+
+# Genera los casos a medir como (nombre, grupo, función, preparar). Es un generador: los datos
+# de entrada de las escrituras se arman recién cuando se llega a ellas, después de las lecturas
+def casos(aplicacion, args):
+    from modelos.medico import (obtener_medicos, obtener_medico_por_id, importar_datos_medicos_desde_csv,
+                                exportar_a_csv as exportar_medicos, ruta_archivo_medicos)
+    from modelos.paciente import (obtener_pacientes, obtener_paciente_por_id, obtener_paciente_por_dni, buscar_pacientes, crear_paciente,
+                                  crear_pacientes_en_lote, importar_datos_pacientes_desde_csv,
+                                  exportar_a_csv as exportar_pacientes, ruta_archivo_pacientes)
+    from modelos.agenda_medico import (obtener_agenda_medicos, obtener_agenda_medico_por_id, cargar_agenda_desde_archivo,
+                                       volcar_agenda, ruta_archivo_agenda)
+    from modelos.turno import (obtener_turno_por_id_medico, obtener_turno_pendiente_por_id, obtener_turno_por_paciente,
+                               obtener_turnos_por_rango, contar_turnos_por_medico, crear_turno, importar_datos_turnos_desde_csv, exportar_a_csv as exportar_turnos,
+                               ruta_archivo_turnos)
+    from modelos.disponibilidad import obtener_disponibilidad
+    from modelos.repositorio import usa_backend_csv
+    from modelos.instantanea import ruta_instantanea
+
+    cliente = aplicacion.test_client()
+    ids_medicos = [medico["id"] for medico in obtener_medicos()]
+    # Solo los habilitados tienen agenda y turnos
+    ids_habilitados = [medico["id"] for medico in obtener_medicos(habilitado=True)] or ids_medicos
+    pacientes = obtener_pacientes()
+    ids_pacientes = [paciente["id"] for paciente in pacientes]
+    dnis = [paciente["dni"] for paciente in pacientes]
+    # Búsquedas como las de recepción: las primeras letras del nombre y del apellido
+    busquedas = [f"{paciente['nombre'][:3]} {paciente['apellido'][:3]}" for paciente in pacientes[:1000]]
+    del pacientes
+    hoy = datetime.now().strftime("%d-%m-%Y")
+    en_30_dias = (datetime.now() + timedelta(days=30)).strftime("%d-%m-%Y")
+
+    # Lecturas de los modelos
+    yield "obtener_medicos", "modelos", lambda i: obtener_medicos(), None
+    yield "obtener_medicos (página de 100)", "modelos", lambda i: obtener_medicos(limite=100, despues_de=elegir(ids_medicos, i)), None
+    yield "obtener_medico_por_id", "modelos", lambda i: obtener_medico_por_id(elegir(ids_medicos, i)), None
+    yield "obtener_pacientes (página de 100)", "modelos", lambda i: obtener_pacientes(limite=100, despues_de=elegir(ids_pacientes, i)), None
+    yield "obtener_paciente_por_id", "modelos", lambda i: obtener_paciente_por_id(elegir(ids_pacientes, i)), None
+    yield "obtener_paciente_por_dni", "modelos", lambda i: obtener_paciente_por_dni(elegir(dnis, i)), None
+    yield "buscar_pacientes (página de 50)", "modelos", lambda i: buscar_pacientes(elegir(busquedas, i), 50), None
+    yield "obtener_agenda_medicos", "modelos", lambda i: obtener_agenda_medicos(), None
+    yield "obtener_agenda_medico_por_id", "modelos", lambda i: obtener_agenda_medico_por_id(elegir(ids_habilitados, i)), None
+    yield "obtener_turno_por_id_medico", "modelos", lambda i: obtener_turno_por_id_medico(elegir(ids_habilitados, i)), None
+    yield "obtener_turno_pendiente_por_id", "modelos", lambda i: obtener_turno_pendiente_por_id(elegir(ids_habilitados, i)), None
+    yield "obtener_turnos_por_rango (30 días)", "modelos", lambda i: obtener_turnos_por_rango(elegir(ids_habilitados, i), hoy, en_30_dias), None
+    yield "contar_turnos_por_medico (30 días)", "modelos", lambda i: contar_turnos_por_medico(hoy, en_30_dias), None
+    yield "obtener_turno_por_paciente", "modelos", lambda i: obtener_turno_por_paciente(elegir(ids_pacientes, i)), None
+    yield "obtener_disponibilidad", "modelos", lambda i: obtener_disponibilidad(elegir(ids_habilitados, i)), None
+
+    # Lecturas por las rutas
+    yield "GET /medicos", "rutas", solicitud(cliente, "GET", lambda i: "/medicos"), None
+    yield "GET /medicos/<id>", "rutas", solicitud(cliente, "GET", lambda i: f"/medicos/{elegir(ids_medicos, i)}"), None
+    yield "GET /pacientes?limite=100", "rutas", solicitud(cliente, "GET", lambda i: "/pacientes?limite=100"), None
+    yield "GET /pacientes/<id>", "rutas", solicitud(cliente, "GET", lambda i: f"/pacientes/{elegir(ids_pacientes, i)}"), None
+    yield "GET /pacientes/buscar", "rutas", solicitud(cliente, "GET", lambda i: f"/pacientes/buscar?q={elegir(busquedas, i)}"), None
+    yield "GET /agenda", "rutas", solicitud(cliente, "GET", lambda i: "/agenda"), None
+    yield "GET /agenda/<id>", "rutas", solicitud(cliente, "GET", lambda i: f"/agenda/{elegir(ids_habilitados, i)}"), None
+    yield "GET /turnos/<id>", "rutas", solicitud(cliente, "GET", lambda i: f"/turnos/{elegir(ids_habilitados, i)}"), None
+    yield "GET /turnos/pendientes/<id>", "rutas", solicitud(cliente, "GET", lambda i: f"/turnos/pendientes/{elegir(ids_habilitados, i)}"), None
+    yield "GET /turnos/disponibles/<id>", "rutas", solicitud(cliente, "GET", lambda i: f"/turnos/disponibles/{elegir(ids_habilitados, i)}"), None
+    yield "GET /analitica/ocupacion", "rutas", solicitud(cliente, "GET", lambda i: "/analitica/ocupacion"), None
+
+    # Importación y exportación de los CSV (solo con el backend csv)
+    if usa_backend_csv():
+        colecciones = [
+            ("medicos", ruta_archivo_medicos, exportar_medicos, importar_datos_medicos_desde_csv),
+            ("pacientes", ruta_archivo_pacientes, exportar_pacientes, importar_datos_pacientes_desde_csv),
+            ("agenda", ruta_archivo_agenda, volcar_agenda, cargar_agenda_desde_archivo),
+            ("turnos", ruta_archivo_turnos, exportar_turnos, importar_datos_turnos_desde_csv),
+        ]
+        for nombre, ruta, exportar, importar in colecciones:
+            yield f"exportar {nombre}", "csv", lambda i, exportar=exportar: exportar(), None
+            yield f"importar {nombre} (instantánea)", "csv", lambda i, importar=importar: importar(), None
+            # Sin instantánea se lee el CSV completo (y se vuelve a escribir la instantánea)
+            quitar = lambda ruta=ruta: os.path.exists(ruta_instantanea(ruta)) and os.remove(ruta_instantanea(ruta))
+            yield f"importar {nombre} (CSV)", "csv", lambda i, importar=importar: importar(), quitar
+
+    # Escrituras: cada llamada usa un DNI o un horario distinto, y cada turno un paciente nuevo
+    necesarios = args.calentamiento + args.iteraciones
+    dnis_nuevos = dnis_libres(2 * necesarios)
+    dnis_modelo, dnis_ruta = dnis_nuevos[:necesarios], dnis_nuevos[necesarios:]
+    yield "crear_paciente", "modelos", lambda i: crear_paciente(*datos_paciente(tomar(dnis_modelo, i)).values()), None
+    yield "POST /pacientes/", "rutas", solicitud(cliente, "POST", lambda i: "/pacientes/",
+                                                 lambda i: datos_paciente(tomar(dnis_ruta, i))), None
+
+    horarios = horarios_libres(2 * necesarios)
+    mitad = len(horarios) // 2
+    horarios_modelo, horarios_ruta = horarios[:mitad], horarios[mitad:]
+    dnis_turnos = dnis_libres(2 * mitad)
+    nuevos = crear_pacientes_en_lote([tuple(datos_paciente(dni).values()) for dni in dnis_turnos])
+    pacientes_modelo = [paciente["id"] for paciente in nuevos[:mitad]]
+    pacientes_ruta = [paciente["id"] for paciente in nuevos[mitad:]]
+
+    def crear_turno_libre(i):
+        id_medico, fecha, hora = tomar(horarios_modelo, i)
+        creado, _ = crear_turno(id_medico, pacientes_modelo[i], fecha, hora)
+        return creado
+    yield "crear_turno", "modelos", crear_turno_libre, None
+
+    def url_turno(i):
+        id_medico, _, _ = tomar(horarios_ruta, i)
+        return f"/turnos/{id_medico}/{pacientes_ruta[i]}"
+    def json_turno(i):
+        _, fecha, hora = horarios_ruta[i]
+        return {"fecha_turno": fecha, "hora_turno": hora}
+    yield "POST /turnos/<id_medico>/<id_paciente>", "rutas", solicitud(cliente, "POST", url_turno, json_turno), None
+
+#----------------------------------------------------------------------------------------------
+
+# Genera los CSV del tamaño pedido en las rutas que usa la API (dentro del directorio actual)
+def generar_datos(cantidad_medicos, cantidad_pacientes, cantidad_turnos, semilla):
+    from modelos.generador_datos import generar_archivos
+    from modelos.medico import ruta_archivo_medicos
+    from modelos.paciente import ruta_archivo_pacientes
+    from modelos.agenda_medico import ruta_archivo_agenda
+    from modelos.turno import ruta_archivo_turnos
+
+    rutas = {"medicos": ruta_archivo_medicos, "pacientes": ruta_archivo_pacientes,
+             "agenda": ruta_archivo_agenda, "turnos": ruta_archivo_turnos}
+    for ruta in rutas.values():
+        # En Windows 'modelos\\x.csv' es un subdirectorio; en Linux, un nombre de archivo
+        if os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    generar_archivos(rutas, cantidad_medicos, cantidad_pacientes, cantidad_turnos, semilla)
+
+#----------------------------------------------------------------------------------------------
+
+# Mide un tamaño de datos dentro del proceso actual (se ejecuta en el directorio temporal)
+def medir_tamanio(args):
+    cantidad_medicos, cantidad_pacientes, cantidad_turnos = args.medir
+    inicio = time.perf_counter()
+    generar_datos(cantidad_medicos, cantidad_pacientes, cantidad_turnos, args.semilla)
+    segundos_generacion = time.perf_counter() - inicio
+
+    # Carga inicial: lo que tarda en arrancar la API con estos datos
+    inicio = time.perf_counter()
+    from app import app
+    segundos_carga = time.perf_counter() - inicio
+    memoria_carga = memoria_maxima_mb()
+    print(f"Tamaño {cantidad_medicos}:{cantidad_pacientes}:{cantidad_turnos}: "
+          f"generación {segundos_generacion:.2f} s, carga {segundos_carga:.2f} s", flush=True)
+
+    resultados = {}
+    for nombre, grupo, funcion, preparar in casos(app, args):
+        if args.casos and not any(filtro in nombre for filtro in args.casos):
+            continue
+        try:
+            # Los mensajes que imprimen los modelos no se mezclan con los resultados
+            with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                resultado = medir_caso(funcion, args.iteraciones, args.segundos, args.calentamiento, preparar)
+        except Exception as e:
+            resultado = {"llamadas": 0, "errores": 1, "error": f"{type(e).__name__}: {e}"}
+        resultado["grupo"] = grupo
+        resultados[nombre] = resultado
+        imprimir_caso(nombre, resultado)
+
+    return {
+        "tamanio": f"{cantidad_medicos}:{cantidad_pacientes}:{cantidad_turnos}",
+        "medicos": cantidad_medicos,
+        "pacientes": cantidad_pacientes,
+        "turnos": cantidad_turnos,
+        "generacion_s": round(segundos_generacion, 3),
+        "carga_inicial_s": round(segundos_carga, 3),
+        "memoria_carga_mb": memoria_carga,
+        "memoria_pico_mb": memoria_maxima_mb(),
+        "casos": resultados
+    }
+
+#----------------------------------------------------------------------------------------------
+
+# Muestra una línea con el resultado de un caso
+def imprimir_caso(nombre, resultado):
+    if "error" in resultado:
+        print(f"  {nombre:<42} ERROR: {resultado['error']}", flush=True)
+        return
+    memoria = resultado["memoria_pico_kb"]
+    print(f"  {nombre:<42} {resultado['ops_s']:>11.1f} ops/s  p50 {resultado['p50_ms']:>9.3f} ms"
+          f"  p99 {resultado['p99_ms']:>9.3f} ms  mem {'-' if memoria is None else memoria:>9} KB"
+          f"{'  errores ' + str(resultado['errores']) if resultado['errores'] else ''}", flush=True)
+
+#----------------------------------------------------------------------------------------------
+
+# Ejecuta un tamaño en un proceso nuevo, en un directorio temporal, y devuelve sus resultados
+def ejecutar_tamanio(tamanio, args):
+    texto = ":".join(str(cantidad) for cantidad in tamanio)
+    with tempfile.TemporaryDirectory(prefix="benchmark_api_") as directorio:
+        archivo_resultado = os.path.join(directorio, "resultado.json")
+        entorno = dict(os.environ)
+        entorno["PYTHONPATH"] = os.pathsep.join(filter(None, [directorio_proyecto, entorno.get("PYTHONPATH")]))
+        entorno["API_BACKEND"] = args.backend
+        entorno["API_SQLITE_RUTA"] = os.path.join(directorio, "benchmark.db")
+        entorno["API_MULTIPROCESO"] = "0"
+        comando = [sys.executable, "-m", "benchmarks.suite", "--medir", texto,
+                   "--archivo-resultado", archivo_resultado, "--semilla", str(args.semilla),
+                   "--iteraciones", str(args.iteraciones), "--segundos", str(args.segundos),
+                   "--calentamiento", str(args.calentamiento)]
+        if args.casos:
+            comando += ["--casos", ",".join(args.casos)]
+        proceso = subprocess.run(comando, cwd=directorio, env=entorno)
+        if proceso.returncode != 0 or not os.path.exists(archivo_resultado):
+            return {"tamanio": texto, "error": f"El proceso terminó con código {proceso.returncode}", "casos": {}}
+        with open(archivo_resultado, encoding="utf-8") as archivo:
+            return json.load(archivo)
+
+#----------------------------------------------------------------------------------------------
+
+# Punto de entrada de la línea de comandos
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Mide los modelos y las rutas de la API con varios tamaños de datos")
+    parser.add_argument("--tamanios", default=tamanios_por_defecto,
+                        help="Tamaños separados por comas, cada uno medicos:pacientes:turnos")
+    parser.add_argument("--iteraciones", type=int, default=200, help="Llamadas cronometradas por caso")
+    parser.add_argument("--segundos", type=float, default=5.0, help="Tiempo máximo por caso")
+    parser.add_argument("--calentamiento", type=int, default=5, help="Llamadas previas por caso, con tracemalloc")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--backend", default=os.environ.get("API_BACKEND", "csv"), choices=["csv", "sqlite"])
+    parser.add_argument("--casos", type=lambda texto: [filtro for filtro in texto.split(",") if filtro],
+                        help="Solo los casos cuyo nombre contiene alguno de estos textos, separados por comas")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    # Usados por el proceso que mide cada tamaño
+    parser.add_argument("--medir", type=leer_tamanio, help=argparse.SUPPRESS)
+    parser.add_argument("--archivo-resultado", help=argparse.SUPPRESS)
+    args = parser.parse_args(argumentos)
+
+    if args.medir:
+        resultado = medir_tamanio(args)
+        with open(args.archivo_resultado, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False)
+        return
+
+    tamanios = [leer_tamanio(texto) for texto in args.tamanios.split(",") if texto]
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "procesadores": os.cpu_count(),
+        "backend": args.backend,
+        "iteraciones": args.iteraciones,
+        "segundos": args.segundos,
+        "calentamiento": args.calentamiento,
+        "semilla": args.semilla,
+        "tamanios": [ejecutar_tamanio(tamanio, args) for tamanio in tamanios]
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.salida}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# -----------------------------------------------------------------
+# Caché de respuestas serializadas
+# -----------------------------------------------------------------
+# Guarda el cuerpo JSON ya codificado de cada GET, por ruta y argumentos,
+# junto con la etiqueta (el ETag) de las versiones de datos con las que se
+# armó. Una entrada sirve solo mientras la etiqueta actual sea la misma; si
+# las versiones avanzaron se descarta. La memoria total de los cuerpos se
+# limita desalojando las entradas usadas hace más tiempo (LRU).
+
+from collections import OrderedDict
+import threading
+
+# Variables globales que usaremos en este módulo
+memoria_maxima = 64 * 1024 * 1024  # Bytes de cuerpos que se guardan como máximo
+respuestas = OrderedDict()          # (endpoint, ruta con argumentos) -> (etiqueta, estado, cuerpo, encabezados)
+memoria_usada = 0
+cerrojo_cache = threading.Lock()
+
+#----------------------------------------------------------------------------------------------
+
+# Configura la memoria máxima de la caché, en megabytes (0 la desactiva)
+def configurar_cache_respuestas(megabytes):
+    global memoria_maxima
+    memoria_maxima = int(float(megabytes) * 1024 * 1024)
+    with cerrojo_cache:
+        _desalojar()
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene (estado, cuerpo, encabezados) de una respuesta guardada con la misma etiqueta, o None
+def obtener_respuesta(clave, etiqueta):
+    with cerrojo_cache:
+        entrada = respuestas.get(clave)
+        if entrada is None:
+            return None
+        if entrada[0] != etiqueta:
+            # Los datos cambiaron desde que se guardó
+            _quitar(clave)
+            return None
+        respuestas.move_to_end(clave)
+        return entrada[1:]
+
+#----------------------------------------------------------------------------------------------
+
+# Guarda una respuesta serializada, desalojando las menos usadas si se supera la memoria máxima
+def guardar_respuesta(clave, etiqueta, estado, cuerpo, encabezados):
+    global memoria_usada
+    if len(cuerpo) > memoria_maxima:
+        return
+    with cerrojo_cache:
+        if clave in respuestas:
+            _quitar(clave)
+        respuestas[clave] = (etiqueta, estado, cuerpo, encabezados)
+        memoria_usada += len(cuerpo)
+        _desalojar()
+
+#----------------------------------------------------------------------------------------------
+
+# Vacía la caché
+def limpiar_cache_respuestas():
+    global memoria_usada
+    with cerrojo_cache:
+        respuestas.clear()
+        memoria_usada = 0
+
+#----------------------------------------------------------------------------------------------
+
+# Quita una entrada; se llama con el cerrojo tomado
+def _quitar(clave):
+    global memoria_usada
+    memoria_usada -= len(respuestas.pop(clave)[2])
+
+#----------------------------------------------------------------------------------------------
+
+# Desaloja las entradas usadas hace más tiempo hasta respetar la memoria máxima; se llama con el cerrojo tomado
+def _desalojar():
+    global memoria_usada
+    while respuestas and memoria_usada > memoria_maxima:
+        _, entrada = respuestas.popitem(last=False)
+        memoria_usada -= len(entrada[2])
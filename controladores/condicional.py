@@ -0,0 +1,64 @@
+# -----------------------------------------------------------------
+# GET condicionales con ETag / If-None-Match y caché de respuestas
+# -----------------------------------------------------------------
+# El ETag de una respuesta se arma con el token del proceso y las versiones
+# de las colecciones de las que depende. Si el cliente envía ese mismo ETag
+# en If-None-Match, se responde 304 sin consultar ni serializar los datos.
+# Si no, se busca el cuerpo ya serializado en la caché de respuestas, y
+# solo si no está (o quedó viejo) se ejecuta la función de la ruta.
+
+from flask import current_app, make_response, request
+from modelos.versiones import obtener_version
+from modelos import versiones
+from modelos.concurrencia import lectura
+from controladores.cache_respuestas import obtener_respuesta, guardar_respuesta
+from datetime import datetime
+import functools
+
+# Variables globales que usaremos en este módulo
+estados_cacheables = (200, 404)
+
+#----------------------------------------------------------------------------------------------
+
+# Calcula el ETag que corresponde a las versiones actuales de las colecciones indicadas.
+# Con por_minuto, incluye además el minuto actual (para respuestas que dependen de la hora)
+def calcular_etag(colecciones, por_minuto=False):
+    etag = versiones.token_proceso + "-" + "-".join(str(obtener_version(nombre)) for nombre in colecciones)
+    if por_minuto:
+        etag += "-" + datetime.now().strftime("%Y%m%d%H%M")
+    return etag
+
+#----------------------------------------------------------------------------------------------
+
+# Decorador para los GET cuya respuesta depende solo de las colecciones indicadas
+# (y del minuto actual, con por_minuto=True). La ruta se ejecuta y serializa con los
+# cerrojos de lectura de esas colecciones tomados.
+def condicional(*colecciones, por_minuto=False):
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltorio(*args, **kwargs):
+            # La versión se lee antes de armar la respuesta: si cambia mientras tanto,
+            # el ETag queda viejo y el próximo pedido recibe los datos nuevos
+            etag = calcular_etag(colecciones, por_minuto)
+            if etag in request.if_none_match:
+                respuesta = make_response("", 304)
+                respuesta.set_etag(etag)
+                return respuesta
+
+            clave = (request.endpoint, request.full_path)
+            guardada = obtener_respuesta(clave, etag)
+            if guardada is not None:
+                estado, cuerpo, encabezados = guardada
+                respuesta = current_app.response_class(cuerpo, status=estado, headers=encabezados)
+            else:
+                with lectura(*colecciones):
+                    respuesta = make_response(funcion(*args, **kwargs))
+                if respuesta.status_code in estados_cacheables:
+                    encabezados = [(nombre, valor) for nombre, valor in respuesta.headers if nombre != "Content-Length"]
+                    guardar_respuesta(clave, etag, respuesta.status_code, respuesta.get_data(), encabezados)
+
+            if respuesta.status_code == 200:
+                respuesta.set_etag(etag)
+            return respuesta
+        return envoltorio
+    return decorador
@@ -0,0 +1,60 @@
+# -----------------------------------------------------------------
+# Lectura incremental de archivos subidos para importaciones masivas
+# -----------------------------------------------------------------
+# El archivo se lee fila por fila desde el cuerpo de la solicitud, sin
+# cargarlo completo en memoria. Se aceptan CSV con encabezado o NDJSON
+# (un objeto JSON por línea), enviados como cuerpo o como archivo en un
+# formulario multipart.
+
+from flask import request
+import csv
+import io
+import json
+
+# Variables globales que usaremos en este módulo
+tipos_csv = ("text/csv", "application/csv")
+tipos_ndjson = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines")
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene el flujo binario del archivo subido y su formato ("csv" o "ndjson"), o (None, None) si no se reconoce
+def obtener_archivo_subido():
+    if request.mimetype == "multipart/form-data":
+        if not request.files:
+            return None, None
+        archivo = next(iter(request.files.values()))
+        nombre = (archivo.filename or "").lower()
+        if archivo.mimetype in tipos_ndjson or nombre.endswith((".ndjson", ".jsonl")):
+            return archivo.stream, "ndjson"
+        if archivo.mimetype in tipos_csv or nombre.endswith(".csv"):
+            return archivo.stream, "csv"
+        return None, None
+
+    if request.mimetype in tipos_ndjson:
+        return request.stream, "ndjson"
+    if request.mimetype in tipos_csv:
+        return request.stream, "csv"
+    return None, None
+
+#----------------------------------------------------------------------------------------------
+
+# Recorre las filas del archivo subido; por cada una devuelve (número de fila, datos, error de lectura)
+def leer_filas_subidas(flujo, formato):
+    texto = io.TextIOWrapper(flujo, encoding='utf-8-sig', newline='')
+    if formato == "ndjson":
+        for numero, linea in enumerate(texto, start=1):
+            if not linea.strip():
+                continue
+            try:
+                data = json.loads(linea)
+            except ValueError:
+                yield numero, None, "La línea no es un JSON válido"
+                continue
+            if not isinstance(data, dict):
+                yield numero, None, "Cada línea debe ser un objeto JSON"
+                continue
+            yield numero, data, None
+    else:
+        reader = csv.DictReader(texto)
+        for numero, data in enumerate(reader, start=1):
+            yield numero, data, None
@@ -0,0 +1,22 @@
+# -----------------------------------------------------------------
+# Serialización a JSON de los registros de las colecciones
+# -----------------------------------------------------------------
+# Los modelos guardan médicos, pacientes, agenda y turnos como registros
+# con __slots__ (ver modelos/registros.py). Recién al responder se pasan a
+# diccionario, con los mismos campos que antes, para que jsonify los
+# serialice igual que a los diccionarios.
+
+from flask.json.provider import DefaultJSONProvider
+from modelos.registros import Registro
+
+#----------------------------------------------------------------------------------------------
+
+# Proveedor JSON de Flask que además sabe serializar registros
+class ProveedorJSONRegistros(DefaultJSONProvider):
+
+    # Convierte los objetos que json no conoce; los registros pasan a diccionario
+    @staticmethod
+    def default(objeto):
+        if isinstance(objeto, Registro):
+            return objeto.a_dict()
+        return DefaultJSONProvider.default(objeto)
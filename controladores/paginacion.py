@@ -0,0 +1,58 @@
+# -----------------------------------------------------------------
+# Paginación por cursor para los listados
+# -----------------------------------------------------------------
+# Un listado se pagina pasando 'limite' en la query string. Si quedan más
+# elementos, la respuesta trae el encabezado X-Siguiente-Cursor, que se
+# envía como 'cursor' para pedir la página siguiente. El cursor es la clave
+# del último elemento devuelto, codificada; sigue siendo válido aunque se
+# agreguen o eliminen elementos entre una página y otra.
+
+from flask import jsonify, request
+import base64
+import json
+
+# Variables globales que usaremos en este módulo
+limite_maximo = 1000
+encabezado_cursor = "X-Siguiente-Cursor"
+
+#----------------------------------------------------------------------------------------------
+
+# Codifica la clave de un elemento como cursor opaco
+def codificar_cursor(clave):
+    return base64.urlsafe_b64encode(json.dumps(list(clave)).encode()).decode().rstrip("=")
+
+#----------------------------------------------------------------------------------------------
+
+# Decodifica un cursor con la cantidad de enteros indicada; lanza ValueError si no es válido
+def decodificar_cursor(cursor, cantidad):
+    try:
+        clave = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("El cursor no es válido")
+    if not (isinstance(clave, list) and len(clave) == cantidad and all(type(valor) is int for valor in clave)):
+        raise ValueError("El cursor no es válido")
+    return tuple(clave)
+
+#----------------------------------------------------------------------------------------------
+
+# Lee 'limite' y 'cursor' de la query string; devuelve (limite, clave del cursor) o lanza ValueError
+def leer_paginacion(cantidad_clave=1):
+    limite = request.args.get("limite")
+    if limite is not None:
+        if not (limite.isdigit() and 1 <= int(limite) <= limite_maximo):
+            raise ValueError(f"El valor de 'limite' debe ser un número entre 1 y {limite_maximo}")
+        limite = int(limite)
+
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        cursor = decodificar_cursor(cursor, cantidad_clave)
+    return limite, cursor
+
+#----------------------------------------------------------------------------------------------
+
+# Arma la respuesta de una página, agregando el cursor siguiente si la página está completa
+def responder_pagina(elementos, limite, clave):
+    respuesta = jsonify(elementos)
+    if limite is not None and len(elementos) == limite:
+        respuesta.headers[encabezado_cursor] = codificar_cursor(clave(elementos[-1]))
+    return respuesta
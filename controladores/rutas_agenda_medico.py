@@ -2,6 +2,8 @@ from datetime import datetime
 
 from flask import Blueprint, jsonify, request
 from modelos.agenda_medico import obtener_agenda_medicos,obtener_agenda_medico_por_id,crear_agenda_medico,eliminar_dia_agenda_medico_por_id,actualizar_agenda_por_dia,obtener_agenda_ordenada_medicos
+from controladores.paginacion import leer_paginacion, responder_pagina
+from controladores.condicional import condicional
 
 
 # Creamos el blueprint
@@ -9,20 +11,33 @@ agenda_medicos_bp = Blueprint('agenda', __name__)
 
 #-------------------------------------------------GET Agenda Completa -------------------------------------------------
 
+# Admite paginación con 'limite' y 'cursor' (ver controladores/paginacion.py)
+# y el filtro 'id_medico'
 @agenda_medicos_bp.route('/agenda', methods=['GET'])
+@condicional("agenda")
 def obtener_agenda_medicos_json():
     try:
+        limite, cursor = leer_paginacion(cantidad_clave=2)
+        id_medico = request.args.get("id_medico")
+        if id_medico is not None:
+            if not id_medico.isdigit():
+                return jsonify({"error": "El valor de 'id_medico' debe ser un número entero"}), 400
+            id_medico = int(id_medico)
+
         #obtener agenda
-        agenda = obtener_agenda_ordenada_medicos()
-        if not agenda:
+        agenda = obtener_agenda_ordenada_medicos(limite, cursor, id_medico)
+        if not agenda and cursor is None:
             return jsonify({"error":"No hay agendas medicas"}), 404
-        return jsonify(agenda), 200
+        return responder_pagina(agenda, limite, lambda horario: [horario["id_medico"], horario["dia_numero"]]), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error":f"Error en el servidor: {str(e)}"})
 
 #-------------------------------------------------GET Agenda por ID Medico -------------------------------------------------
 
 @agenda_medicos_bp.route('/agenda/<int:id_medico>', methods=["GET"])
+@condicional("agenda")
 def obtener_agenda_medico_por_id_json(id_medico):
     try:
         #obtener agenda por id
@@ -0,0 +1,75 @@
+from flask import Blueprint, jsonify, request
+from modelos.analitica import obtener_ocupacion, obtener_ocupacion_medico
+from modelos.medico import obtener_medico_por_id
+from modelos.disponibilidad import dias_ventana
+from controladores.condicional import condicional
+
+
+# Creamos el blueprint
+analitica_bp = Blueprint('analitica', __name__)
+
+#----------------------------------------------------------------------------------------------
+
+# Lee 'dias' de la query string (de 0 a la ventana de reserva); lanza ValueError si no es válido
+def leer_dias():
+    dias = request.args.get("dias")
+    if dias is None:
+        return dias_ventana
+    if not (dias.isdigit() and int(dias) <= dias_ventana):
+        raise ValueError(f"El valor de 'dias' debe ser un número entre 0 y {dias_ventana}")
+    return int(dias)
+
+#----------------------------------------------------------------------------------------------
+
+# Ocupación de todos los médicos con agenda: horarios de 15 minutos disponibles y reservados
+# por día, por día de la semana y por semana, de hoy a hoy + 'dias'
+@analitica_bp.route('/analitica/ocupacion', methods=["GET"])
+@condicional("agenda", "turnos", por_minuto=True)
+def obtener_ocupacion_json():
+    try:
+        ocupacion = obtener_ocupacion(leer_dias())
+        if not ocupacion["por_medico"]:
+            return jsonify({"error": "No hay agendas medicas"}), 404
+        return jsonify({"desde": ocupacion["desde"], "hasta": ocupacion["hasta"],
+                        "medicos": list(ocupacion["por_medico"].values())}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
+
+#----------------------------------------------------------------------------------------------
+
+# Ocupación de un médico
+@analitica_bp.route('/analitica/ocupacion/<int:id_medico>', methods=["GET"])
+@condicional("medicos", "agenda", "turnos", por_minuto=True)
+def obtener_ocupacion_medico_json(id_medico):
+    try:
+        medico = obtener_medico_por_id(id_medico)
+        if medico is None:
+            return jsonify({"error": "Médico no encontrado"}), 404
+
+        ocupacion = obtener_ocupacion_medico(id_medico, leer_dias())
+        if ocupacion is None:
+            return jsonify({"error": "El médico no tiene días de atención en la agenda"}), 404
+        return jsonify(ocupacion), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
+
+#----------------------------------------------------------------------------------------------
+
+# Ocupación de cada hora del día sumando a todos los médicos: muestra las horas más y menos pedidas.
+# Es demanda por hora, no ausencias: los turnos no registran si el paciente asistió
+@analitica_bp.route('/analitica/horas', methods=["GET"])
+@condicional("agenda", "turnos", por_minuto=True)
+def obtener_ocupacion_por_hora_json():
+    try:
+        ocupacion = obtener_ocupacion(leer_dias())
+        if not ocupacion["horas"]:
+            return jsonify({"error": "No hay agendas medicas"}), 404
+        return jsonify({"desde": ocupacion["desde"], "hasta": ocupacion["hasta"], "horas": ocupacion["horas"]}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
@@ -1,21 +1,81 @@
 from flask import Blueprint, jsonify, request
-from modelos.medico import obtener_medicos,obtener_medico_por_id,crear_medico,actualizar_medico_por_id
+from modelos.medico import obtener_medicos,obtener_medico_por_id,crear_medico,actualizar_medico_por_id,crear_medicos_en_lote
+from controladores.importacion import obtener_archivo_subido, leer_filas_subidas
+from controladores.paginacion import leer_paginacion, responder_pagina
+from controladores.condicional import condicional
 
 
 # Creamos el blueprint
 medicos_bp = Blueprint('medicos', __name__)
 
+#----------------------------------------Validación de Médicos-------------------------------------------
+
+# Valida los datos de un médico. Devuelve None si son válidos,
+# o el error y el código de estado a responder.
+def validar_datos_medico(data):
+    # Valida que se proporcionen todos los campos requeridos
+    campos_requeridos = ["dni", "nombre", "apellido", "matricula", "telefono", "email", "habilitado"]
+    for campo in campos_requeridos:
+        if campo not in data:
+            return {"error": f"Falta el campo '{campo}'"}, 400
+
+    # Valida que el DNI sea un número entero de 8 dígitos
+    dni = data["dni"]
+    if not (dni.isdigit() and len(dni) == 8):
+        return {"error": "El DNI debe ser un número entero de 8 dígitos"}, 400
+
+    # Valida que el nombre y el apellido no sean cadenas vacías y solo contengan letras
+    nombre = data["nombre"]
+    apellido = data["apellido"]
+    if not (nombre.isalpha() and apellido.isalpha()):
+        return {"error": "El nombre y el apellido deben contener solo letras y no estar vacíos"}, 400
+
+    # Valida que la matrícula tenga exactamente 6 dígitos
+    matricula = str(data["matricula"])
+    if not (matricula.isdigit() and len(matricula) == 6):
+        return {"error": "La matrícula debe ser un número entero de 6 dígitos"}, 400
+
+    # Valida que el teléfono tenga exactamente 9 dígitos
+    telefono = data["telefono"]
+    if not (telefono.isdigit() and len(telefono) == 9):
+        return {"error": "El teléfono debe ser un número entero de 9 dígitos"}, 400
+
+    # Valida que el email contenga al menos un '@'
+    email = data["email"]
+    if '@' not in email:
+        return {"error": "El email debe contener al menos un '@'"}, 400
+    
+    # Valida que 'habilitado' sea 'true' o 'false'
+    habilitado = data.get("habilitado", "true").lower()
+    if habilitado not in ["true", "false"]:
+        return {"error": "El valor de 'habilitado' debe ser 'True' o 'False'"}, 400
+
+    return None
+
 #---------------------------------------GET Medicos-----------------------------------------------------
 
+# Admite paginación con 'limite' y 'cursor' (ver controladores/paginacion.py)
+# y el filtro 'habilitado' ('true' o 'false')
 @medicos_bp.route('/medicos', methods=['GET'])
+@condicional("medicos")
 def obtener_medicos_json():
     try:
-        medicos = obtener_medicos()
+        limite, cursor = leer_paginacion()
+        habilitado = request.args.get("habilitado")
+        if habilitado is not None:
+            habilitado = habilitado.lower()
+            if habilitado not in ["true", "false"]:
+                return jsonify({"error": "El valor de 'habilitado' debe ser 'True' o 'False'"}), 400
+            habilitado = habilitado == "true"
 
-        if not medicos:
+        medicos = obtener_medicos(limite, None if cursor is None else cursor[0], habilitado)
+
+        if not medicos and cursor is None:
             return jsonify({"error": "No hay médicos disponibles"}), 404
 
-        return jsonify(medicos), 200
+        return responder_pagina(medicos, limite, lambda medico: [medico["id"]]), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
 
@@ -23,6 +83,7 @@ def obtener_medicos_json():
 #----------------------------------------GET Medico Por ID------------------------------------------------
 
 @medicos_bp.route('/medicos/<int:id_medico>', methods=["GET"])
+@condicional("medicos")
 def obtener_medico_por_id_json(id_medico):
     try:
         medico = obtener_medico_por_id(id_medico)
@@ -42,42 +103,19 @@ def crear_medico_json():
     try:
         data = request.get_json()
 
-        # Valida que se proporcionen todos los campos requeridos
-        campos_requeridos = ["dni", "nombre", "apellido", "matricula", "telefono", "email", "habilitado"]
-        for campo in campos_requeridos:
-            if campo not in data:
-                return jsonify({"error": f"Falta el campo '{campo}'"}), 400
+        # Valida los campos del médico
+        error = validar_datos_medico(data)
+        if error:
+            mensaje, codigo = error
+            return jsonify(mensaje), codigo
 
-        # Valida que el DNI sea un número entero de 10 dígitos
         dni = data["dni"]
-        if not (dni.isdigit() and len(dni) == 8):
-            return jsonify({"error": "El DNI debe ser un número entero de 8 dígitos"}), 400
-
-        # Valida que el nombre y el apellido no sean cadenas vacías y solo contengan letras
         nombre = data["nombre"]
         apellido = data["apellido"]
-        if not (nombre.isalpha() and apellido.isalpha()):
-            return jsonify({"error": "El nombre y el apellido deben contener solo letras y no estar vacíos"}), 400
-
-        # Valida que la matrícula tenga exactamente 6 dígitos
         matricula = str(data["matricula"])
-        if not (matricula.isdigit() and len(matricula) == 6):
-            return jsonify({"error": "La matrícula debe ser un número entero de 6 dígitos"}), 400
-
-        # Valida que el teléfono tenga exactamente 9 dígitos
         telefono = data["telefono"]
-        if not (telefono.isdigit() and len(telefono) == 9):
-            return jsonify({"error": "El teléfono debe ser un número entero de 9 dígitos"}), 400
-
-        # Valida que el email contenga al menos un '@'
         email = data["email"]
-        if '@' not in email:
-            return jsonify({"error": "El email debe contener al menos un '@'"}), 400
-        
-        # Valida que el email sea válido
         habilitado = data.get("habilitado", "true").lower()
-        if habilitado not in ["true", "false"]:
-            return jsonify({"error": "El valor de 'habilitado' debe ser 'True' o 'False'"}), 400
 
         # Valida que no exista el medico
         medicos_existentes = obtener_medicos()
@@ -97,6 +135,59 @@ def crear_medico_json():
         return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
 
 
+#-----------------------------------------Importación de Médicos--------------------------------------------
+
+# Importa médicos desde un archivo CSV o NDJSON, leyéndolo fila por fila.
+# Las filas válidas se crean todas juntas; las inválidas se informan con su número de fila.
+@medicos_bp.route('/medicos/importar', methods=["POST"])
+def importar_medicos_json():
+    try:
+        flujo, formato = obtener_archivo_subido()
+        if flujo is None:
+            return jsonify({"error": "El archivo debe ser CSV (text/csv) o NDJSON (application/x-ndjson)"}), 415
+
+        # Claves de los médicos existentes, para no recorrer la lista por cada fila
+        dnis = set()
+        matriculas = set()
+        nombres = set()
+        for medico_existente in obtener_medicos():
+            dnis.add(medico_existente["dni"])
+            matriculas.add(str(medico_existente["matricula"]))
+            nombres.add((medico_existente["nombre"].lower(), medico_existente["apellido"].lower()))
+
+        datos_medicos = []
+        errores = []
+        for fila, data, error in leer_filas_subidas(flujo, formato):
+            if error is None:
+                try:
+                    error = validar_datos_medico(data)
+                except (AttributeError, TypeError):
+                    error = {"error": "Los campos deben ser texto"}, 400
+                if error:
+                    error = error[0]["error"]
+            if error is None:
+                matricula = str(data["matricula"])
+                nombre_completo = (data["nombre"].lower(), data["apellido"].lower())
+                if data["dni"] in dnis or matricula in matriculas or nombre_completo in nombres:
+                    error = "Ya existe un médico con el mismo DNI, matrícula, nombre o apellido"
+            if error:
+                errores.append({"fila": fila, "error": error})
+                continue
+
+            dnis.add(data["dni"])
+            matriculas.add(matricula)
+            nombres.add(nombre_completo)
+            datos_medicos.append((data["dni"], data["nombre"], data["apellido"], matricula,
+                                  data["telefono"], data["email"], data["habilitado"].lower()))
+
+        medicos_creados = crear_medicos_en_lote(datos_medicos)
+        return jsonify({"creados": len(medicos_creados), "errores": errores}), 201 if medicos_creados else 200
+
+    except UnicodeDecodeError:
+        return jsonify({"error": "El archivo debe estar codificado en UTF-8"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
+
     
 #-------------------------------------------PUT Medico---------------------------------------------------
 
@@ -109,42 +200,19 @@ def actualizar_medico_json(id_medico):
         if not medico_existente:
             return jsonify({"error": "Médico no encontrado"}), 404
 
-        # Valida que se proporcionen todos los campos requeridos
-        campos_requeridos = ["dni", "nombre", "apellido", "matricula", "telefono", "email", "habilitado"]
-        for campo in campos_requeridos:
-            if campo not in data:
-                return jsonify({"error": f"Falta el campo '{campo}'"}), 400
+        # Valida los campos del médico
+        error = validar_datos_medico(data)
+        if error:
+            mensaje, codigo = error
+            return jsonify(mensaje), codigo
 
-        # Valida que el DNI sea un número entero de 8 dígitos
         dni = data["dni"]
-        if not (dni.isdigit() and len(dni) == 8):
-            return jsonify({"error": "El DNI debe ser un número entero de 8 dígitos"}), 400
-
-        # Valida que el nombre y el apellido no sean cadenas vacías y solo contengan letras
         nombre = data["nombre"]
         apellido = data["apellido"]
-        if not (nombre.isalpha() and apellido.isalpha()):
-            return jsonify({"error": "El nombre y el apellido deben contener solo letras y no estar vacíos"}), 400
-
-        # Valida que la matrícula tenga exactamente 6 dígitos
         matricula = str(data["matricula"])
-        if not (matricula.isdigit() and len(matricula) == 6):
-            return jsonify({"error": "La matrícula debe ser un número entero de 6 dígitos"}), 400
-
-        # Valida que el teléfono tenga exactamente 9 dígitos
         telefono = data["telefono"]
-        if not (telefono.isdigit() and len(telefono) == 9):
-            return jsonify({"error": "El teléfono debe ser un número entero de 9 dígitos"}), 400
-
-        # Valida que el email contenga al menos un '@'
         email = data["email"]
-        if '@' not in email:
-            return jsonify({"error": "El email debe contener al menos un '@'"}), 400
-        
-        # Valida que el email sea válido
         habilitado = data.get("habilitado", "true").lower()
-        if habilitado not in ["true", "false"]:
-            return jsonify({"error": "El valor de 'habilitado' debe ser 'True' o 'False'"}), 400
 
         # Valida que no exista el medico
         medicos_existentes = obtener_medicos()
@@ -1,28 +1,111 @@
 from flask import Blueprint, jsonify, request
-from modelos.paciente import obtener_pacientes,obtener_paciente_por_id,crear_paciente,actualizar_paciente_por_id,eliminar_paciente_por_id,obtener_paciente_por_dni
+from modelos.paciente import obtener_pacientes,obtener_paciente_por_id,crear_paciente,actualizar_paciente_por_id,eliminar_paciente_por_id,obtener_paciente_por_dni,crear_pacientes_en_lote,buscar_pacientes
 from modelos.turno import obtener_turno_por_paciente
+from controladores.importacion import obtener_archivo_subido, leer_filas_subidas
+from controladores.paginacion import leer_paginacion, responder_pagina
+from controladores.condicional import condicional
 
 # Creamos el blueprint
 pacientes_bp = Blueprint('pacientes', __name__)
 
+# Resultados por página de la búsqueda cuando no se indica 'limite'
+limite_busqueda = 50
+
+#-------------------------------------Validación de Pacientes-----------------------------------------------
+
+# Valida los datos de un paciente. Devuelve None si son válidos,
+# o el error y el código de estado a responder.
+def validar_datos_paciente(data):
+    # Valida que se proporcionen todos los campos requeridos
+    campos_requeridos = ["dni", "nombre", "apellido", "telefono", "email", "dir_calle", "dir_numero"]
+    for campo in campos_requeridos:
+        if campo not in data:
+            return {"error": f"Falta el campo '{campo}'"}, 400
+
+    # Valida que el DNI sea un número entero de 10 dígitos
+    dni = data["dni"]
+    if not (dni.isdigit() and len(dni) == 8):
+        return {"error": "El DNI debe ser un número entero de 8 dígitos"}, 400
+
+    # Valida que el nombre y el apellido no sean cadenas vacías y solo contengan letras
+    nombre = data["nombre"]
+    apellido = data["apellido"]
+    if not (nombre.isalpha() and apellido.isalpha()):
+        return {"error": "El nombre y el apellido deben contener solo letras y no estar vacíos"}, 400
+
+    # Valida que el teléfono tenga exactamente 9 dígitos
+    telefono = data["telefono"]
+    if not (telefono.isdigit() and len(telefono) == 9):
+        return {"error": "El teléfono debe ser un número entero de 9 dígitos"}, 400
+
+    # Valida que el email contenga al menos un '@'
+    email = data["email"]
+    if '@' not in email:
+        return {"error": "El email debe contener al menos un '@'"}, 400
+    
+    # Valida que el campo 'dir_calle' no sea una cadena vacía
+    dir_calle = data["dir_calle"]
+    if not dir_calle:
+        return {"error": "La calle de la dirección no puede estar vacía"}, 400
+
+    # Valida que el campo 'dir_numero' sea un número entero positivo
+    dir_numero = data["dir_numero"]
+    if not (dir_numero.isdigit() and int(dir_numero) > 0):
+        return {"error": "El número de dirección debe ser un número entero positivo"}, 400
+
+    return None
+
 #---------------------------------------GET Pacientes-------------------------------------------------------
 
+# Admite paginación con 'limite' y 'cursor' (ver controladores/paginacion.py)
 @pacientes_bp.route('/pacientes', methods=['GET'])
+@condicional("pacientes")
 def obtener_pacientes_json():
     try:
-        pacientes = obtener_pacientes()
+        limite, cursor = leer_paginacion()
+        pacientes = obtener_pacientes(limite, None if cursor is None else cursor[0])
 
-        if not pacientes:
+        if not pacientes and cursor is None:
             return jsonify({"error": "No hay pacientes disponibles"}), 404
 
-        return jsonify(pacientes), 200
+        return responder_pagina(pacientes, limite, lambda paciente: [paciente["id"]]), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
+
+#-------------------------------------GET Buscar Pacientes--------------------------------------------------
+
+# Busca por prefijos de palabras del nombre, apellido, email o DNI, sin distinguir acentos
+# ni mayúsculas: /pacientes/buscar?q=jua per. Los resultados vienen ordenados por ID y se
+# paginan con 'limite' y 'cursor' como el listado (ver controladores/paginacion.py)
+@pacientes_bp.route('/pacientes/buscar', methods=['GET'])
+@condicional("pacientes")
+def buscar_pacientes_json():
+    try:
+        texto = request.args.get("q", "")
+        if len(texto.strip()) < 2:
+            return jsonify({"error": "La búsqueda 'q' debe tener al menos 2 caracteres"}), 400
+
+        limite, cursor = leer_paginacion()
+        limite = limite or limite_busqueda
+        pacientes = buscar_pacientes(texto, limite, None if cursor is None else cursor[0])
+
+        if not pacientes and cursor is None:
+            return jsonify({"error": "No hay pacientes que coincidan con la búsqueda"}), 404
+
+        return responder_pagina(pacientes, limite, lambda paciente: [paciente["id"]]), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
 
 #-------------------------------------GET Paciente Por ID---------------------------------------------------
 
 @pacientes_bp.route('/pacientes/<int:id_paciente>', methods=["GET"])
+@condicional("pacientes")
 def obtener_paciente_por_id_json(id_paciente):
     try:
         paciente = obtener_paciente_por_id(id_paciente)
@@ -40,42 +123,19 @@ def crear_paciente_json():
     try:
         data = request.get_json()
 
-        # Valida que se proporcionen todos los campos requeridos
-        campos_requeridos = ["dni", "nombre", "apellido", "telefono", "email", "dir_calle", "dir_numero"]
-        for campo in campos_requeridos:
-            if campo not in data:
-                return jsonify({"error": f"Falta el campo '{campo}'"}), 400
+        # Valida los campos del paciente
+        error = validar_datos_paciente(data)
+        if error:
+            mensaje, codigo = error
+            return jsonify(mensaje), codigo
 
-        # Valida que el DNI sea un número entero de 10 dígitos
         dni = data["dni"]
-        if not (dni.isdigit() and len(dni) == 8):
-            return jsonify({"error": "El DNI debe ser un número entero de 8 dígitos"}), 400
-
-        # Valida que el nombre y el apellido no sean cadenas vacías y solo contengan letras
         nombre = data["nombre"]
         apellido = data["apellido"]
-        if not (nombre.isalpha() and apellido.isalpha()):
-            return jsonify({"error": "El nombre y el apellido deben contener solo letras y no estar vacíos"}), 400
-
-        # Valida que el teléfono tenga exactamente 9 dígitos
         telefono = data["telefono"]
-        if not (telefono.isdigit() and len(telefono) == 9):
-            return jsonify({"error": "El teléfono debe ser un número entero de 9 dígitos"}), 400
-
-        # Valida que el email contenga al menos un '@'
         email = data["email"]
-        if '@' not in email:
-            return jsonify({"error": "El email debe contener al menos un '@'"}), 400
-        
-        # Valida que el campo 'dir_calle' no sea una cadena vacía
         dir_calle = data["dir_calle"]
-        if not dir_calle:
-            return jsonify({"error": "La calle de la dirección no puede estar vacía"}), 400
-
-        # Valida que el campo 'dir_numero' sea un número entero positivo
         dir_numero = data["dir_numero"]
-        if not (dir_numero.isdigit() and int(dir_numero) > 0):
-            return jsonify({"error": "El número de dirección debe ser un número entero positivo"}), 400
 
         # Verifica si el paciente ya existe por DNI
         paciente_existente = obtener_paciente_por_dni(dni)
@@ -91,6 +151,46 @@ def crear_paciente_json():
         return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
 
 
+#-----------------------------------Importación de Pacientes------------------------------------------------
+
+# Importa pacientes desde un archivo CSV o NDJSON, leyéndolo fila por fila.
+# Las filas válidas se crean todas juntas; las inválidas se informan con su número de fila.
+@pacientes_bp.route('/pacientes/importar', methods=["POST"])
+def importar_pacientes_json():
+    try:
+        flujo, formato = obtener_archivo_subido()
+        if flujo is None:
+            return jsonify({"error": "El archivo debe ser CSV (text/csv) o NDJSON (application/x-ndjson)"}), 415
+
+        datos_pacientes = []
+        errores = []
+        dnis_importados = set()
+        for fila, data, error in leer_filas_subidas(flujo, formato):
+            if error is None:
+                try:
+                    error = validar_datos_paciente(data)
+                except (AttributeError, TypeError):
+                    error = {"error": "Los campos deben ser texto"}, 400
+                if error:
+                    error = error[0]["error"]
+            if error is None and (data["dni"] in dnis_importados or obtener_paciente_por_dni(data["dni"])):
+                error = "Ya existe un paciente con este DNI"
+            if error:
+                errores.append({"fila": fila, "error": error})
+                continue
+
+            dnis_importados.add(data["dni"])
+            datos_pacientes.append((data["dni"], data["nombre"], data["apellido"], data["telefono"],
+                                    data["email"], data["dir_calle"], data["dir_numero"]))
+
+        pacientes_creados = crear_pacientes_en_lote(datos_pacientes)
+        return jsonify({"creados": len(pacientes_creados), "errores": errores}), 201 if pacientes_creados else 200
+
+    except UnicodeDecodeError:
+        return jsonify({"error": "El archivo debe estar codificado en UTF-8"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
+
     
 #--------------------------------------PUT Pacientes--------------------------------------------------------    
 
@@ -104,43 +204,20 @@ def actualizar_paciente_json(id_paciente):
         if not paciente_existente:
             return jsonify({"error": "Paciente no encontrado"}), 404
 
-        # Valida que se proporcionen todos los campos requeridos
-        campos_requeridos = ["dni", "nombre", "apellido", "telefono", "email", "dir_calle", "dir_numero"]
-        for campo in campos_requeridos:
-            if campo not in data:
-                return jsonify({"error": f"Falta el campo '{campo}'"}), 400
+        # Valida los campos del paciente
+        error = validar_datos_paciente(data)
+        if error:
+            mensaje, codigo = error
+            return jsonify(mensaje), codigo
 
-        # Valida que el DNI sea un número entero de 10 dígitos
         dni = data["dni"]
-        if not (dni.isdigit() and len(dni) == 8):
-            return jsonify({"error": "El DNI debe ser un número entero de 8 dígitos"}), 400
-
-        # Valida que el nombre y el apellido no sean cadenas vacías y solo contengan letras
         nombre = data["nombre"]
         apellido = data["apellido"]
-        if not (nombre.isalpha() and apellido.isalpha()):
-            return jsonify({"error": "El nombre y el apellido deben contener solo letras y no estar vacíos"}), 400
-
-        # Valida que el teléfono tenga exactamente 9 dígitos
         telefono = data["telefono"]
-        if not (telefono.isdigit() and len(telefono) == 9):
-            return jsonify({"error": "El teléfono debe ser un número entero de 9 dígitos"}), 400
-
-        # Valida que el email contenga al menos un '@'
         email = data["email"]
-        if '@' not in email:
-            return jsonify({"error": "El email debe contener al menos un '@'"}), 400
-        
-        # Valida que el campo 'dir_calle' no sea una cadena vacía
         dir_calle = data["dir_calle"]
-        if not dir_calle:
-            return jsonify({"error": "La calle de la dirección no puede estar vacía"}), 400
-
-        # Valida que el campo 'dir_numero' sea un número entero positivo
         dir_numero = data["dir_numero"]
-        if not (dir_numero.isdigit() and int(dir_numero) > 0):
-            return jsonify({"error": "El número de dirección debe ser un número entero positivo"}), 400
-        
+
         # Verifica si el paciente ya existe por DNI
         paciente_existente = obtener_paciente_por_dni(dni)
         if paciente_existente and paciente_existente["id"]!= id_paciente:
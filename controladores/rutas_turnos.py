@@ -1,11 +1,14 @@
 from flask import Blueprint, jsonify, request
-from modelos.turno import obtener_turno_por_id_medico, obtener_turno_pendiente_por_id,eliminar_turno_por_id,crear_turno,obtener_turno_dado,obtener_paciente_turno
+from modelos.turno import obtener_turno_por_id_medico, obtener_turno_pendiente_por_id,eliminar_turno_por_id,crear_turno,obtener_turno_dado,obtener_paciente_turno,crear_turnos_en_lote,obtener_historial_turnos
 from modelos.medico import obtener_medico_por_id,obtener_medico_habilitado
 from modelos.paciente import obtener_paciente_por_id
 from modelos.agenda_medico import obtener_dia_agenda,obtener_hora_agenda
+from modelos.disponibilidad import obtener_disponibilidad, dias_ventana
+from modelos.indice_turnos import normalizar_fecha, normalizar_hora
+from modelos.concurrencia import cerrojo_medicos
+from controladores.condicional import condicional
 
 from datetime import datetime
-hoy = datetime.now()
 
 # Creamos el blueprint
 turnos_bp = Blueprint('turnos', __name__)
@@ -14,6 +17,7 @@ turnos_bp = Blueprint('turnos', __name__)
 
 # Obtener todos los turnos de un médico por su ID
 @turnos_bp.route('/turnos/<int:id_medico>', methods=["GET"])
+@condicional("medicos", "turnos")
 def obtener_turno_por_id_json(id_medico):
     try:
         # Obtener información del médico
@@ -34,6 +38,7 @@ def obtener_turno_por_id_json(id_medico):
 
 # Obtener todos los turnos pendientes de un médico por su ID
 @turnos_bp.route('/turnos/pendientes/<int:id_medico>', methods=["GET"])
+@condicional("medicos", "turnos", por_minuto=True)
 def obtener_turno_pendiente_por_id_json(id_medico):
     try:
         # Obtener información del médico
@@ -52,6 +57,63 @@ def obtener_turno_pendiente_por_id_json(id_medico):
 
 #----------------------------------------------------------------------------------------------
 
+# Obtener el historial de turnos de un médico, incluidos los ya archivados,
+# opcionalmente entre las fechas 'desde' y 'hasta' ('DD-MM-AAAA', ambas incluidas)
+@turnos_bp.route('/turnos/historial/<int:id_medico>', methods=["GET"])
+@condicional("medicos", "turnos")
+def obtener_historial_turnos_json(id_medico):
+    try:
+        fechas = {}
+        for parametro in ("desde", "hasta"):
+            fecha = request.args.get(parametro)
+            if fecha is not None:
+                try:
+                    datetime.strptime(fecha, "%d-%m-%Y")
+                except ValueError:
+                    raise ValueError(f"Formato de '{parametro}' inválido. Debe ser 'día-mes-año'")
+            fechas[parametro] = fecha
+
+        # Obtener información del médico
+        medico = obtener_medico_por_id(id_medico)
+        if medico is None:
+            return jsonify({"error" :"Médico no encontrado"}), 404
+
+        historial = obtener_historial_turnos(id_medico, fechas["desde"], fechas["hasta"])
+        if historial:
+            return jsonify(historial), 200
+        else:
+            return jsonify({"error":"No hay turnos para este médico"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
+
+#----------------------------------------------------------------------------------------------
+
+# Obtener los horarios libres de un médico para los próximos 30 días
+@turnos_bp.route('/turnos/disponibles/<int:id_medico>', methods=["GET"])
+@condicional("medicos", "agenda", "turnos", por_minuto=True)
+def obtener_disponibilidad_json(id_medico):
+    try:
+        # Obtener información del médico
+        medico = obtener_medico_por_id(id_medico)
+        if medico is None:
+            return jsonify({"error" :"Médico no encontrado"}), 404
+
+        # Verificar si el médico está habilitado
+        if obtener_medico_habilitado(id_medico) is None:
+            return jsonify({"error": "Médico no habilitado"}), 404
+
+        disponibilidad = obtener_disponibilidad(id_medico)
+        if disponibilidad:
+            return jsonify({"id_medico": id_medico, "dias": disponibilidad}), 200
+        else:
+            return jsonify({"error":"El médico no tiene días de atención en la agenda"}), 404
+    except Exception as e:
+        return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
+
+#----------------------------------------------------------------------------------------------
+
 # Eliminar un turno por el ID del médico y el ID del paciente
 @turnos_bp.route('/turnos/<int:id_medico>/<int:id_paciente>', methods=["DELETE"])
 def eliminar_turno_json(id_medico, id_paciente):
@@ -77,6 +139,70 @@ def eliminar_turno_json(id_medico, id_paciente):
 
 #----------------------------------------------------------------------------------------------
 
+# Valida los datos de un turno con las reglas de la agenda del médico.
+# Devuelve None si es válido, o el error y el código de estado a responder.
+# No revisa si el horario o el paciente ya tienen turno: eso depende de los demás turnos.
+def validar_turno(id_medico, id_paciente, fecha_turno, hora_turno):
+    # Obtener información del médico
+    medico = obtener_medico_por_id(id_medico)
+    if medico is None:
+        return {"error": "Médico no encontrado"}, 404
+
+    # Verificar si el médico está habilitado
+    medico_habilitado = obtener_medico_habilitado(id_medico)
+    if medico_habilitado is None:
+        return {"error": "Médico no habilitado"}, 404
+
+    # Obtener información del paciente
+    paciente = obtener_paciente_por_id(id_paciente)
+    if paciente is None:
+        return {"error": "Paciente no encontrado"}, 404
+
+    # Convertir la fecha del turno a un objeto de fecha
+    try:
+        fecha_t = datetime.strptime(fecha_turno, "%d-%m-%Y").date()
+    except (TypeError, ValueError):
+        return {"error": "Formato de fecha inválido. Debe ser 'día-mes-año'"}, 400
+
+    # Con el formato ya verificado, la fecha se pasa a su forma normal ('1-2-2025' -> '01-02-2025')
+    fecha_turno = normalizar_fecha(fecha_turno)
+
+    # Verificar que la fecha del turno no sea anterior a la fecha actual
+    if fecha_t < datetime.now().date():
+        return {"error": "No se puede ingresar una fecha anterior al día de hoy"}, 400
+
+    # Convertir la hora del turno a un objeto de tiempo
+    try:
+        hora_turno_dt = datetime.strptime(hora_turno, "%H:%M")
+    except (TypeError, ValueError):
+        return {"error": "Formato de hora inválido. Debe ser 'Horas:Minutos'"}, 400
+
+    # Verificar que la hora del turno esté en intervalos de 15 minutos
+    if hora_turno_dt.minute % 15 != 0:
+        return {"error": "La hora del turno debe estar en intervalos de 15 minutos"}, 400
+
+    # La agenda se consulta con la hora en su forma normal ('9:00' -> '09:00'), igual en los dos backends
+    hora_turno = normalizar_hora(hora_turno)
+
+    # Obtener información sobre el día y la hora de la agenda del médico.
+    # La hora se busca en el horario del día de la semana del turno
+    dia_del_turno = obtener_dia_agenda(id_medico, fecha_turno)
+    if dia_del_turno is None:
+        return {"error": "El médico no atiende ese día"}, 400
+
+    hora_del_turno = obtener_hora_agenda(id_medico, hora_turno, fecha_turno)
+    if hora_del_turno is None:
+        return {"error": "El médico no atiende esa hora"}, 400
+
+    # Calcular la diferencia en días entre la fecha del turno y la fecha actual
+    diferencia_dias = (fecha_t - datetime.now().date()).days
+    if diferencia_dias > dias_ventana:
+        return {"error": "Fecha inválida, el turno debe estar dentro de los próximos 30 días"}, 400
+
+    return None
+
+#----------------------------------------------------------------------------------------------
+
 #Crear un turno por el ID del médico y el ID del paciente
 @turnos_bp.route('/turnos/<int:id_medico>/<int:id_paciente>', methods=["POST"])
 def crear_turno_json(id_medico, id_paciente):
@@ -94,65 +220,28 @@ def crear_turno_json(id_medico, id_paciente):
         fecha_turno = data["fecha_turno"]
         hora_turno = data["hora_turno"]
 
-        # Obtener información del médico
-        medico = obtener_medico_por_id(id_medico)
-        if medico is None:
-            return jsonify({"error": "Médico no encontrado"}), 404
+        # Las validaciones y el alta se hacen con el cerrojo del médico tomado,
+        # así dos solicitudes no pueden reservar el mismo horario a la vez
+        with cerrojo_medicos(id_medico):
+            # Validar médico, paciente, fecha y hora contra la agenda
+            error = validar_turno(id_medico, id_paciente, fecha_turno, hora_turno)
+            if error:
+                mensaje, codigo = error
+                return jsonify(mensaje), codigo
 
-        # Verificar si el médico está habilitado
-        medico_habilitado = obtener_medico_habilitado(id_medico)
-        if medico_habilitado is None:
-            return jsonify({"error": "Médico no habilitado"}), 404
-
-        # Obtener información del paciente
-        paciente = obtener_paciente_por_id(id_paciente)
-        if paciente is None:
-            return jsonify({"error": "Paciente no encontrado"}), 404
-
-        # Convertir la fecha del turno a un objeto de fecha
-        try:
-            fecha_t = datetime.strptime(fecha_turno, "%d-%m-%Y").date()
-        except ValueError:
-            return jsonify({"error": "Formato de fecha inválido. Debe ser 'día-mes-año'"}), 400
-
-        # Verificar que la fecha del turno no sea anterior a la fecha actual
-        if fecha_t < datetime.now().date():
-            return jsonify({"error": "No se puede ingresar una fecha anterior al día de hoy"}), 400
-
-        # Obtener información sobre el día y la hora de la agenda del médico
-        dia_del_turno = obtener_dia_agenda(id_medico, fecha_turno)
-        if dia_del_turno is None:
-            return jsonify({"error": "El médico no atiende ese día"}), 400
-
-        hora_del_turno = obtener_hora_agenda(id_medico, hora_turno)
-        if hora_del_turno is None:
-            return jsonify({"error": "El médico no atiende esa hora"}), 400
-
-        # Convertir la hora del turno a un objeto de tiempo
-        try:
-            hora_turno_dt = datetime.strptime(hora_turno, "%H:%M")
-        except ValueError:
-            return jsonify({"error": "Formato de hora inválido. Debe ser 'Horas:Minutos'"}), 400
-
-        # Verificar que la hora del turno esté en intervalos de 15 minutos
-        if hora_turno_dt.minute % 15 != 0:
-            return jsonify({"error": "La hora del turno debe estar en intervalos de 15 minutos"}), 400
-
-        # Calcular la diferencia en días entre la fecha del turno y la fecha actual
-        diferencia_dias = (fecha_t - hoy.date()).days
-        if diferencia_dias > 30:
-            return jsonify({"error": "Fecha inválida, el turno debe estar dentro de los próximos 30 días"}), 400
-        
-        turno_dado = obtener_turno_dado(id_medico, hora_turno, fecha_turno)
-        if turno_dado:
-            return jsonify({"error": "El medico ya tiene un turno a esa hora"})
-        
-        paciente_turno = obtener_paciente_turno(id_medico, id_paciente, hora_turno, fecha_turno)
-        if paciente_turno:
-            return jsonify({"error": "El paciente ya tiene un turno pendiente"})
-        
-        # Crear el turno y obtener el resultado
-        creado, mensaje = crear_turno(id_medico, id_paciente, fecha_turno, hora_turno)
+            # Ya validadas, la fecha y la hora se pasan a su forma normal ('9:0' -> '09:00')
+            fecha_turno, hora_turno = normalizar_fecha(fecha_turno), normalizar_hora(hora_turno)
+            
+            turno_dado = obtener_turno_dado(id_medico, hora_turno, fecha_turno)
+            if turno_dado:
+                return jsonify({"error": "El medico ya tiene un turno a esa hora"})
+            
+            paciente_turno = obtener_paciente_turno(id_medico, id_paciente, hora_turno, fecha_turno)
+            if paciente_turno:
+                return jsonify({"error": "El paciente ya tiene un turno pendiente"})
+            
+            # Crear el turno y obtener el resultado
+            creado, mensaje = crear_turno(id_medico, id_paciente, fecha_turno, hora_turno)
         if creado:
             return jsonify(mensaje), 200
         else:
@@ -160,6 +249,82 @@ def crear_turno_json(id_medico, id_paciente):
     except Exception as e:
         return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
 
+#----------------------------------------------------------------------------------------------
+
+# Indica si un valor del JSON es un número entero; true y false no cuentan, aunque bool sea un int en Python
+def es_entero(valor):
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+#----------------------------------------------------------------------------------------------
+
+# Crear varios turnos en una sola solicitud.
+# Recibe una lista de {"id_medico", "id_paciente", "fecha_turno", "hora_turno"} y devuelve un resultado por turno.
+# Se valida todo el lote antes de crear nada, incluidos los choques entre turnos del mismo lote,
+# y los turnos válidos se guardan juntos con una sola escritura.
+@turnos_bp.route('/turnos/lote', methods=["POST"])
+def crear_turnos_lote_json():
+    try:
+        lista_data = request.get_json()
+        if not isinstance(lista_data, list) or not lista_data:
+            return jsonify({"error": "Se debe enviar una lista de turnos"}), 400
+
+        resultados = []
+        a_crear = []               # (posición en resultados, id_medico, id_paciente, fecha, hora)
+        horarios_del_lote = set()  # (id_medico, fecha, hora) ya tomados por el lote
+        pacientes_del_lote = set() # (id_medico, id_paciente) ya presentes en el lote
+
+        # Se toman juntos los cerrojos de todos los médicos del lote, durante la validación y el alta
+        ids_medicos = [data["id_medico"] for data in lista_data if isinstance(data, dict) and es_entero(data.get("id_medico"))]
+        with cerrojo_medicos(*ids_medicos):
+            campos_requeridos = ["id_medico", "id_paciente", "fecha_turno", "hora_turno"]
+            for indice, data in enumerate(lista_data):
+                faltantes = [campo for campo in campos_requeridos if not isinstance(data, dict) or campo not in data]
+                if faltantes:
+                    resultados.append({"indice": indice, "estado": 400, "error": f"Falta el campo '{faltantes[0]}'"})
+                    continue
+
+                id_medico = data["id_medico"]
+                id_paciente = data["id_paciente"]
+                fecha_turno = data["fecha_turno"]
+                hora_turno = data["hora_turno"]
+                if not (es_entero(id_medico) and es_entero(id_paciente)):
+                    resultados.append({"indice": indice, "estado": 400, "error": "'id_medico' e 'id_paciente' deben ser números enteros"})
+                    continue
 
-    
-    
+                error = validar_turno(id_medico, id_paciente, fecha_turno, hora_turno)
+                if error:
+                    mensaje, codigo = error
+                    resultados.append({"indice": indice, "estado": codigo, **mensaje})
+                    continue
+
+                # Ya validadas, la fecha y la hora se pasan a su forma normal: así '10:0' y '10:00'
+                # son el mismo horario también para los choques dentro del lote
+                fecha_turno, hora_turno = normalizar_fecha(fecha_turno), normalizar_hora(hora_turno)
+
+                horario = (id_medico, fecha_turno, hora_turno)
+                if horario in horarios_del_lote or obtener_turno_dado(id_medico, hora_turno, fecha_turno):
+                    resultados.append({"indice": indice, "estado": 409, "error": "El medico ya tiene un turno a esa hora"})
+                    continue
+
+                if (id_medico, id_paciente) in pacientes_del_lote:
+                    resultados.append({"indice": indice, "estado": 409, "error": "El paciente ya tiene un turno con el médico en este lote"})
+                    continue
+
+                if obtener_paciente_turno(id_medico, id_paciente, hora_turno, fecha_turno):
+                    resultados.append({"indice": indice, "estado": 409, "error": "El paciente ya tiene un turno pendiente"})
+                    continue
+
+                horarios_del_lote.add(horario)
+                pacientes_del_lote.add((id_medico, id_paciente))
+                resultados.append(None)  # Se completa después de crear el lote
+                a_crear.append((indice, id_medico, id_paciente, fecha_turno, hora_turno))
+
+            # Crear todos los turnos válidos con una sola escritura
+            creados = crear_turnos_en_lote([(id_medico, id_paciente, fecha_turno, hora_turno) for _, id_medico, id_paciente, fecha_turno, hora_turno in a_crear])
+            for (indice, *_), (creado, mensaje) in zip(a_crear, creados):
+                resultados[indice] = {"indice": indice, "estado": 201 if creado else 400, **mensaje}
+
+        cantidad_creados = sum(1 for resultado in resultados if resultado["estado"] == 201)
+        return jsonify({"creados": cantidad_creados, "resultados": resultados}), 200
+    except Exception as e:
+        return jsonify({"error": f"Error en el servidor: {str(e)}"}), 500
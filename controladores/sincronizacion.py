@@ -0,0 +1,37 @@
+# -----------------------------------------------------------------
+# Sincronización de las colecciones entre procesos en cada solicitud
+# -----------------------------------------------------------------
+# En modo multiproceso, antes de cada lectura se incorporan los cambios
+# que otros procesos dejaron en disco. Las solicitudes que modifican datos
+# se ejecutan completas con el cerrojo exclusivo entre procesos tomado, y
+# lo modificado se vuelca a disco antes de soltarlo.
+
+from flask import g, request
+from modelos.multiproceso import sincronizar_colecciones, iniciar_escritura, terminar_escritura
+
+# Variables globales que usaremos en este módulo
+metodos_lectura = ("GET", "HEAD", "OPTIONS")
+
+#----------------------------------------------------------------------------------------------
+
+# Registra en la aplicación las funciones que sincronizan antes y después de cada solicitud
+def instalar_sincronizacion(app):
+    app.before_request(_antes_de_solicitud)
+    app.teardown_request(_despues_de_solicitud)
+
+#----------------------------------------------------------------------------------------------
+
+# Antes de la solicitud: recarga lo que cambió y, si va a escribir, toma el cerrojo exclusivo
+def _antes_de_solicitud():
+    if request.method in metodos_lectura:
+        sincronizar_colecciones()
+    else:
+        g.cerrojo_escritura = iniciar_escritura()
+
+#----------------------------------------------------------------------------------------------
+
+# Al terminar la solicitud (aunque haya fallado): vuelca y suelta el cerrojo exclusivo
+def _despues_de_solicitud(error):
+    archivo = g.pop("cerrojo_escritura", None)
+    if archivo is not None:
+        terminar_escritura(archivo)
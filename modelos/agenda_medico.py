@@ -2,57 +2,60 @@
 # Módulo de funciones sobre Agenda
 # -----------------------------------------------------------------
 from modelos.medico import obtener_medicos
+from modelos.persistencia import registrar_coleccion, marcar_sucia, escribir_csv_atomico
+from modelos.repositorio import delegable
+from modelos.versiones import incrementar_version
+from modelos.concurrencia import lectura, escritura
+from modelos.multiproceso import registrar_recarga
+from modelos.instantanea import cargar_filas
+from modelos.registros import Horario
+from modelos.disponibilidad import cargar_horarios, actualizar_horario, quitar_horario, slot_permitido, dia_numero_de_texto
 from datetime import datetime , time
 import requests
-import csv
+import bisect
 import os
 
 # Variables globales que usaremos en este módulo
-agenda = []
+agenda = []            # Horarios ordenados por (id_medico, dia_numero)
+claves_agenda = []     # Claves (id_medico, dia_numero) en el mismo orden que agenda
+agenda_por_clave = {}  # (id_medico, dia_numero) -> horario
 ruta_archivo_agenda = 'modelos\\agenda_medicos.csv'
 
 #----------------------------------------------------------------------------------------------
 # Inicializa la agenda de médicos con horarios predeterminados
 def inicializar_agenda_medicos():
-    global agenda
-    
     if os.path.exists(ruta_archivo_agenda):
         print("Archivo Agenda existente, inicializando..")
-        agenda = cargar_agenda_desde_archivo()
+        reconstruir_agenda(cargar_agenda_desde_archivo())
     else:
         print("Creando archivo e Inicializando agenda..")
-        medicos = obtener_medicos()   
-        # Para cada médico, crea horarios predeterminados de lunes a domingo
-        for medico in medicos:
-            id_medico = medico["id"]
-            for i in range(0, 7): 
-                if medico["habilitado"]:
-                    hora_inicio = "08:00"
-                    hora_fin = "17:00"
-                    fecha_actualizacion = datetime.now().strftime("%d-%m-%Y")
-                    agenda.append({
-                        "id_medico": id_medico,
-                        "dia_numero": i,
-                        "hora_inicio": hora_inicio,
-                        "hora_fin": hora_fin,
-                        "fecha_actualizacion": fecha_actualizacion
-                    })
+        for horario in horarios_predeterminados(obtener_medicos()):
+            agregar_horario(horario)
 
     # Guarda la agenda en el archivo agenda_medicos.csv
     guardar_agenda_en_archivo(agenda)
-  
-#-----------------------------------------------------------------------------------------------  
-# Carga la agenda de médicos desde un archivo CSV
+    cargar_horarios(agenda)
+
+#----------------------------------------------------------------------------------------------
+# Horarios predeterminados de los médicos habilitados: de 08:00 a 17:00, de lunes a domingo
+def horarios_predeterminados(medicos):
+    fecha_actualizacion = datetime.now().strftime("%d-%m-%Y")
+    for medico in medicos:
+        if medico["habilitado"]:
+            for i in range(0, 7):
+                yield Horario(
+                    id_medico=medico["id"],
+                    dia_numero=i,
+                    hora_inicio="08:00",
+                    hora_fin="17:00",
+                    fecha_actualizacion=fecha_actualizacion
+                )
+
+#-----------------------------------------------------------------------------------------------
+# Carga la agenda de médicos desde un archivo CSV (o desde su instantánea, si está al día)
 def cargar_agenda_desde_archivo():
     try:
-        with open(ruta_archivo_agenda, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            agenda = []
-            for horario in reader:
-                horario['id_medico'] = int(horario['id_medico'])
-                horario['dia_numero'] = int(horario['dia_numero'])
-                agenda.append(horario)
-            return agenda
+        return cargar_filas(ruta_archivo_agenda, Horario)
     except Exception as e:
         print(f"Error al abrir el archivo de agenda: {e}")
         return []
@@ -61,107 +64,173 @@ def cargar_agenda_desde_archivo():
 # Guarda la agenda en un archivo CSV
 def guardar_agenda_en_archivo(agenda):
     try:
-        with open(ruta_archivo_agenda, 'w', newline='', encoding='utf-8') as csvfile:
-            campo_nombres = ['id_medico', 'dia_numero', 'hora_inicio', 'hora_fin', 'fecha_actualizacion']
-            writer = csv.DictWriter(csvfile, fieldnames=campo_nombres)
-            writer.writeheader()
-            for horario in agenda:
-                writer.writerow(horario)
+        escribir_agenda(agenda)
     except Exception as e:
         print(f"Error al abrir el archivo de agenda: {e}")
 
+#----------------------------------------------------------------------------------------------
+# Escribe la agenda en el archivo CSV; los errores se propagan a quien llama
+def escribir_agenda(agenda):
+    campo_nombres = ['id_medico', 'dia_numero', 'hora_inicio', 'hora_fin', 'fecha_actualizacion']
+    escribir_csv_atomico(ruta_archivo_agenda, campo_nombres, list(agenda), Horario)
+
+#----------------------------------------------------------------------------------------------
+# Vuelca la agenda actual; la llama el módulo de persistencia en segundo plano.
+# Si la escritura falla, el error llega al volcado, que deja la agenda pendiente y la reintenta
+def volcar_agenda():
+    # Se copia con el cerrojo tomado y se escribe el archivo sin bloquear a los demás
+    with lectura("agenda"):
+        filas = [dict(horario) for horario in agenda]
+    escribir_agenda(filas)
+
+registrar_coleccion("agenda", volcar_agenda)
+
+#----------------------------------------------------------------------------------------------
+# Vuelve a cargar la agenda cuando otro proceso modificó el archivo
+def recargar_agenda(rutas_cambiadas):
+    with escritura("agenda"):
+        reconstruir_agenda(cargar_agenda_desde_archivo())
+        cargar_horarios(agenda)
+        incrementar_version("agenda")
+
+registrar_recarga("agenda", [ruta_archivo_agenda], recargar_agenda)
+
+#----------------------------------------------------------------------------------------------
+# Reemplaza la agenda por la lista de horarios recibida, ordenándola una sola vez
+def reconstruir_agenda(horarios):
+    agenda[:] = sorted(horarios, key=lambda horario: (horario["id_medico"], horario["dia_numero"]))
+    claves_agenda[:] = [(horario["id_medico"], horario["dia_numero"]) for horario in agenda]
+    agenda_por_clave.clear()
+    agenda_por_clave.update(zip(claves_agenda, agenda))
+
+#----------------------------------------------------------------------------------------------
+# Inserta un horario en su posición, manteniendo el orden de la agenda
+def agregar_horario(horario):
+    clave = (horario["id_medico"], horario["dia_numero"])
+    posicion = bisect.bisect_left(claves_agenda, clave)
+    claves_agenda.insert(posicion, clave)
+    agenda.insert(posicion, horario)
+    agenda_por_clave[clave] = horario
+
+#----------------------------------------------------------------------------------------------
+# Quita el horario de un médico para un día; devuelve False si no existía
+def quitar_horario_agenda(id_medico, dia_numero):
+    horario = agenda_por_clave.pop((id_medico, dia_numero), None)
+    if horario is None:
+        return False
+    posicion = bisect.bisect_left(claves_agenda, (id_medico, dia_numero))
+    del claves_agenda[posicion]
+    del agenda[posicion]
+    return True
+
+#----------------------------------------------------------------------------------------------
+# Posiciones de la agenda que ocupan los horarios de un médico
+def _rango_medico(id_medico):
+    return bisect.bisect_left(claves_agenda, (id_medico,)), bisect.bisect_left(claves_agenda, (id_medico + 1,))
+
 #----------------------------------------------------------------------------------------------
 # Obtiene la agenda completa de médicos
+@delegable
 def obtener_agenda_medicos():
     return agenda
 
 #----------------------------------------------------------------------------------------------
 # Obtiene la agenda de un médico específico por su ID
+@delegable
 def obtener_agenda_medico_por_id(id_medico):
-    global agenda_medico
-    agenda_medico = []  
-    for medico in agenda:
-        if medico["id_medico"] == id_medico:
-            agenda_medico.append(medico)
-    return agenda_medico
+    inicio, fin = _rango_medico(id_medico)
+    return agenda[inicio:fin]
 
 #----------------------------------------------------------------------------------------------
 # Crea un nuevo horario en la agenda de un médico
+@delegable
 def crear_agenda_medico(id_medico, dia_numero, hora_inicio, hora_fin):
-    global agenda
     h_inicio = datetime.strptime(hora_inicio,"%H:%M")
     h_fin = datetime.strptime(hora_fin,"%H:%M")
-    for medico in agenda:
-        if medico["id_medico"] == id_medico and medico["dia_numero"]!= dia_numero:
-                if h_inicio < h_fin:
-                    nuevo_horario = {
-                        "id_medico": id_medico,
-                        "dia_numero": dia_numero,
-                        "hora_inicio": hora_inicio,
-                        "hora_fin": hora_fin,
-                        "fecha_actualizacion": datetime.now().strftime("%d-%m-%Y")
-                    }
-                    agenda.append(nuevo_horario)
-                    guardar_agenda_en_archivo(agenda)
-                    return nuevo_horario
-                else:
-                    return {"error": "La hora de inicio debe ser menor a la hora de fin"}        
-        else:
-                return {"error": "El día indicado ya está agendado"}
+    if h_inicio >= h_fin:
+        return {"error": "La hora de inicio debe ser menor a la hora de fin"}
+
+    with escritura("agenda"):
+        if (id_medico, dia_numero) in agenda_por_clave:
+            return {"error": "El día indicado ya está agendado"}
+
+        nuevo_horario = Horario(
+            id_medico=id_medico,
+            dia_numero=dia_numero,
+            hora_inicio=hora_inicio,
+            hora_fin=hora_fin,
+            fecha_actualizacion=datetime.now().strftime("%d-%m-%Y")
+        )
+        agregar_horario(nuevo_horario)
+        actualizar_horario(id_medico, dia_numero, hora_inicio, hora_fin)
+        incrementar_version("agenda")
+    marcar_sucia("agenda")
+    return nuevo_horario
         
 #----------------------------------------------------------------------------------------------
 # Elimina un día específico de la agenda de un médico por su ID
+@delegable
 def eliminar_dia_agenda_medico_por_id(id_medico, dia_numero):
-    global agenda
-    agenda = [medico for medico in agenda if not (medico["id_medico"] == id_medico and medico["dia_numero"] == dia_numero)]
+    with escritura("agenda"):
+        if not quitar_horario_agenda(id_medico, dia_numero):
+            return False
+        quitar_horario(id_medico, dia_numero)
+        incrementar_version("agenda")
 
-    try:
-        guardar_agenda_en_archivo(agenda)
-        return True
-    except Exception as e:
-        print(f"Error al guardar la agenda en el archivo: {str(e)}")
-        return False
+    marcar_sucia("agenda")
+    return True
 
 #----------------------------------------------------------------------------------------------
 # Actualiza un horario específico en la agenda de un médico por su ID y día
+@delegable
 def actualizar_agenda_por_dia(id_medico, dia_numero, hora_inicio, hora_fin):
-    global agenda
     h_inicio = datetime.strptime(hora_inicio,"%H:%M")
     h_fin = datetime.strptime(hora_fin,"%H:%M")
-    for medico in agenda:
-        if medico["id_medico"] == id_medico and medico["dia_numero"] == dia_numero:
-            if h_inicio < h_fin:
-                medico["hora_inicio"] = hora_inicio
-                medico["hora_fin"] = hora_fin
-                medico["fecha_actualizacion"] = datetime.now().strftime("%d-%m-%Y")
-            else:
-                return {"error": "La hora de inicio debe ser menor a la de fin"}
-            
-    guardar_agenda_en_archivo(agenda)
-    return agenda
+    if h_inicio >= h_fin:
+        return {"error": "La hora de inicio debe ser menor a la de fin"}
+    with escritura("agenda"):
+        horario = agenda_por_clave.get((id_medico, dia_numero))
+        if horario is None:
+            return None
+
+        # La clave no cambia, así que el horario conserva su posición en la agenda
+        horario["hora_inicio"] = hora_inicio
+        horario["hora_fin"] = hora_fin
+        horario["fecha_actualizacion"] = datetime.now().strftime("%d-%m-%Y")
+        actualizar_horario(id_medico, dia_numero, hora_inicio, hora_fin)
+        incrementar_version("agenda")
+        agenda_actualizada = obtener_agenda_medico_por_id(id_medico)
+    marcar_sucia("agenda")
+    return agenda_actualizada
 #----------------------------------------------------------------------------------------------
 # Obtiene información sobre un día específico en la agenda de un médico por su ID y día
+@delegable
 def obtener_dia_agenda(id_medico, fecha_turno):
-    fecha_t = datetime.strptime(fecha_turno, "%d-%m-%Y").date()
-    dia_turno = fecha_t.strftime('%w')
     # Buscar el día en la agenda del médico
-    for medico in agenda:
-        if medico["id_medico"] == id_medico and medico["dia_numero"] == int(dia_turno):
-            return medico
-    
-    return None
-
-#----------------------------------------------------------------------------------------------
-# Obtiene información sobre un horario específico en la agenda de un médico por su ID y hora
-def obtener_hora_agenda(id_medico, hora_turno):
-    for medico in agenda:
-        if medico["id_medico"] == id_medico and medico["hora_inicio"] < hora_turno < medico["hora_fin"]:
-            return medico
-    return None
-
-#----------------------------------------------------------------------------------------------
-# Obtiene la agenda de un médico por su ID ordenada por día y hora de inicio
-def obtener_agenda_ordenada_medicos():
-    global agenda
-    agenda_ordenada = sorted(agenda, key=lambda medico: (medico["id_medico"], medico["dia_numero"]))
-    return agenda_ordenada
\ No newline at end of file
+    return agenda_por_clave.get((id_medico, dia_numero_de_texto(fecha_turno)))
+
+#----------------------------------------------------------------------------------------------
+# Obtiene el horario de la agenda del médico que admite un turno a esa hora en el día de la semana
+# de la fecha, o None. La hora tiene que caer en un horario de 15 minutos dentro del día
+@delegable
+def obtener_hora_agenda(id_medico, hora_turno, fecha_turno):
+    dia_numero = dia_numero_de_texto(fecha_turno)
+    if not slot_permitido(id_medico, dia_numero, hora_turno):
+        return None
+    return agenda_por_clave.get((id_medico, dia_numero))
+
+#----------------------------------------------------------------------------------------------
+# Obtiene la agenda ordenada por médico y día. Con 'id_medico' filtra por ese médico,
+# con 'despues_de' (id_medico, dia_numero) empieza después de ese horario
+# y con 'limite' devuelve como máximo esa cantidad
+@delegable
+def obtener_agenda_ordenada_medicos(limite=None, despues_de=None, id_medico=None):
+    # La agenda ya se mantiene ordenada: solo se recorta el rango pedido
+    inicio, fin = (0, len(agenda)) if id_medico is None else _rango_medico(id_medico)
+    if despues_de is not None:
+        inicio = max(inicio, bisect.bisect_right(claves_agenda, tuple(despues_de)))
+    if limite is not None:
+        fin = min(fin, inicio + limite)
+    if inicio == 0 and fin == len(agenda):
+        return agenda
+    return agenda[inicio:fin]
\ No newline at end of file
@@ -0,0 +1,136 @@
+# -----------------------------------------------------------------
+# Módulo de analítica de ocupación
+# -----------------------------------------------------------------
+# Para los próximos días calcula cuántos horarios de 15 minutos ofrece cada
+# médico según su agenda y cuántos de ellos ya tienen turno: por día, por
+# día de la semana, por semana y en total, más la demanda de cada hora del
+# día sumando a todos los médicos. Los turnos no registran si el paciente
+# asistió, así que no hay datos de ausencias: lo más cercano que se puede
+# dar son las horas más pedidas.
+#
+# No se recorren los turnos: se usan las máscaras de bits de la
+# disponibilidad. La agenda se pasa una vez a una máscara por (médico, día
+# de la semana) y los horarios con turno de todo el período se piden juntos
+# como una máscara por (médico, fecha); cada resultado es el AND de las dos.
+# El resultado se guarda junto con las versiones de la agenda y los turnos y
+# la fecha de hoy; se reutiliza mientras ninguna de las tres cambie.
+
+from datetime import date, timedelta
+from modelos.agenda_medico import obtener_agenda_medicos
+from modelos.disponibilidad import mascara_del_horario, obtener_ocupados_en_fechas, contar_slots, hora_desde_minutos, dia_numero_de_fecha, dias_ventana, minutos_slot
+from modelos.versiones import obtener_version
+
+# Variables globales que usaremos en este módulo
+ocupacion_calculada = {}  # dias -> ((hoy, versión de agenda, versión de turnos), resultado)
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene la ocupación de hoy a hoy + 'dias'; se recalcula solo si cambió la agenda, los turnos o el día
+def obtener_ocupacion(dias=dias_ventana):
+    hoy = date.today()
+    clave = (hoy, obtener_version("agenda"), obtener_version("turnos"))
+    guardada = ocupacion_calculada.get(dias)
+    if guardada is not None and guardada[0] == clave:
+        return guardada[1]
+    resultado = calcular_ocupacion(hoy, dias)
+    ocupacion_calculada[dias] = (clave, resultado)
+    return resultado
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene la ocupación de un médico con el período, o None si no tiene días de atención en la agenda
+def obtener_ocupacion_medico(id_medico, dias=dias_ventana):
+    ocupacion = obtener_ocupacion(dias)
+    de_medico = ocupacion["por_medico"].get(id_medico)
+    if de_medico is None:
+        return None
+    return {"desde": ocupacion["desde"], "hasta": ocupacion["hasta"], **de_medico}
+
+#----------------------------------------------------------------------------------------------
+
+# Proporción de horarios reservados, redondeada a 4 decimales
+def proporcion(reservados, disponibles):
+    return round(reservados / disponibles, 4) if disponibles else 0.0
+
+#----------------------------------------------------------------------------------------------
+
+# Arma el resumen de un grupo de horarios
+def resumen(disponibles, reservados, **datos):
+    return {**datos, "disponibles": disponibles, "reservados": reservados,
+            "libres": disponibles - reservados, "ocupacion": proporcion(reservados, disponibles)}
+
+#----------------------------------------------------------------------------------------------
+
+# Calcula la ocupación de todos los médicos con agenda, de 'desde' a 'desde' + 'dias' (ambas incluidas)
+def calcular_ocupacion(desde, dias):
+    fechas = [desde + timedelta(days=i) for i in range(dias + 1)]
+    # Cada fecha se formatea una sola vez para todos los médicos: (texto, día de la semana, semana ISO)
+    periodo = [(fecha.strftime("%d-%m-%Y"), dia_numero_de_fecha(fecha), fecha.strftime("%G-W%V")) for fecha in fechas]
+    fecha_desde, fecha_hasta = periodo[0][0], periodo[-1][0]
+
+    # Horarios que ofrece cada médico en cada día de la semana, como máscara y cantidad
+    ofrecidos = {}
+    for horario in obtener_agenda_medicos():
+        mascara = mascara_del_horario(horario["hora_inicio"], horario["hora_fin"])
+        if mascara:
+            ofrecidos[(horario["id_medico"], horario["dia_numero"])] = (mascara, contar_slots(mascara))
+
+    # Horarios con turno de cada médico en cada fecha del período, todos de una vez
+    ocupados = obtener_ocupados_en_fechas([fecha_turno for fecha_turno, _, _ in periodo])
+
+    slots_por_hora = 60 // minutos_slot
+    # Los horarios ofrecidos por hora se suman por (médico, día de la semana) y se multiplican al final
+    veces_por_dia_semana = {}
+    reservados_por_hora = {}
+    por_medico = {}
+    for id_medico in sorted({id_medico for id_medico, _ in ofrecidos}):
+        ocupados_medico = ocupados.get(id_medico, {})
+        por_dia = []
+        por_dia_semana = {}
+        por_semana = {}
+        for fecha_turno, dia_numero, semana in periodo:
+            ofrecido = ofrecidos.get((id_medico, dia_numero))
+            if ofrecido is None:
+                continue  # El médico no atiende ese día
+            veces_por_dia_semana[(id_medico, dia_numero)] = veces_por_dia_semana.get((id_medico, dia_numero), 0) + 1
+            # Solo cuentan los turnos que caen en un horario de la agenda
+            mascara, disponibles = ofrecido
+            reservados_mascara = mascara & ocupados_medico.get(fecha_turno, 0)
+            reservados = contar_slots(reservados_mascara)
+            por_dia.append(resumen(disponibles, reservados, fecha=fecha_turno, dia_numero=dia_numero))
+
+            for agrupado, clave in ((por_dia_semana, dia_numero), (por_semana, semana)):
+                totales = agrupado.setdefault(clave, [0, 0])
+                totales[0] += disponibles
+                totales[1] += reservados
+            while reservados_mascara:
+                bit = reservados_mascara & -reservados_mascara
+                hora = (bit.bit_length() - 1) // slots_por_hora
+                reservados_por_hora[hora] = reservados_por_hora.get(hora, 0) + 1
+                reservados_mascara ^= bit
+
+        if not por_dia:
+            continue
+        disponibles = sum(dia["disponibles"] for dia in por_dia)
+        reservados = sum(dia["reservados"] for dia in por_dia)
+        por_medico[id_medico] = resumen(
+            disponibles, reservados, id_medico=id_medico, por_dia=por_dia,
+            por_dia_semana=[resumen(*totales, dia_numero=dia_numero) for dia_numero, totales in sorted(por_dia_semana.items())],
+            por_semana=[resumen(*totales, semana=semana) for semana, totales in por_semana.items()])
+
+    disponibles_por_hora = {}
+    todos_de_una_hora = (1 << slots_por_hora) - 1
+    for clave, veces in veces_por_dia_semana.items():
+        mascara = ofrecidos[clave][0]
+        for hora in range(24):
+            cantidad = contar_slots((mascara >> (hora * slots_por_hora)) & todos_de_una_hora)
+            if cantidad:
+                disponibles_por_hora[hora] = disponibles_por_hora.get(hora, 0) + cantidad * veces
+
+    return {
+        "desde": fecha_desde,
+        "hasta": fecha_hasta,
+        "por_medico": por_medico,
+        "horas": [resumen(disponibles, reservados_por_hora.get(hora, 0), hora=hora_desde_minutos(hora * 60))
+                  for hora, disponibles in sorted(disponibles_por_hora.items())],
+    }
@@ -0,0 +1,131 @@
+# -----------------------------------------------------------------
+# Módulo de archivo de Turnos pasados por mes
+# -----------------------------------------------------------------
+# Con el archivo activo (API_ARCHIVAR_TURNOS=1) los turnos de días que ya
+# pasaron salen de la lista en memoria y de turnos.csv y se guardan en
+# segmentos de solo lectura, un CSV por mes ('turnos_archivo_AAAA-MM.csv',
+# con su instantánea binaria). Así la carga, los índices y cada volcado de
+# turnos.csv solo trabajan con los turnos de hoy en adelante.
+#
+# Los segmentos se leen recién cuando una consulta de historial los pide, y
+# los últimos leídos se guardan en memoria mientras el archivo no cambie.
+# Escribir un segmento es idempotente: un turno que ya estaba (por ejemplo,
+# si se cortó un archivado a mitad de camino) no se repite.
+
+from collections import OrderedDict
+from datetime import date
+from modelos.instantanea import cargar_filas
+from modelos.persistencia import escribir_csv_atomico
+from modelos.registros import Turno
+import fnmatch
+import os
+import threading
+
+# Variables globales que usaremos en este módulo
+activo = False
+plantilla_segmento = 'modelos\\turnos_archivo_{mes}.csv'
+campos_turno = ['id_medico', 'id_paciente', 'hora_turno', 'fecha_solicitud']
+segmentos_en_memoria = 12    # Segmentos leídos que se guardan en memoria
+segmentos_leidos = OrderedDict()   # mes 'AAAA-MM' -> (firma del archivo, turnos)
+cerrojo_segmentos = threading.Lock()
+ultimo_dia_archivado = None
+
+#----------------------------------------------------------------------------------------------
+
+# Activa o desactiva el archivo de turnos pasados
+def configurar_archivo_turnos(activar):
+    global activo
+    activo = bool(activar)
+
+#----------------------------------------------------------------------------------------------
+
+# Indica si hay que archivar: el archivo está activo y todavía no se archivó hoy
+def necesita_archivar():
+    return activo and ultimo_dia_archivado != date.today()
+
+#----------------------------------------------------------------------------------------------
+
+# Registra que ya se archivaron los turnos anteriores a 'dia'
+def marcar_archivado(dia):
+    global ultimo_dia_archivado
+    ultimo_dia_archivado = dia
+
+#----------------------------------------------------------------------------------------------
+
+# Mes 'AAAA-MM' de una fecha 'DD-MM-AAAA'
+def mes_de_fecha(fecha_turno):
+    return f"{fecha_turno[6:10]}-{fecha_turno[3:5]}"
+
+#----------------------------------------------------------------------------------------------
+
+# Ruta del segmento de un mes
+def ruta_segmento(mes):
+    return plantilla_segmento.format(mes=mes)
+
+#----------------------------------------------------------------------------------------------
+
+# Meses que tienen segmento en disco, ordenados
+def meses_archivados():
+    directorio, patron = os.path.split(plantilla_segmento.format(mes="*"))
+    prefijo, sufijo = patron.split("*")
+    meses = []
+    for nombre in os.listdir(directorio or "."):
+        if fnmatch.fnmatchcase(nombre, patron):
+            meses.append(nombre[len(prefijo):len(nombre) - len(sufijo)])
+    return sorted(meses)
+
+#----------------------------------------------------------------------------------------------
+
+# Agrega turnos a los segmentos de sus meses, sin repetir los que ya estaban
+def escribir_en_segmentos(turnos):
+    por_mes = {}
+    for turno in turnos:
+        por_mes.setdefault(mes_de_fecha(turno["fecha_solicitud"]), []).append(turno)
+    for mes, nuevos in sorted(por_mes.items()):
+        existentes = leer_segmento(mes)
+        # Un médico no puede tener dos turnos en el mismo horario: eso identifica al turno
+        vistos = {(turno["id_medico"], turno["fecha_solicitud"], turno["hora_turno"]) for turno in existentes}
+        filas = list(existentes)
+        for turno in nuevos:
+            clave = (turno["id_medico"], turno["fecha_solicitud"], turno["hora_turno"])
+            if clave not in vistos:
+                vistos.add(clave)
+                filas.append(turno)
+        if len(filas) > len(existentes):
+            escribir_csv_atomico(ruta_segmento(mes), campos_turno, filas, Turno)
+
+#----------------------------------------------------------------------------------------------
+
+# Turnos de un segmento (lista vacía si el mes no tiene); se reutiliza la lectura mientras el archivo no cambie
+def leer_segmento(mes):
+    ruta = ruta_segmento(mes)
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return []
+    firma = (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+    with cerrojo_segmentos:
+        guardado = segmentos_leidos.get(mes)
+        if guardado is not None and guardado[0] == firma:
+            segmentos_leidos.move_to_end(mes)
+            return guardado[1]
+    turnos = cargar_filas(ruta, Turno)
+    with cerrojo_segmentos:
+        segmentos_leidos[mes] = (firma, turnos)
+        segmentos_leidos.move_to_end(mes)
+        while len(segmentos_leidos) > segmentos_en_memoria:
+            segmentos_leidos.popitem(last=False)
+    return turnos
+
+#----------------------------------------------------------------------------------------------
+
+# Turnos archivados de los meses entre 'mes_desde' y 'mes_hasta' ('AAAA-MM'; None deja abierto ese lado)
+# que cumplen el filtro, en el orden de los segmentos
+def turnos_archivados(mes_desde=None, mes_hasta=None, filtro=None):
+    resultado = []
+    for mes in meses_archivados():
+        if (mes_desde is not None and mes < mes_desde) or (mes_hasta is not None and mes > mes_hasta):
+            continue
+        turnos = leer_segmento(mes)
+        resultado.extend(turnos if filtro is None else (turno for turno in turnos if filtro(turno)))
+    return resultado
@@ -0,0 +1,229 @@
+# -----------------------------------------------------------------
+# Módulo de bitácora (journal) de solo agregado para Turnos
+# -----------------------------------------------------------------
+# Cada alta o baja de un turno se agrega como una línea al final de la
+# bitácora, en lugar de reescribir turnos.csv completo. Cada cierto número
+# de registros se compacta todo en turnos.csv (checkpoint) y se vacía la
+# bitácora, de modo que al iniciar solo hay que reproducir pocos registros.
+
+from datetime import datetime
+import atexit
+import csv
+import os
+import threading
+import time
+
+# Variables globales que usaremos en este módulo
+ruta_archivo_bitacora = 'modelos\\turnos_bitacora.csv'
+ruta_archivo_bitacora_anterior = ruta_archivo_bitacora + '.anterior'  # Bitácora rotada durante un checkpoint
+campo_nombres = ['operacion', 'id_medico', 'id_paciente', 'hora_turno', 'fecha_solicitud']
+politicas_fsync = ["siempre", "periodica", "nunca"]
+
+politica_fsync = "siempre"  # siempre: fsync por registro, periodica: cada intervalo_fsync segundos, nunca: lo decide el sistema operativo
+intervalo_fsync = 1.0       # Segundos entre fsync con la política periódica
+umbral_checkpoint = 1000    # Registros en la bitácora antes de compactar en turnos.csv
+
+archivo_bitacora = None     # Archivo abierto en modo agregado
+cerrojo_bitacora = threading.Lock()  # Ordena agregados y rotaciones entre hilos
+registros_en_bitacora = 0   # Registros escritos desde el último checkpoint
+ultimo_fsync = 0.0
+posicion_bitacora = 0       # Bytes de la bitácora actual ya incluidos en memoria
+inodo_bitacora = None       # Archivo al que corresponde esa posición (cambia al rotar)
+
+#----------------------------------------------------------------------------------------------
+
+# Configura la política de fsync y el umbral de checkpoint de la bitácora
+def configurar_bitacora(politica=None, intervalo=None, umbral=None):
+    global politica_fsync, intervalo_fsync, umbral_checkpoint
+    if politica is not None:
+        if politica not in politicas_fsync:
+            raise ValueError(f"Política de fsync inválida: {politica}. Debe ser una de {politicas_fsync}")
+        politica_fsync = politica
+    if intervalo is not None:
+        intervalo_fsync = float(intervalo)
+    if umbral is not None:
+        umbral_checkpoint = int(umbral)
+
+#----------------------------------------------------------------------------------------------
+
+# Abre la bitácora en modo agregado si todavía no está abierta
+def _abrir_bitacora():
+    global archivo_bitacora
+    if archivo_bitacora is None:
+        nuevo = not os.path.exists(ruta_archivo_bitacora) or os.path.getsize(ruta_archivo_bitacora) == 0
+        # Si una caída dejó la última línea cortada, se termina antes de agregar registros nuevos
+        linea_cortada = False
+        if not nuevo:
+            with open(ruta_archivo_bitacora, 'rb') as archivo:
+                archivo.seek(-1, os.SEEK_END)
+                linea_cortada = archivo.read(1) != b'\n'
+        archivo_bitacora = open(ruta_archivo_bitacora, 'a', newline='', encoding='utf-8')
+        if nuevo:
+            csv.writer(archivo_bitacora).writerow(campo_nombres)
+        elif linea_cortada:
+            archivo_bitacora.write('\r\n')
+    return archivo_bitacora
+
+#----------------------------------------------------------------------------------------------
+
+# Escribe registros al final de la bitácora aplicando la política de fsync
+def _agregar_registros(filas):
+    global registros_en_bitacora, ultimo_fsync
+    with cerrojo_bitacora:
+        archivo = _abrir_bitacora()
+        writer = csv.writer(archivo)
+        writer.writerows(filas)
+        archivo.flush()
+        registros_en_bitacora += len(filas)
+        _recordar_posicion(os.fstat(archivo.fileno()))
+
+        ahora = time.monotonic()
+        if politica_fsync == "siempre" or (politica_fsync == "periodica" and ahora - ultimo_fsync >= intervalo_fsync):
+            os.fsync(archivo.fileno())
+            ultimo_fsync = ahora
+
+#----------------------------------------------------------------------------------------------
+
+# Registra el alta de un turno
+def registrar_alta(turno):
+    registrar_altas([turno])
+
+#----------------------------------------------------------------------------------------------
+
+# Registra el alta de varios turnos con una sola escritura (y un solo fsync)
+def registrar_altas(turnos):
+    _agregar_registros([["alta", turno["id_medico"], turno["id_paciente"], turno["hora_turno"], turno["fecha_solicitud"]] for turno in turnos])
+
+#----------------------------------------------------------------------------------------------
+
+# Registra la baja de los turnos de un paciente con un médico
+def registrar_baja(id_medico, id_paciente):
+    _agregar_registros([["baja", id_medico, id_paciente, "", ""]])
+
+#----------------------------------------------------------------------------------------------
+
+# Indica si la bitácora alcanzó el umbral y conviene compactarla
+def necesita_checkpoint():
+    return registros_en_bitacora >= umbral_checkpoint
+
+#----------------------------------------------------------------------------------------------
+
+# Lee los registros de la bitácora en orden (primero la rotada, si un checkpoint
+# quedó a medias), descartando líneas incompletas
+def leer_bitacora():
+    global registros_en_bitacora
+    registros = []
+    for ruta in (ruta_archivo_bitacora_anterior, ruta_archivo_bitacora):
+        if os.path.exists(ruta):
+            with open(ruta, newline='', encoding='utf-8') as csvfile:
+                registros.extend(_validar_registros(csv.DictReader(csvfile)))
+    registros_en_bitacora = len(registros)
+    if os.path.exists(ruta_archivo_bitacora):
+        _recordar_posicion(os.stat(ruta_archivo_bitacora))
+    else:
+        _recordar_posicion(None)
+    return registros
+
+#----------------------------------------------------------------------------------------------
+
+# Lee los registros que otro proceso agregó a la bitácora desde la última lectura,
+# hasta la última línea completa. Devuelve None si la bitácora fue rotada o
+# truncada: en ese caso hay que volver a cargar turnos.csv y la bitácora enteros.
+def leer_bitacora_nueva():
+    global registros_en_bitacora
+    try:
+        estado = os.stat(ruta_archivo_bitacora)
+    except FileNotFoundError:
+        return [] if posicion_bitacora == 0 else None
+    if inodo_bitacora not in (None, estado.st_ino) or estado.st_size < posicion_bitacora:
+        return None
+
+    with open(ruta_archivo_bitacora, 'rb') as archivo:
+        archivo.seek(posicion_bitacora)
+        datos = archivo.read()
+    fin = datos.rfind(b'\n') + 1
+    lineas = datos[:fin].decode('utf-8').splitlines()
+    # Desde el comienzo del archivo la primera línea es el encabezado
+    if posicion_bitacora == 0:
+        reader = csv.DictReader(lineas)
+    else:
+        reader = csv.DictReader(lineas, fieldnames=campo_nombres)
+    registros = _validar_registros(reader)
+    registros_en_bitacora += len(registros)
+    _recordar_posicion(estado, posicion_bitacora + fin)
+    return registros
+
+#----------------------------------------------------------------------------------------------
+
+# Recuerda hasta qué byte de qué archivo de bitácora está incluido en memoria
+def _recordar_posicion(estado, posicion=None):
+    global posicion_bitacora, inodo_bitacora
+    if estado is None:
+        posicion_bitacora, inodo_bitacora = 0, None
+    else:
+        posicion_bitacora = estado.st_size if posicion is None else posicion
+        inodo_bitacora = estado.st_ino
+
+#----------------------------------------------------------------------------------------------
+
+# Valida los registros leídos de una bitácora y descarta los incompletos o inválidos
+def _validar_registros(reader):
+    registros = []
+    for row in reader:
+        # Una línea cortada por una caída a mitad de escritura no tiene todos los campos
+        if row["operacion"] not in ("alta", "baja") or row["fecha_solicitud"] is None:
+            print(f"Registro incompleto en la bitácora de turnos, se descarta: {row}")
+            continue
+        try:
+            row["id_medico"] = int(row["id_medico"])
+            row["id_paciente"] = int(row["id_paciente"])
+            if row["operacion"] == "alta":
+                datetime.strptime(row["fecha_solicitud"] + " " + row["hora_turno"], "%d-%m-%Y %H:%M")
+        except ValueError:
+            print(f"Registro inválido en la bitácora de turnos, se descarta: {row}")
+            continue
+        registros.append(row)
+    return registros
+
+#----------------------------------------------------------------------------------------------
+
+# Aparta la bitácora actual al comenzar un checkpoint; los registros nuevos van a una bitácora vacía
+def rotar_bitacora():
+    global registros_en_bitacora
+    with cerrojo_bitacora:
+        cerrar_bitacora()
+        if os.path.exists(ruta_archivo_bitacora):
+            if os.path.exists(ruta_archivo_bitacora_anterior):
+                # Un checkpoint anterior no terminó: se juntan ambas para no perder registros
+                with open(ruta_archivo_bitacora, newline='', encoding='utf-8') as origen:
+                    filas = list(csv.reader(origen))[1:]
+                with open(ruta_archivo_bitacora_anterior, 'a', newline='', encoding='utf-8') as destino:
+                    csv.writer(destino).writerows(filas)
+                    destino.flush()
+                    os.fsync(destino.fileno())
+                os.remove(ruta_archivo_bitacora)
+            else:
+                os.replace(ruta_archivo_bitacora, ruta_archivo_bitacora_anterior)
+        registros_en_bitacora = 0
+        _recordar_posicion(None)
+
+#----------------------------------------------------------------------------------------------
+
+# Borra la bitácora rotada una vez que su contenido quedó en turnos.csv
+def descartar_bitacora_anterior():
+    if os.path.exists(ruta_archivo_bitacora_anterior):
+        os.remove(ruta_archivo_bitacora_anterior)
+
+#----------------------------------------------------------------------------------------------
+
+# Sincroniza y cierra la bitácora
+def cerrar_bitacora():
+    global archivo_bitacora
+    if archivo_bitacora is not None:
+        archivo_bitacora.flush()
+        os.fsync(archivo_bitacora.fileno())
+        archivo_bitacora.close()
+        archivo_bitacora = None
+
+# Al terminar el proceso se sincroniza lo que haya quedado pendiente de fsync
+atexit.register(cerrar_bitacora)
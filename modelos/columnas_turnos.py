@@ -0,0 +1,239 @@
+# -----------------------------------------------------------------
+# Módulo de almacenamiento columnar de Turnos (opcional, con NumPy)
+# -----------------------------------------------------------------
+# Con millones de turnos, las consultas por médico recorren listas de
+# Python turno por turno. En modo columnar (API_TURNOS_COLUMNAR=1) los
+# turnos se guardan además como columnas paralelas de NumPy: id_medico,
+# id_paciente, inicio (en los mismos minutos que indice_turnos) y número
+# de alta, ordenadas por (médico, inicio, alta). Los rangos por médico y
+# por fecha se resuelven con búsqueda binaria sobre las columnas, y los
+# filtros y conteos con máscaras vectorizadas.
+#
+# Insertar en un arreglo de NumPy obliga a copiarlo entero, por eso las
+# altas van a listas chicas de agregados por médico y las bajas solo se
+# marcan en la columna 'vivo'. Cuando se acumulan suficientes cambios se compacta todo en
+# columnas nuevas. Las consultas combinan las columnas con los agregados.
+#
+# Las columnas solo indexan: los turnos que se devuelven son los mismos
+# registros de la lista de turnos, en el mismo orden que sin este modo.
+
+try:
+    import numpy
+except ImportError:  # NumPy es opcional: sin él se usan solo los índices de indice_turnos
+    numpy = None
+
+# Variables globales que usaremos en este módulo
+activo = False
+cambios_minimos_compactacion = 1024   # Se compacta al superar este número de cambios...
+proporcion_compactacion = 32          # ...o una parte de este tamaño de los turnos en columnas
+desplazamiento_medico = 33            # Bits que ocupan los minutos de inicio dentro de la clave (alcanza hasta el año 9999)
+
+columna_medico = None      # id_medico de cada turno (int32), ordenada
+columna_paciente = None    # id_paciente de cada turno (int32)
+columna_inicio = None      # Minutos de inicio (int64), ordenados dentro de cada médico
+columna_alta = None        # Número de alta (int64): el orden de la lista de turnos
+columna_vivo = None        # False en los turnos dados de baja desde la última compactación
+columna_clave = None       # (id_medico << desplazamiento_medico) + inicio (int64): ordenada en todo el arreglo
+medicos_columnas = None    # id_medico distintos presentes en las columnas, ordenados
+registros_columnas = None  # Los turnos (arreglo de objetos), en el mismo orden que las columnas
+orden_altas = None         # Posiciones de las columnas ordenadas por (médico, alta)
+posiciones_bajas = []      # Posiciones marcadas como no vivas desde la última compactación
+agregados = {}             # id_medico -> [(inicio, alta, turno)] agregados desde la última compactación
+cantidad_agregados = 0
+siguiente_alta = 0
+
+#----------------------------------------------------------------------------------------------
+
+# Activa o desactiva el modo columnar; sin NumPy queda desactivado. Debe llamarse antes de cargar los turnos
+def configurar_columnas_turnos(activar):
+    global activo
+    if activar and numpy is None:
+        print("NumPy no está instalado: los turnos se guardan sin columnas")
+        activar = False
+    activo = bool(activar)
+    limpiar_columnas()
+
+#----------------------------------------------------------------------------------------------
+
+# Indica si los turnos se consultan por columnas
+def columnas_activas():
+    return activo
+
+#----------------------------------------------------------------------------------------------
+
+# Vacía las columnas y los agregados
+def limpiar_columnas():
+    global cantidad_agregados, siguiente_alta
+    if numpy is not None:
+        _reemplazar_columnas(numpy.empty(0, dtype=numpy.int32), numpy.empty(0, dtype=numpy.int32),
+                             numpy.empty(0, dtype=numpy.int64), numpy.empty(0, dtype=numpy.int64), [])
+    agregados.clear()
+    cantidad_agregados = 0
+    siguiente_alta = 0
+
+#----------------------------------------------------------------------------------------------
+
+# Arma las columnas a partir de la lista de turnos y los minutos de inicio de cada uno
+def reconstruir_columnas(turnos, inicios):
+    global siguiente_alta
+    limpiar_columnas()
+    cantidad = len(turnos)
+    _reemplazar_columnas(
+        numpy.fromiter((turno["id_medico"] for turno in turnos), dtype=numpy.int32, count=cantidad),
+        numpy.fromiter((turno["id_paciente"] for turno in turnos), dtype=numpy.int32, count=cantidad),
+        numpy.fromiter(inicios, dtype=numpy.int64, count=cantidad),
+        numpy.arange(cantidad, dtype=numpy.int64),
+        list(turnos))
+    siguiente_alta = cantidad
+
+#----------------------------------------------------------------------------------------------
+
+# Ordena las columnas por (médico, inicio, alta) y las deja como las columnas vigentes
+def _reemplazar_columnas(medicos, pacientes, inicios, altas, turnos):
+    global columna_medico, columna_paciente, columna_inicio, columna_alta, columna_vivo
+    global columna_clave, medicos_columnas, registros_columnas, orden_altas
+    # lexsort ordena por la última clave primero
+    orden = numpy.lexsort((altas, inicios, medicos))
+    columna_medico = medicos[orden]
+    columna_paciente = pacientes[orden]
+    columna_inicio = inicios[orden]
+    columna_alta = altas[orden]
+    columna_vivo = numpy.ones(len(orden), dtype=bool)
+    columna_clave = (columna_medico.astype(numpy.int64) << desplazamiento_medico) + columna_inicio
+    medicos_columnas = numpy.unique(columna_medico)
+    # fromiter no intenta recorrer los registros como secuencias, como haría numpy.array
+    registros_columnas = numpy.fromiter(turnos, dtype=object, count=len(turnos))[orden]
+    orden_altas = numpy.lexsort((columna_alta, columna_medico))
+    posiciones_bajas.clear()
+
+#----------------------------------------------------------------------------------------------
+
+# Pasa a columnas los agregados y descarta las bajas
+def compactar_columnas():
+    global cantidad_agregados
+    vivos = numpy.flatnonzero(columna_vivo)
+    nuevos = [agregado for lista in agregados.values() for agregado in lista]
+    turnos = registros_columnas[vivos].tolist() + [turno for _, _, turno in nuevos]
+    _reemplazar_columnas(
+        numpy.concatenate((columna_medico[vivos], numpy.array([turno["id_medico"] for _, _, turno in nuevos], dtype=numpy.int32))),
+        numpy.concatenate((columna_paciente[vivos], numpy.array([turno["id_paciente"] for _, _, turno in nuevos], dtype=numpy.int32))),
+        numpy.concatenate((columna_inicio[vivos], numpy.array([inicio for inicio, _, _ in nuevos], dtype=numpy.int64))),
+        numpy.concatenate((columna_alta[vivos], numpy.array([alta for _, alta, _ in nuevos], dtype=numpy.int64))),
+        turnos)
+    agregados.clear()
+    cantidad_agregados = 0
+
+#----------------------------------------------------------------------------------------------
+
+# Compacta si los agregados y las bajas ya pesan en las consultas
+def _compactar_si_corresponde():
+    cambios = cantidad_agregados + len(posiciones_bajas)
+    if cambios > max(cambios_minimos_compactacion, len(registros_columnas) // proporcion_compactacion):
+        compactar_columnas()
+
+#----------------------------------------------------------------------------------------------
+
+# Agrega un turno nuevo (al final del orden de altas)
+def agregar_turno_columnas(turno, inicio):
+    global cantidad_agregados, siguiente_alta
+    agregados.setdefault(turno["id_medico"], []).append((inicio, siguiente_alta, turno))
+    cantidad_agregados += 1
+    siguiente_alta += 1
+    _compactar_si_corresponde()
+
+#----------------------------------------------------------------------------------------------
+
+# Quita un turno; se busca por médico e inicio y se compara por identidad
+def quitar_turno_columnas(turno, inicio):
+    global cantidad_agregados
+    de_medico = agregados.get(turno["id_medico"], [])
+    for posicion, agregado in enumerate(de_medico):
+        if agregado[2] is turno:
+            del de_medico[posicion]
+            cantidad_agregados -= 1
+            return
+    inicio_medico, fin_medico = _rango_medico(turno["id_medico"])
+    posicion = inicio_medico + int(numpy.searchsorted(columna_inicio[inicio_medico:fin_medico], inicio, side="left"))
+    while posicion < fin_medico and columna_inicio[posicion] == inicio:
+        if registros_columnas[posicion] is turno:
+            columna_vivo[posicion] = False
+            posiciones_bajas.append(posicion)
+            _compactar_si_corresponde()
+            return
+        posicion += 1
+
+#----------------------------------------------------------------------------------------------
+
+# Posiciones [inicio, fin) de las columnas que ocupan los turnos de un médico
+def _rango_medico(id_medico):
+    # Se busca con el mismo tipo de la columna: con un int de Python NumPy convertiría la columna entera
+    id_medico = columna_medico.dtype.type(id_medico)
+    return (int(numpy.searchsorted(columna_medico, id_medico, side="left")),
+            int(numpy.searchsorted(columna_medico, id_medico, side="right")))
+
+#----------------------------------------------------------------------------------------------
+
+# Turnos de un médico en el orden de la lista de turnos (orden de alta)
+def turnos_de_medico_columnas(id_medico):
+    inicio_medico, fin_medico = _rango_medico(id_medico)
+    # orden_altas también está agrupado por médico: el mismo rango tiene sus turnos por alta
+    posiciones = orden_altas[inicio_medico:fin_medico]
+    resultado = registros_columnas[posiciones[columna_vivo[posiciones]]].tolist()
+    # Los agregados siempre son altas posteriores a las de las columnas
+    resultado.extend(turno for _, _, turno in agregados.get(id_medico, ()))
+    return resultado
+
+#----------------------------------------------------------------------------------------------
+
+# Turnos de un médico con inicio en [desde, hasta), en orden cronológico (y de alta si empatan).
+# Sin 'desde' o sin 'hasta' el rango queda abierto de ese lado
+def turnos_de_medico_entre_columnas(id_medico, desde=None, hasta=None):
+    inicio_medico, fin_medico = _rango_medico(id_medico)
+    inicios = columna_inicio[inicio_medico:fin_medico]
+    primera = 0 if desde is None else int(numpy.searchsorted(inicios, desde, side="left"))
+    ultima = len(inicios) if hasta is None else int(numpy.searchsorted(inicios, hasta, side="left"))
+    rango = slice(inicio_medico + primera, inicio_medico + ultima)
+    vivos = columna_vivo[rango]
+    resultado = registros_columnas[rango][vivos].tolist()
+
+    extras = [agregado for agregado in agregados.get(id_medico, ())
+              if (desde is None or agregado[0] >= desde) and (hasta is None or agregado[0] < hasta)]
+    if not extras:
+        return resultado
+    # Se intercalan los agregados (pocos) con los turnos de las columnas. Sus altas son posteriores,
+    # así que con el mismo inicio van después: se insertan a la derecha, de atrás hacia adelante
+    extras.sort()
+    inicios_vivos = columna_inicio[rango][vivos]
+    posiciones = numpy.searchsorted(inicios_vivos, [inicio for inicio, _, _ in extras], side="right").tolist()
+    for posicion, (_, _, turno) in zip(reversed(posiciones), reversed(extras)):
+        resultado.insert(posicion, turno)
+    return resultado
+
+#----------------------------------------------------------------------------------------------
+
+# Cantidad de turnos de cada médico con inicio en [desde, hasta): {id_medico: cantidad}
+def contar_por_medico_columnas(desde=None, hasta=None):
+    # La clave está ordenada en todo el arreglo: dos búsquedas vectorizadas dan el rango de cada médico
+    base = medicos_columnas.astype(numpy.int64) << desplazamiento_medico
+    primeras = numpy.searchsorted(columna_clave, base + (0 if desde is None else desde), side="left")
+    ultimas = numpy.searchsorted(columna_clave, base + ((1 << desplazamiento_medico) if hasta is None else hasta),
+                                 side="left")
+    cantidades = ultimas - primeras
+    if posiciones_bajas:
+        # Se descuentan las bajas que caen en el rango
+        bajas = numpy.array(posiciones_bajas, dtype=numpy.int64)
+        inicios = columna_inicio[bajas]
+        mascara = numpy.ones(len(bajas), dtype=bool)
+        if desde is not None:
+            mascara &= inicios >= desde
+        if hasta is not None:
+            mascara &= inicios < hasta
+        indices_medico = numpy.searchsorted(medicos_columnas, columna_medico[bajas][mascara])
+        cantidades -= numpy.bincount(indices_medico, minlength=len(medicos_columnas))
+    conteo = {id_medico: cantidad for id_medico, cantidad in zip(medicos_columnas.tolist(), cantidades.tolist())
+              if cantidad}
+    for id_medico, lista in agregados.items():
+        for inicio, _, _ in lista:
+            if (desde is None or inicio >= desde) and (hasta is None or inicio < hasta):
+                conteo[id_medico] = conteo.get(id_medico, 0) + 1
+    return conteo
@@ -0,0 +1,116 @@
+# -----------------------------------------------------------------
+# Módulo de cerrojos para acceso concurrente a las colecciones
+# -----------------------------------------------------------------
+# Cada colección en memoria tiene un cerrojo de lectura/escritura: las
+# lecturas corren en paralelo entre sí y una escritura espera a que no
+# haya lectores. Las funciones de los modelos que modifican una colección
+# toman su cerrojo de escritura; las rutas GET toman los de lectura de las
+# colecciones que usan mientras arman la respuesta.
+#
+# Para reservar turnos se usan además cerrojos por médico repartidos en
+# franjas: la validación y el alta de un turno se hacen con la franja del
+# médico tomada, así dos solicitudes no pueden reservar el mismo horario,
+# y las reservas de médicos distintos no se esperan entre sí.
+
+import contextlib
+import os
+import threading
+
+# Variables globales que usaremos en este módulo
+cantidad_franjas = 64  # Cantidad de cerrojos entre los que se reparten los médicos
+
+#----------------------------------------------------------------------------------------------
+
+# Cerrojo de lectura/escritura. Con escritores esperando no entran lectores
+# nuevos, así una ráfaga de lecturas no deja a las escrituras sin turno.
+# No es reentrante: quien tiene el cerrojo no debe volver a pedirlo.
+class CerrojoLecturaEscritura:
+    def __init__(self):
+        self.condicion = threading.Condition(threading.Lock())
+        self.lectores = 0
+        self.escribiendo = False
+        self.escritores_esperando = 0
+
+    def adquirir_lectura(self):
+        with self.condicion:
+            while self.escribiendo or self.escritores_esperando:
+                self.condicion.wait()
+            self.lectores += 1
+
+    def liberar_lectura(self):
+        with self.condicion:
+            self.lectores -= 1
+            if self.lectores == 0:
+                self.condicion.notify_all()
+
+    def adquirir_escritura(self):
+        with self.condicion:
+            self.escritores_esperando += 1
+            while self.escribiendo or self.lectores:
+                self.condicion.wait()
+            self.escritores_esperando -= 1
+            self.escribiendo = True
+
+    def liberar_escritura(self):
+        with self.condicion:
+            self.escribiendo = False
+            self.condicion.notify_all()
+
+cerrojos_colecciones = {nombre: CerrojoLecturaEscritura() for nombre in ["medicos", "pacientes", "agenda", "turnos"]}
+franjas_medicos = [threading.Lock() for _ in range(cantidad_franjas)]
+
+#----------------------------------------------------------------------------------------------
+
+# Toma los cerrojos de lectura de las colecciones indicadas, siempre en el mismo orden
+@contextlib.contextmanager
+def lectura(*nombres):
+    cerrojos = [cerrojos_colecciones[nombre] for nombre in sorted(set(nombres))]
+    tomados = []
+    try:
+        for cerrojo in cerrojos:
+            cerrojo.adquirir_lectura()
+            tomados.append(cerrojo)
+        yield
+    finally:
+        for cerrojo in reversed(tomados):
+            cerrojo.liberar_lectura()
+
+#----------------------------------------------------------------------------------------------
+
+# Toma el cerrojo de escritura de una colección
+@contextlib.contextmanager
+def escritura(nombre):
+    cerrojo = cerrojos_colecciones[nombre]
+    cerrojo.adquirir_escritura()
+    try:
+        yield
+    finally:
+        cerrojo.liberar_escritura()
+
+#----------------------------------------------------------------------------------------------
+
+# Toma las franjas de los médicos indicados, en orden de franja para no bloquearse entre sí
+@contextlib.contextmanager
+def cerrojo_medicos(*ids_medicos):
+    franjas = sorted({hash(id_medico) % cantidad_franjas for id_medico in ids_medicos})
+    tomadas = []
+    try:
+        for franja in franjas:
+            franjas_medicos[franja].acquire()
+            tomadas.append(franja)
+        yield
+    finally:
+        for franja in reversed(tomadas):
+            franjas_medicos[franja].release()
+
+#----------------------------------------------------------------------------------------------
+
+# Crea de nuevo todos los cerrojos. En el hijo de un fork solo sobrevive el hilo que
+# hizo el fork: un cerrojo que otro hilo tenía tomado no se liberaría nunca
+def reiniciar_cerrojos():
+    for nombre in cerrojos_colecciones:
+        cerrojos_colecciones[nombre] = CerrojoLecturaEscritura()
+    franjas_medicos[:] = [threading.Lock() for _ in range(cantidad_franjas)]
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reiniciar_cerrojos)
@@ -0,0 +1,196 @@
+# -----------------------------------------------------------------
+# Módulo de disponibilidad de turnos
+# -----------------------------------------------------------------
+# Los horarios de un día se representan con máscaras de bits de 96
+# posiciones, una por cada horario de 15 minutos (el bit 36 es las 09:00):
+#  - para cada médico y día de la semana, los horarios que admite su agenda;
+#  - para cada médico y fecha, los horarios que ya tienen turno.
+# Las dos se mantienen con cada cambio de agenda y con cada alta o baja de
+# turno, así validar un horario o listar los libres de una fecha son unas
+# pocas operaciones de bits, sin recorrer la agenda ni los turnos.
+
+from datetime import date, datetime, timedelta
+from modelos.repositorio import delegable
+import functools
+
+# Variables globales que usaremos en este módulo
+dias_ventana = 30    # Días hacia adelante en los que se puede reservar
+minutos_slot = 15    # Duración de cada turno
+permitidos = {}          # (id_medico, dia_numero) -> máscara de los horarios que admite la agenda
+ocupados_por_medico = {} # id_medico -> {fecha 'DD-MM-AAAA': máscara de los horarios con turno}
+
+#----------------------------------------------------------------------------------------------
+
+# Convierte una hora 'HH:MM' a minutos del día
+def minutos_del_dia(hora):
+    horas, minutos = hora.split(':')
+    return int(horas) * 60 + int(minutos)
+
+#----------------------------------------------------------------------------------------------
+
+# Convierte minutos del día a una hora 'HH:MM'
+def hora_desde_minutos(minutos):
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+#----------------------------------------------------------------------------------------------
+
+# Minutos de los turnos que admite un horario: múltiplos de 15 estrictamente
+# entre la hora de inicio y la de fin, igual que la validación al crear un turno
+def slots_del_horario(minuto_inicio, minuto_fin):
+    primero = (minuto_inicio // minutos_slot + 1) * minutos_slot
+    return range(primero, minuto_fin, minutos_slot)
+
+#----------------------------------------------------------------------------------------------
+
+# Fechas de la ventana de reserva, de hoy a hoy + dias_ventana
+def fechas_ventana(hoy=None):
+    hoy = hoy or date.today()
+    return [hoy + timedelta(days=i) for i in range(dias_ventana + 1)]
+
+#----------------------------------------------------------------------------------------------
+
+# Número de día de la agenda (0 = domingo) de una fecha, igual que strftime('%w')
+def dia_numero_de_fecha(fecha):
+    return (fecha.weekday() + 1) % 7
+
+#----------------------------------------------------------------------------------------------
+
+# Número de día de la agenda de una fecha 'DD-MM-AAAA'. Se memoriza: muchos turnos comparten fecha
+@functools.lru_cache(maxsize=4096)
+def dia_numero_de_texto(fecha_turno):
+    return dia_numero_de_fecha(datetime.strptime(fecha_turno, "%d-%m-%Y").date())
+
+#----------------------------------------------------------------------------------------------
+
+# Bit del horario de una hora 'HH:MM', o 0 si la hora no cae justo en un horario de 15 minutos
+@functools.lru_cache(maxsize=1440)
+def bit_de_hora(hora_turno):
+    minuto = minutos_del_dia(hora_turno)
+    if minuto % minutos_slot or not 0 <= minuto < 24 * 60:
+        return 0
+    return 1 << (minuto // minutos_slot)
+
+#----------------------------------------------------------------------------------------------
+
+# Máscara de los horarios que admite un horario de la agenda
+def mascara_del_horario(hora_inicio, hora_fin):
+    mascara = 0
+    for minuto in slots_del_horario(minutos_del_dia(hora_inicio), min(minutos_del_dia(hora_fin), 24 * 60)):
+        mascara |= 1 << (minuto // minutos_slot)
+    return mascara
+
+#----------------------------------------------------------------------------------------------
+
+# Carga las máscaras de la agenda completa
+def cargar_horarios(agenda):
+    permitidos.clear()
+    for horario in agenda:
+        permitidos[(horario["id_medico"], horario["dia_numero"])] = mascara_del_horario(horario["hora_inicio"], horario["hora_fin"])
+
+#----------------------------------------------------------------------------------------------
+
+# Registra el alta o el cambio de horario de un médico para un día de la semana
+def actualizar_horario(id_medico, dia_numero, hora_inicio, hora_fin):
+    permitidos[(id_medico, dia_numero)] = mascara_del_horario(hora_inicio, hora_fin)
+
+#----------------------------------------------------------------------------------------------
+
+# Registra que un médico ya no atiende un día de la semana
+def quitar_horario(id_medico, dia_numero):
+    permitidos.pop((id_medico, dia_numero), None)
+
+#----------------------------------------------------------------------------------------------
+
+# Carga las máscaras de horarios ocupados a partir de la lista completa de turnos
+def cargar_ocupados(turnos):
+    ocupados_por_medico.clear()
+    for turno in turnos:
+        ocupar_slot(turno["id_medico"], turno["fecha_solicitud"], turno["hora_turno"])
+
+#----------------------------------------------------------------------------------------------
+
+# Marca como ocupado el horario de un turno nuevo
+def ocupar_slot(id_medico, fecha_turno, hora_turno):
+    bit = bit_de_hora(hora_turno)
+    if bit:
+        ocupados = ocupados_por_medico.setdefault(id_medico, {})
+        ocupados[fecha_turno] = ocupados.get(fecha_turno, 0) | bit
+
+#----------------------------------------------------------------------------------------------
+
+# Vuelve a marcar como libre el horario de un turno eliminado
+def liberar_slot(id_medico, fecha_turno, hora_turno):
+    ocupados = ocupados_por_medico.get(id_medico)
+    if not ocupados or fecha_turno not in ocupados:
+        return
+    mascara = ocupados[fecha_turno] & ~bit_de_hora(hora_turno)
+    if mascara:
+        ocupados[fecha_turno] = mascara
+    else:
+        # No se guardan fechas sin turnos
+        del ocupados[fecha_turno]
+        if not ocupados:
+            del ocupados_por_medico[id_medico]
+
+#----------------------------------------------------------------------------------------------
+
+# Indica si la agenda del médico admite un turno a esa hora en ese día de la semana
+def slot_permitido(id_medico, dia_numero, hora_turno):
+    return bool(permitidos.get((id_medico, dia_numero), 0) & bit_de_hora(hora_turno))
+
+#----------------------------------------------------------------------------------------------
+
+# Indica si el médico ya tiene un turno a esa hora en esa fecha
+def slot_ocupado(id_medico, fecha_turno, hora_turno):
+    return bool(ocupados_por_medico.get(id_medico, {}).get(fecha_turno, 0) & bit_de_hora(hora_turno))
+
+#----------------------------------------------------------------------------------------------
+
+# Máscaras de los horarios con turno de cada médico en las fechas 'DD-MM-AAAA' dadas:
+# {id_medico: {fecha: máscara}}. Son las que ya mantienen las altas y bajas: no se recorren los turnos
+@delegable
+def obtener_ocupados_en_fechas(fechas_turno):
+    resultado = {}
+    for id_medico, ocupados in ocupados_por_medico.items():
+        de_medico = {fecha_turno: ocupados[fecha_turno] for fecha_turno in fechas_turno if fecha_turno in ocupados}
+        if de_medico:
+            resultado[id_medico] = de_medico
+    return resultado
+
+#----------------------------------------------------------------------------------------------
+
+# Cantidad de horarios de una máscara
+def contar_slots(mascara):
+    return bin(mascara).count("1")
+#----------------------------------------------------------------------------------------------
+
+# Horas 'HH:MM' de los bits encendidos de una máscara, en orden
+def horas_de_mascara(mascara):
+    horas = []
+    while mascara:
+        bit = mascara & -mascara
+        horas.append(hora_desde_minutos((bit.bit_length() - 1) * minutos_slot))
+        mascara ^= bit
+    return horas
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene los horarios libres de un médico para cada día que atiende dentro de la ventana de reserva
+@delegable
+def obtener_disponibilidad(id_medico):
+    ahora = datetime.now()
+    # Hoy solo cuentan los horarios que todavía no pasaron: se apagan los bits hasta el minuto actual
+    pasados_hoy = (1 << ((ahora.hour * 60 + ahora.minute) // minutos_slot + 1)) - 1
+    ocupados = ocupados_por_medico.get(id_medico, {})
+
+    disponibilidad = []
+    for fecha in fechas_ventana(ahora.date()):
+        permitidos_del_dia = permitidos.get((id_medico, dia_numero_de_fecha(fecha)))
+        if permitidos_del_dia is None:
+            continue  # El médico no atiende ese día
+        fecha_turno = fecha.strftime("%d-%m-%Y")
+        libres = permitidos_del_dia & ~ocupados.get(fecha_turno, 0)
+        if fecha == ahora.date():
+            libres &= ~pasados_hoy
+        disponibilidad.append({"fecha": fecha_turno, "horas": horas_de_mascara(libres)})
+    return disponibilidad
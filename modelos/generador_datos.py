@@ -0,0 +1,302 @@
+# -----------------------------------------------------------------
+# Generador local y determinístico de datos sintéticos
+# -----------------------------------------------------------------
+# Genera médicos, pacientes, agendas y turnos con los mismos campos que
+# crear_archivo_medicos / crear_archivo_pacientes, sin consultar ninguna API.
+# Con la misma semilla (y la misma fecha de referencia) siempre produce los
+# mismos archivos. Los datos respetan las validaciones de la API: DNI de 8
+# dígitos, matrícula de 6, nombre y apellido de médico únicos, y turnos en
+# días y horarios de la agenda, en intervalos de 15 minutos, dentro de la
+# ventana de reserva y sin dos turnos de un paciente con el mismo médico.
+#
+# Los archivos se escriben fila por fila, así se pueden generar tamaños como
+# 10.000 médicos, 1.000.000 de pacientes y 10.000.000 de turnos:
+#
+#   python -m modelos.generador_datos --medicos 10000 --pacientes 1000000 --turnos 10000000 --semilla 42
+
+from modelos.persistencia import escribir_csv_atomico
+from modelos.disponibilidad import dias_ventana, dia_numero_de_fecha, hora_desde_minutos
+from datetime import datetime, timedelta
+import argparse
+import os
+import random
+import unicodedata
+
+# Variables globales que usaremos en este módulo
+datos_sinteticos = False  # Si es True, los CSV que faltan se generan localmente en lugar de pedirlos a la API
+semilla_sintetica = 1
+
+campos_medicos = ['id', 'dni', 'nombre', 'apellido', 'matricula', 'telefono', 'email', 'habilitado']
+campos_pacientes = ['id', 'dni', 'nombre', 'apellido', 'telefono', 'email', 'dir_calle', 'dir_numero']
+campos_agenda = ['id_medico', 'dia_numero', 'hora_inicio', 'hora_fin', 'fecha_actualizacion']
+campos_turnos = ['id_medico', 'id_paciente', 'hora_turno', 'fecha_solicitud']
+
+nombres = [
+    "Adrián", "Agustín", "Alba", "Alberto", "Alejandra", "Alejandro", "Alicia", "Álvaro", "Amparo", "Ana",
+    "Andrea", "Andrés", "Ángel", "Antonia", "Antonio", "Ariadna", "Beatriz", "Benjamín", "Blanca", "Bruno",
+    "Camila", "Carla", "Carlos", "Carmen", "Catalina", "Cecilia", "Clara", "Claudia", "Cristina", "Daniel",
+    "Daniela", "David", "Diego", "Dolores", "Eduardo", "Elena", "Elías", "Emilia", "Emilio", "Enrique",
+    "Esteban", "Eva", "Federico", "Felipe", "Fernanda", "Fernando", "Francisco", "Gabriel", "Gabriela", "Gloria",
+    "Gonzalo", "Guillermo", "Hugo", "Ignacio", "Inés", "Irene", "Isabel", "Iván", "Jaime", "Javier",
+    "Jimena", "Joaquín", "Jorge", "José", "Josefa", "Juan", "Julia", "Julián", "Laura", "Leonardo",
+    "Lorena", "Lucas", "Lucía", "Luis", "Manuel", "Marcos", "Margarita", "María", "Mariana", "Mario",
+    "Marta", "Martín", "Mateo", "Miguel", "Mónica", "Natalia", "Nicolás", "Noelia", "Olga", "Óscar",
+    "Pablo", "Paula", "Pedro", "Pilar", "Rafael", "Ramón", "Raquel", "Ricardo", "Roberto", "Rocío",
+    "Rodrigo", "Rosa", "Rubén", "Samuel", "Santiago", "Sara", "Sergio", "Silvia", "Sofía", "Teresa",
+    "Tomás", "Valentina", "Valeria", "Vicente", "Víctor", "Virginia", "Ximena", "Yolanda",
+]
+apellidos = [
+    "Acosta", "Aguilar", "Aguirre", "Alonso", "Álvarez", "Arias", "Benítez", "Blanco", "Bravo", "Caballero",
+    "Cabrera", "Calvo", "Campos", "Cano", "Carmona", "Carrasco", "Castillo", "Castro", "Cortés", "Crespo",
+    "Cruz", "Delgado", "Díaz", "Díez", "Domínguez", "Durán", "Esteban", "Fernández", "Ferrer", "Flores",
+    "Fuentes", "Gallardo", "Gallego", "García", "Garrido", "Gil", "Giménez", "Gómez", "González", "Guerrero",
+    "Gutiérrez", "Hernández", "Herrera", "Herrero", "Hidalgo", "Ibáñez", "Iglesias", "Jiménez", "León", "López",
+    "Lorenzo", "Lozano", "Marín", "Márquez", "Martín", "Martínez", "Medina", "Méndez", "Molina", "Montero",
+    "Mora", "Morales", "Moreno", "Muñoz", "Navarro", "Nieto", "Núñez", "Ortega", "Ortiz", "Pascual",
+    "Pastor", "Peña", "Pérez", "Prieto", "Ramírez", "Ramos", "Reyes", "Rodríguez", "Román", "Romero",
+    "Rubio", "Ruiz", "Sáez", "Sánchez", "Santana", "Santiago", "Santos", "Sanz", "Serrano", "Soler",
+    "Soto", "Suárez", "Torres", "Vargas", "Vázquez", "Vega", "Velasco", "Vicente", "Vidal", "Zamora",
+]
+calles = [
+    "Calle Mayor", "Calle de Alcalá", "Gran Vía", "Paseo de la Castellana", "Calle del Barquillo",
+    "Avenida de América", "Calle de Serrano", "Paseo de Extremadura", "Calle de Atocha", "Ronda de Valencia",
+    "Calle de la Princesa", "Avenida del Puerto", "Calle de San Bernardo", "Plaza de España", "Calle Real",
+    "Avenida de la Constitución", "Calle de Goya", "Calle del Carmen", "Camino Viejo", "Calle Nueva",
+]
+dias_historial_maximo = 3650  # Días hacia atrás que se agregan como máximo para que entren los turnos
+horas_inicio = [7 * 60, 8 * 60, 8 * 60, 9 * 60, 10 * 60, 13 * 60, 14 * 60]  # Minutos; las 8 es la más común
+
+#----------------------------------------------------------------------------------------------
+
+# Activa la generación local de los CSV que faltan al iniciar, con la semilla indicada
+def configurar_datos_sinteticos(activo, semilla=None):
+    global datos_sinteticos, semilla_sintetica
+    datos_sinteticos = bool(activo)
+    if semilla is not None:
+        semilla_sintetica = int(semilla)
+
+#----------------------------------------------------------------------------------------------
+
+# Indica si los CSV que faltan se generan localmente
+def usa_datos_sinteticos():
+    return datos_sinteticos
+
+#----------------------------------------------------------------------------------------------
+
+# Escribe un archivo de médicos sintéticos con la semilla configurada, en lugar de pedirlos a la API
+def crear_archivo_medicos_sinteticos(ruta, cantidad):
+    escribir_csv_atomico(ruta, campos_medicos, generar_medicos(cantidad, semilla_sintetica))
+
+#----------------------------------------------------------------------------------------------
+
+# Escribe un archivo de pacientes sintéticos con la semilla configurada, en lugar de pedirlos a la API
+def crear_archivo_pacientes_sinteticos(ruta, cantidad):
+    escribir_csv_atomico(ruta, campos_pacientes, generar_pacientes(cantidad, semilla_sintetica))
+
+#----------------------------------------------------------------------------------------------
+
+# Generador de números aleatorios propio de cada colección: agregar pacientes
+# no cambia los médicos generados con la misma semilla
+def _aleatorio(semilla, coleccion):
+    return random.Random(f"{semilla}-{coleccion}")
+
+#----------------------------------------------------------------------------------------------
+
+# Texto sin tildes y en minúsculas, para armar emails
+def _sin_tildes(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode().lower()
+
+#----------------------------------------------------------------------------------------------
+
+# Teléfono de 9 dígitos
+def _telefono(aleatorio):
+    return str(aleatorio.choice("679")) + str(aleatorio.randrange(10 ** 8)).zfill(8)
+
+#----------------------------------------------------------------------------------------------
+
+# Genera los médicos. El nombre y apellido de cada uno, el DNI y la matrícula son únicos,
+# como exige el alta de médicos. 'habilitados' es la proporción de médicos habilitados
+def generar_medicos(cantidad, semilla=1, habilitados=0.9):
+    combinaciones = len(nombres) * len(apellidos)
+    if cantidad > combinaciones:
+        raise ValueError(f"Se pueden generar como máximo {combinaciones} médicos con nombre y apellido distintos")
+    aleatorio = _aleatorio(semilla, "medicos")
+    nombres_completos = aleatorio.sample(range(combinaciones), cantidad)
+    dnis = aleatorio.sample(range(10_000_000, 100_000_000), cantidad)
+    matriculas = aleatorio.sample(range(100_000, 1_000_000), cantidad)
+    for indice in range(cantidad):
+        nombre = nombres[nombres_completos[indice] // len(apellidos)]
+        apellido = apellidos[nombres_completos[indice] % len(apellidos)]
+        yield {
+            'id': indice + 1,
+            'dni': str(dnis[indice]),
+            'nombre': nombre,
+            'apellido': apellido,
+            'matricula': matriculas[indice],
+            'telefono': _telefono(aleatorio),
+            'email': f"{_sin_tildes(nombre)}.{_sin_tildes(apellido)}@example.com",
+            'habilitado': aleatorio.random() < habilitados
+        }
+
+#----------------------------------------------------------------------------------------------
+
+# Genera los pacientes, con DNI único
+def generar_pacientes(cantidad, semilla=1):
+    aleatorio = _aleatorio(semilla, "pacientes")
+    dnis = aleatorio.sample(range(10_000_000, 100_000_000), cantidad)
+    for indice in range(cantidad):
+        nombre = aleatorio.choice(nombres)
+        apellido = aleatorio.choice(apellidos)
+        yield {
+            'id': indice + 1,
+            'dni': str(dnis[indice]),
+            'nombre': nombre,
+            'apellido': apellido,
+            'telefono': _telefono(aleatorio),
+            'email': f"{_sin_tildes(nombre)}.{_sin_tildes(apellido)}@example.com",
+            'dir_calle': aleatorio.choice(calles),
+            'dir_numero': str(aleatorio.randint(1, 4000))
+        }
+
+#----------------------------------------------------------------------------------------------
+
+# Genera la agenda de los médicos habilitados: entre 3 y 6 días por semana,
+# con un horario de 4 a 9 horas que empieza a una hora en punto
+def generar_agenda(medicos, semilla=1, hoy=None):
+    aleatorio = _aleatorio(semilla, "agenda")
+    fecha_actualizacion = (hoy or datetime.now().date()).strftime("%d-%m-%Y")
+    for medico in medicos:
+        if not medico['habilitado']:
+            continue
+        for dia_numero in sorted(aleatorio.sample(range(7), aleatorio.randint(3, 6))):
+            inicio = aleatorio.choice(horas_inicio)
+            fin = inicio + aleatorio.randint(4, 9) * 60
+            yield {
+                'id_medico': medico['id'],
+                'dia_numero': dia_numero,
+                'hora_inicio': hora_desde_minutos(inicio),
+                'hora_fin': hora_desde_minutos(fin),
+                'fecha_actualizacion': fecha_actualizacion
+            }
+
+#----------------------------------------------------------------------------------------------
+
+# Horarios que se pueden reservar en un día de agenda: cada 15 minutos, estrictamente
+# entre el inicio y el fin, como los acepta la validación de turnos
+def _horarios_reservables(horario):
+    horas, minutos = horario['hora_inicio'].split(':')
+    inicio = int(horas) * 60 + int(minutos)
+    horas, minutos = horario['hora_fin'].split(':')
+    fin = int(horas) * 60 + int(minutos)
+    return [hora_desde_minutos(minuto) for minuto in range(inicio + 15, fin, 15)]
+
+#----------------------------------------------------------------------------------------------
+
+# Genera exactamente 'cantidad' turnos (o todos los horarios que haya, si son menos) repartidos
+# al azar entre los horarios reservables de los próximos dias_ventana días, más 'dias_historial'
+# días anteriores a 'hoy' (turnos ya pasados). Sin 'dias_historial' se agregan los días anteriores
+# justos para que entren todos los turnos. Cada horario se elige con probabilidad
+# (faltan / quedan), así no hace falta tener todos los horarios en memoria
+def generar_turnos(agenda, cantidad_pacientes, cantidad, semilla=1, hoy=None, dias_historial=None):
+    aleatorio = _aleatorio(semilla, "turnos")
+    hoy = hoy or datetime.now().date()
+
+    # Horarios reservables por médico y día de la semana
+    horarios_por_medico = {}
+    horarios_por_dia_semana = [0] * 7
+    for horario in agenda:
+        reservables = _horarios_reservables(horario)
+        horarios_por_medico.setdefault(horario['id_medico'], {})[horario['dia_numero']] = reservables
+        horarios_por_dia_semana[horario['dia_numero']] += len(reservables)
+
+    if dias_historial is None:
+        dias_historial = 0
+        capacidad = sum(horarios_por_dia_semana[dia_numero_de_fecha(hoy + timedelta(days=dias))] for dias in range(dias_ventana + 1))
+        while capacidad < cantidad and any(horarios_por_dia_semana) and dias_historial < dias_historial_maximo:
+            dias_historial += 1
+            capacidad += horarios_por_dia_semana[dia_numero_de_fecha(hoy - timedelta(days=dias_historial))]
+        if dias_historial:
+            print(f"Se agregan turnos de los {dias_historial} días anteriores para llegar a {cantidad}")
+    fechas = [hoy + timedelta(days=dias) for dias in range(-dias_historial, dias_ventana + 1)]
+
+    quedan = sum(len(dias.get(dia_numero_de_fecha(fecha), ())) for dias in horarios_por_medico.values() for fecha in fechas)
+    if cantidad > quedan:
+        print(f"Solo hay {quedan} horarios reservables; se generan {quedan} turnos en lugar de {cantidad}")
+    faltan = min(cantidad, quedan)
+
+    for id_medico in sorted(horarios_por_medico):
+        dias = horarios_por_medico[id_medico]
+        pacientes_del_medico = set()  # Un paciente no puede tener dos turnos con el mismo médico
+        for fecha in fechas:
+            fecha_turno = fecha.strftime("%d-%m-%Y")
+            for hora_turno in dias.get(dia_numero_de_fecha(fecha), ()):
+                elegido = aleatorio.random() * quedan < faltan
+                quedan -= 1
+                if not elegido or len(pacientes_del_medico) >= cantidad_pacientes:
+                    continue
+                id_paciente = aleatorio.randint(1, cantidad_pacientes)
+                while id_paciente in pacientes_del_medico:
+                    id_paciente = aleatorio.randint(1, cantidad_pacientes)
+                pacientes_del_medico.add(id_paciente)
+                faltan -= 1
+                yield {
+                    'id_medico': id_medico,
+                    'id_paciente': id_paciente,
+                    'hora_turno': hora_turno,
+                    'fecha_solicitud': fecha_turno
+                }
+
+#----------------------------------------------------------------------------------------------
+
+# Genera y escribe los cuatro archivos. 'rutas' indica el archivo de cada colección
+# (medicos, pacientes, agenda, turnos)
+def generar_archivos(rutas, cantidad_medicos, cantidad_pacientes, cantidad_turnos, semilla=1,
+                     habilitados=0.9, hoy=None, dias_historial=None):
+    medicos = list(generar_medicos(cantidad_medicos, semilla, habilitados))
+    escribir_csv_atomico(rutas["medicos"], campos_medicos, medicos)
+    escribir_csv_atomico(rutas["pacientes"], campos_pacientes, generar_pacientes(cantidad_pacientes, semilla))
+    agenda = list(generar_agenda(medicos, semilla, hoy))
+    escribir_csv_atomico(rutas["agenda"], campos_agenda, agenda)
+    turnos = generar_turnos(agenda, cantidad_pacientes, cantidad_turnos, semilla, hoy, dias_historial) if cantidad_pacientes else []
+    escribir_csv_atomico(rutas["turnos"], campos_turnos, turnos)
+
+#----------------------------------------------------------------------------------------------
+
+# Punto de entrada de la línea de comandos
+def main(argumentos=None):
+    from modelos.medico import ruta_archivo_medicos
+    from modelos.paciente import ruta_archivo_pacientes
+    from modelos.agenda_medico import ruta_archivo_agenda
+    from modelos.turno import ruta_archivo_turnos
+    from modelos.bitacora_turnos import ruta_archivo_bitacora, ruta_archivo_bitacora_anterior
+
+    parser = argparse.ArgumentParser(description="Genera médicos, pacientes, agenda y turnos sintéticos")
+    parser.add_argument("--medicos", type=int, default=10)
+    parser.add_argument("--pacientes", type=int, default=50)
+    parser.add_argument("--turnos", type=int, default=0)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--habilitados", type=float, default=0.9, help="Proporción de médicos habilitados")
+    parser.add_argument("--hoy", help="Fecha de referencia 'DD-MM-AAAA' (por defecto, hoy)")
+    parser.add_argument("--dias-historial", type=int, help="Días anteriores a hoy con turnos (por defecto, los que hagan falta)")
+    parser.add_argument("--destino", help="Directorio donde escribir los CSV (por defecto, las rutas que usa la API)")
+    args = parser.parse_args(argumentos)
+
+    rutas = {"medicos": ruta_archivo_medicos, "pacientes": ruta_archivo_pacientes,
+             "agenda": ruta_archivo_agenda, "turnos": ruta_archivo_turnos}
+    if args.destino:
+        # Solo el nombre del archivo: las rutas de la API usan separador de Windows
+        rutas = {nombre: os.path.join(args.destino, ruta.replace('\\', '/').split('/')[-1]) for nombre, ruta in rutas.items()}
+    else:
+        # Una bitácora vieja se reproduciría encima de los turnos nuevos
+        for ruta in (ruta_archivo_bitacora, ruta_archivo_bitacora_anterior):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    hoy = datetime.strptime(args.hoy, "%d-%m-%Y").date() if args.hoy else None
+    generar_archivos(rutas, args.medicos, args.pacientes, args.turnos, args.semilla,
+                     args.habilitados, hoy, args.dias_historial)
+    for nombre, ruta in rutas.items():
+        print(f"{nombre}: {ruta}")
+
+if __name__ == '__main__':
+    main()
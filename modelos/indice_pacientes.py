@@ -0,0 +1,162 @@
+# -----------------------------------------------------------------
+# Módulo de índice de búsqueda de Pacientes
+# -----------------------------------------------------------------
+# Índice invertido en memoria: cada palabra del nombre, el apellido, el
+# email y el DNI de un paciente apunta a los IDs de los pacientes que la
+# contienen. Las palabras se normalizan sin acentos y en minúsculas, y el
+# email se parte en sus palabras ('juan.perez@mail.com' -> juan, perez,
+# mail, com), así 'Pérez' encuentra a 'perez' y viceversa.
+#
+# Las búsquedas son por prefijo de palabra. Las palabras se agrupan por sus
+# dos primeras letras en listas ordenadas: un prefijo se resuelve con una
+# búsqueda binaria dentro de su grupo, y un alta o baja solo reordena un
+# grupo chico en lugar de una lista con todas las palabras.
+#
+# La mayoría de las palabras (DNIs, emails) son de un solo paciente: para
+# ellas se guarda el ID suelto en lugar de un set, que ocupa mucho más.
+
+import bisect
+import functools
+import re
+import unicodedata
+
+# Variables globales que usaremos en este módulo
+largo_minimo = 2            # Letras mínimas de una palabra buscada (y largo de la clave de los grupos)
+ids_por_palabra = {}        # palabra -> id de paciente, o set de ids si la comparten varios
+palabras_por_grupo = {}     # dos primeras letras -> lista ordenada de palabras
+separador = re.compile(r"[^0-9a-z]+")
+
+#----------------------------------------------------------------------------------------------
+
+# Pasa un texto a minúsculas sin acentos ni diéresis ('Muñoz' -> 'munoz')
+def plegar_texto(texto):
+    texto = str(texto)
+    if texto.isascii():
+        return texto.lower()
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    return "".join(letra for letra in descompuesto if not unicodedata.combining(letra))
+
+#----------------------------------------------------------------------------------------------
+
+# Palabras normalizadas de un texto, en orden y sin vacías
+def palabras_de_texto(texto):
+    return [palabra for palabra in separador.split(plegar_texto(texto)) if palabra]
+
+#----------------------------------------------------------------------------------------------
+
+# Palabras que se guardan de un texto: las de una sola letra no se pueden buscar
+def palabras_indexables(texto):
+    return [palabra for palabra in separador.split(plegar_texto(texto)) if len(palabra) >= largo_minimo]
+
+# Los nombres y apellidos se repiten mucho entre pacientes: sus palabras se calculan una vez
+palabras_de_nombre = functools.lru_cache(maxsize=65536)(palabras_indexables)
+
+#----------------------------------------------------------------------------------------------
+
+# Palabras por las que se encuentra a un paciente
+def palabras_de_paciente(paciente):
+    palabras = set(palabras_de_nombre(paciente["nombre"] or ""))
+    palabras.update(palabras_de_nombre(paciente["apellido"] or ""))
+    palabras.update(palabras_indexables(paciente["email"] or ""))
+    dni = paciente["dni"] or ""
+    if dni.isdigit() and len(dni) >= largo_minimo:
+        palabras.add(dni)
+    else:
+        palabras.update(palabras_indexables(dni))
+    return palabras
+
+#----------------------------------------------------------------------------------------------
+
+# Vacía el índice
+def limpiar_indice_pacientes():
+    ids_por_palabra.clear()
+    palabras_por_grupo.clear()
+
+#----------------------------------------------------------------------------------------------
+
+# Arma el índice completo a partir de la lista de pacientes. Cada grupo de palabras
+# se ordena con un solo sort, en lugar de insertar palabra por palabra
+def reconstruir_indice_pacientes(pacientes):
+    limpiar_indice_pacientes()
+    for paciente in pacientes:
+        _agregar_palabras(paciente)
+    for palabra in ids_por_palabra:
+        palabras_por_grupo.setdefault(palabra[:largo_minimo], []).append(palabra)
+    for grupo in palabras_por_grupo.values():
+        grupo.sort()
+
+#----------------------------------------------------------------------------------------------
+
+# Agrega un paciente al índice
+def indexar_busqueda_paciente(paciente):
+    for palabra in _agregar_palabras(paciente):
+        bisect.insort(palabras_por_grupo.setdefault(palabra[:largo_minimo], []), palabra)
+
+#----------------------------------------------------------------------------------------------
+
+# Agrega el ID de un paciente a cada una de sus palabras; devuelve las palabras que no estaban en el índice
+def _agregar_palabras(paciente):
+    id_paciente = paciente["id"]
+    nuevas = []
+    for palabra in palabras_de_paciente(paciente):
+        ids = ids_por_palabra.get(palabra)
+        if ids is None:
+            ids_por_palabra[palabra] = id_paciente
+            nuevas.append(palabra)
+        elif type(ids) is set:
+            ids.add(id_paciente)
+        elif ids != id_paciente:
+            ids_por_palabra[palabra] = {ids, id_paciente}
+    return nuevas
+
+#----------------------------------------------------------------------------------------------
+
+# Quita un paciente del índice; debe llamarse antes de modificar sus datos
+def desindexar_busqueda_paciente(paciente):
+    id_paciente = paciente["id"]
+    for palabra in palabras_de_paciente(paciente):
+        ids = ids_por_palabra.get(palabra)
+        if type(ids) is set:
+            ids.discard(id_paciente)
+            if len(ids) == 1:
+                ids_por_palabra[palabra] = next(iter(ids))
+        elif ids == id_paciente:
+            del ids_por_palabra[palabra]
+            grupo = palabras_por_grupo[palabra[:largo_minimo]]
+            del grupo[bisect.bisect_left(grupo, palabra)]
+            if not grupo:
+                del palabras_por_grupo[palabra[:largo_minimo]]
+
+#----------------------------------------------------------------------------------------------
+
+# IDs de los pacientes con alguna palabra que empieza con 'prefijo' (de al menos largo_minimo letras)
+def ids_con_prefijo(prefijo):
+    grupo = palabras_por_grupo.get(prefijo[:largo_minimo], [])
+    encontrados = set()
+    for posicion in range(bisect.bisect_left(grupo, prefijo), len(grupo)):
+        palabra = grupo[posicion]
+        if not palabra.startswith(prefijo):
+            break
+        ids = ids_por_palabra[palabra]
+        if type(ids) is set:
+            encontrados.update(ids)
+        else:
+            encontrados.add(ids)
+    return encontrados
+
+#----------------------------------------------------------------------------------------------
+
+# IDs de los pacientes que tienen, para cada palabra buscada, alguna palabra que empieza con ella.
+# Las palabras buscadas más cortas que largo_minimo se ignoran
+def buscar_ids_pacientes(texto):
+    prefijos = sorted({palabra for palabra in palabras_de_texto(texto) if len(palabra) >= largo_minimo},
+                      key=len, reverse=True)
+    if not prefijos:
+        return set()
+    # Se empieza por el prefijo más largo, que suele dar menos candidatos
+    resultado = ids_con_prefijo(prefijos[0])
+    for prefijo in prefijos[1:]:
+        if not resultado:
+            break
+        resultado &= ids_con_prefijo(prefijo)
+    return resultado
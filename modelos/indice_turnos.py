@@ -0,0 +1,260 @@
+# -----------------------------------------------------------------
+# Módulo de índices en memoria sobre Turnos
+# -----------------------------------------------------------------
+# Los índices guardan referencias a los mismos registros que la
+# lista de turnos, por lo que deben actualizarse en cada alta y baja.
+# La fecha y hora de cada turno se convierte una sola vez a minutos
+# (día ordinal * 1440 + minutos del día) al indexarlo.
+#
+# En modo columnar (ver columnas_turnos.py) los índices por médico son las
+# columnas de NumPy en lugar de las listas de este módulo.
+
+from datetime import date, datetime
+from modelos.columnas_turnos import (columnas_activas, limpiar_columnas, reconstruir_columnas, agregar_turno_columnas,
+                                     quitar_turno_columnas, turnos_de_medico_columnas, turnos_de_medico_entre_columnas,
+                                     contar_por_medico_columnas)
+import bisect
+import functools
+
+# Variables globales que usaremos en este módulo
+turnos_por_medico = {}           # id_medico -> lista de turnos
+turnos_por_paciente = {}         # id_paciente -> lista de turnos
+turnos_por_medico_paciente = {}  # (id_medico, id_paciente) -> lista de turnos
+turnos_por_horario = {}          # (id_medico, fecha, hora) -> turno
+inicio_por_turno = {}            # id(turno) -> minutos de inicio
+inicios_por_medico = {}          # id_medico -> lista ordenada de minutos de inicio
+turnos_ordenados_por_medico = {} # id_medico -> turnos en el mismo orden que inicios_por_medico
+
+#----------------------------------------------------------------------------------------------
+
+# Convierte fecha 'DD-MM-AAAA' y hora 'HH:MM' a minutos
+def minutos_desde_fecha_hora(fecha_turno, hora_turno):
+    return _minutos_de_fecha(fecha_turno) + _minutos_de_hora(hora_turno)
+
+#----------------------------------------------------------------------------------------------
+
+# Minutos al comienzo de una fecha 'DD-MM-AAAA'. Se memoriza: muchos turnos comparten fecha
+@functools.lru_cache(maxsize=4096)
+def _minutos_de_fecha(fecha_turno):
+    dia, mes, anio = fecha_turno.split('-')
+    return date(int(anio), int(mes), int(dia)).toordinal() * 1440
+
+#----------------------------------------------------------------------------------------------
+
+# Minutos desde la medianoche de una hora 'HH:MM'
+@functools.lru_cache(maxsize=1440)
+def _minutos_de_hora(hora_turno):
+    horas, minutos = hora_turno.split(':')
+    return int(horas) * 60 + int(minutos)
+
+#----------------------------------------------------------------------------------------------
+
+# Escribe una fecha en la forma 'DD-MM-AAAA' ('1-2-2027' -> '01-02-2027'). Las claves de los
+# índices usan el texto de la fecha, así que dos formas de la misma fecha tienen que coincidir
+@functools.lru_cache(maxsize=4096)
+def normalizar_fecha(fecha_turno):
+    dia, mes, anio = fecha_turno.split('-')
+    return f"{int(dia):02d}-{int(mes):02d}-{int(anio):04d}"
+
+#----------------------------------------------------------------------------------------------
+
+# Escribe una hora en la forma 'HH:MM' ('9:0' -> '09:00'), por el mismo motivo
+@functools.lru_cache(maxsize=1440)
+def normalizar_hora(hora_turno):
+    minutos = _minutos_de_hora(hora_turno)
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+#----------------------------------------------------------------------------------------------
+
+# Minutos correspondientes al momento actual
+def minutos_actuales():
+    ahora = datetime.now()
+    return ahora.toordinal() * 1440 + ahora.hour * 60 + ahora.minute
+
+#----------------------------------------------------------------------------------------------
+
+# Vacía todos los índices
+def limpiar_indices():
+    turnos_por_medico.clear()
+    turnos_por_paciente.clear()
+    turnos_por_medico_paciente.clear()
+    turnos_por_horario.clear()
+    inicio_por_turno.clear()
+    inicios_por_medico.clear()
+    turnos_ordenados_por_medico.clear()
+    limpiar_columnas()
+
+#----------------------------------------------------------------------------------------------
+
+# Reconstruye todos los índices a partir de una lista de turnos. El orden por inicio
+# de cada médico se arma con un solo sort, en lugar de insertar turno por turno
+def reconstruir_indices(turnos):
+    limpiar_indices()
+    columnar = columnas_activas()
+    for turno in turnos:
+        _indexar_por_claves(turno)
+        inicio_por_turno[id(turno)] = minutos_desde_fecha_hora(turno["fecha_solicitud"], turno["hora_turno"])
+        if not columnar:
+            turnos_ordenados_por_medico.setdefault(turno["id_medico"], []).append(turno)
+    if columnar:
+        reconstruir_columnas(turnos, (inicio_por_turno[id(turno)] for turno in turnos))
+        return
+    for id_medico, ordenados in turnos_ordenados_por_medico.items():
+        # sort es estable: los turnos con el mismo inicio quedan en el orden de la lista, como con bisect_right
+        ordenados.sort(key=lambda turno: inicio_por_turno[id(turno)])
+        inicios_por_medico[id_medico] = [inicio_por_turno[id(turno)] for turno in ordenados]
+
+#----------------------------------------------------------------------------------------------
+
+# Agrega un turno a todos los índices
+def indexar_turno(turno):
+    id_medico = turno["id_medico"]
+    _indexar_por_claves(turno)
+
+    inicio = minutos_desde_fecha_hora(turno["fecha_solicitud"], turno["hora_turno"])
+    inicio_por_turno[id(turno)] = inicio
+    if columnas_activas():
+        agregar_turno_columnas(turno, inicio)
+        return
+    inicios = inicios_por_medico.setdefault(id_medico, [])
+    posicion = bisect.bisect_right(inicios, inicio)
+    inicios.insert(posicion, inicio)
+    turnos_ordenados_por_medico.setdefault(id_medico, []).insert(posicion, turno)
+
+#----------------------------------------------------------------------------------------------
+
+# Agrega un turno a los índices por médico, paciente y horario
+def _indexar_por_claves(turno):
+    id_medico = turno["id_medico"]
+    id_paciente = turno["id_paciente"]
+    if not columnas_activas():
+        turnos_por_medico.setdefault(id_medico, []).append(turno)
+    turnos_por_paciente.setdefault(id_paciente, []).append(turno)
+    turnos_por_medico_paciente.setdefault((id_medico, id_paciente), []).append(turno)
+    turnos_por_horario[(id_medico, turno["fecha_solicitud"], turno["hora_turno"])] = turno
+
+#----------------------------------------------------------------------------------------------
+
+# Quita un turno de todos los índices
+def desindexar_turno(turno):
+    id_medico = turno["id_medico"]
+    id_paciente = turno["id_paciente"]
+    if not columnas_activas():
+        _quitar_de_lista(turnos_por_medico, id_medico, turno)
+    _quitar_de_lista(turnos_por_paciente, id_paciente, turno)
+    _quitar_de_lista(turnos_por_medico_paciente, (id_medico, id_paciente), turno)
+    clave_horario = (id_medico, turno["fecha_solicitud"], turno["hora_turno"])
+    if turnos_por_horario.get(clave_horario) is turno:
+        del turnos_por_horario[clave_horario]
+
+    inicio = inicio_por_turno.pop(id(turno), None)
+    if columnas_activas():
+        if inicio is not None:
+            quitar_turno_columnas(turno, inicio)
+        return
+    inicios = inicios_por_medico.get(id_medico)
+    if inicio is not None and inicios is not None:
+        ordenados = turnos_ordenados_por_medico[id_medico]
+        posicion = bisect.bisect_left(inicios, inicio)
+        while posicion < len(inicios) and inicios[posicion] == inicio:
+            if ordenados[posicion] is turno:
+                del inicios[posicion]
+                del ordenados[posicion]
+                break
+            posicion += 1
+        if not inicios:
+            del inicios_por_medico[id_medico]
+            del turnos_ordenados_por_medico[id_medico]
+
+#----------------------------------------------------------------------------------------------
+
+# Quita un turno de la lista asociada a una clave, borrando la clave si queda vacía
+def _quitar_de_lista(indice, clave, turno):
+    lista = indice.get(clave)
+    if lista is None:
+        return
+    for posicion, existente in enumerate(lista):
+        if existente is turno:
+            del lista[posicion]
+            break
+    if not lista:
+        del indice[clave]
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene los turnos de un médico
+def turnos_de_medico(id_medico):
+    if columnas_activas():
+        return turnos_de_medico_columnas(id_medico)
+    return turnos_por_medico.get(id_medico, [])
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene los turnos de un paciente
+def turnos_de_paciente(id_paciente):
+    return turnos_por_paciente.get(id_paciente, [])
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene los turnos de un paciente con un médico
+def turnos_de_medico_paciente(id_medico, id_paciente):
+    return turnos_por_medico_paciente.get((id_medico, id_paciente), [])
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene el turno de un médico en una fecha y hora, o None si el horario está libre
+def turno_en_horario(id_medico, fecha_turno, hora_turno):
+    return turnos_por_horario.get((id_medico, fecha_turno, hora_turno))
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene los minutos de inicio de un turno indexado
+def inicio_de_turno(turno):
+    return inicio_por_turno[id(turno)]
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene, en orden cronológico, los turnos de un médico que empiezan después de 'desde' (en minutos)
+def turnos_de_medico_desde(id_medico, desde):
+    if columnas_activas():
+        # Los minutos son enteros: empezar después de 'desde' es empezar desde 'desde' + 1
+        return turnos_de_medico_entre_columnas(id_medico, desde + 1)
+    inicios = inicios_por_medico.get(id_medico)
+    if not inicios:
+        return []
+    posicion = bisect.bisect_right(inicios, desde)
+    return turnos_ordenados_por_medico[id_medico][posicion:]
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene, en orden cronológico, los turnos de un médico con inicio en [desde, hasta) (en minutos).
+# Sin 'desde' o sin 'hasta' el rango queda abierto de ese lado
+def turnos_de_medico_entre(id_medico, desde=None, hasta=None):
+    if columnas_activas():
+        return turnos_de_medico_entre_columnas(id_medico, desde, hasta)
+    inicios = inicios_por_medico.get(id_medico)
+    if not inicios:
+        return []
+    primera, ultima = _posiciones_entre(inicios, desde, hasta)
+    return turnos_ordenados_por_medico[id_medico][primera:ultima]
+
+#----------------------------------------------------------------------------------------------
+
+# Cuenta los turnos de cada médico con inicio en [desde, hasta) (en minutos): {id_medico: cantidad}
+def contar_turnos_por_medico_entre(desde=None, hasta=None):
+    if columnas_activas():
+        return contar_por_medico_columnas(desde, hasta)
+    conteo = {}
+    for id_medico, inicios in inicios_por_medico.items():
+        primera, ultima = _posiciones_entre(inicios, desde, hasta)
+        if ultima > primera:
+            conteo[id_medico] = ultima - primera
+    return conteo
+
+#----------------------------------------------------------------------------------------------
+
+# Posiciones [primera, ultima) de una lista ordenada de inicios que caen en [desde, hasta)
+def _posiciones_entre(inicios, desde, hasta):
+    primera = 0 if desde is None else bisect.bisect_left(inicios, desde)
+    ultima = len(inicios) if hasta is None else bisect.bisect_left(inicios, hasta)
+    return primera, ultima
@@ -0,0 +1,111 @@
+# -----------------------------------------------------------------
+# Módulo de instantáneas binarias de las colecciones
+# -----------------------------------------------------------------
+# Cada vez que se escribe el CSV de una colección se escribe también una
+# instantánea binaria (.snap) con los valores de cada registro ya convertidos,
+# en formato marshal. Al iniciar, las filas se cargan de la instantánea con una
+# sola lectura, sin pasar por csv.DictReader ni convertir campo por campo.
+#
+# La cabecera guarda la firma del CSV (inodo, tamaño y mtime) con la que se
+# escribió y un CRC32 del contenido. Si la instantánea falta, está dañada,
+# es de otra versión de Python o el CSV cambió después, se lee el CSV.
+
+import csv
+import marshal
+import os
+import struct
+import sys
+import zlib
+
+# Variables globales que usaremos en este módulo
+marca_instantanea = b"APISNAP2"  # 2: tuplas de valores de los registros
+formato_cabecera = "<8sBBQQqIQ"  # marca, versión de Python (mayor, menor), inodo, tamaño y mtime del CSV, CRC32, largo
+largo_cabecera = struct.calcsize(formato_cabecera)
+
+#----------------------------------------------------------------------------------------------
+
+# Ruta de la instantánea que corresponde a un CSV
+def ruta_instantanea(ruta_csv):
+    return os.path.splitext(ruta_csv)[0] + '.snap'
+
+#----------------------------------------------------------------------------------------------
+
+# Carga las filas de un CSV como registros de la clase 'tipo' (ver modelos/registros.py). Usa la
+# instantánea si está al día; si no, lee el CSV y vuelve a escribir la instantánea para el próximo inicio
+def cargar_filas(ruta_csv, tipo):
+    valores = leer_instantanea(ruta_csv)
+    if valores is not None:
+        return [tipo(*fila) for fila in valores]
+    # La firma se toma antes de leer: si el CSV cambiara mientras tanto, la instantánea queda vieja
+    estado = os.stat(ruta_csv)
+    with open(ruta_csv, newline='', encoding='utf-8') as csvfile:
+        filas = [tipo.desde_fila(fila) for fila in csv.DictReader(csvfile)]
+    _escribir(ruta_csv, estado, [fila.valores() for fila in filas])
+    return filas
+
+#----------------------------------------------------------------------------------------------
+
+# Lee la instantánea de un CSV: una tupla de valores por registro.
+# Devuelve None si no existe, está dañada o no está al día
+def leer_instantanea(ruta_csv):
+    ruta = ruta_instantanea(ruta_csv)
+    try:
+        with open(ruta, 'rb') as archivo:
+            datos = archivo.read()
+        estado = os.stat(ruta_csv)
+    except FileNotFoundError:
+        return None
+
+    if len(datos) < largo_cabecera:
+        print(f"Instantánea incompleta, se lee el CSV: {ruta}")
+        return None
+    marca, mayor, menor, inodo, tamanio, mtime, crc, largo = struct.unpack_from(formato_cabecera, datos)
+    if marca != marca_instantanea or (mayor, menor) != sys.version_info[:2]:
+        print(f"Instantánea de otro formato, se lee el CSV: {ruta}")
+        return None
+    if (inodo, tamanio, mtime) != (estado.st_ino, estado.st_size, estado.st_mtime_ns):
+        print(f"Instantánea desactualizada, se lee el CSV: {ruta}")
+        return None
+    cuerpo = datos[largo_cabecera:]
+    if len(cuerpo) != largo or zlib.crc32(cuerpo) != crc:
+        print(f"Instantánea dañada, se lee el CSV: {ruta}")
+        return None
+    try:
+        return marshal.loads(cuerpo)
+    except (ValueError, EOFError, TypeError):
+        print(f"Instantánea ilegible, se lee el CSV: {ruta}")
+        return None
+
+#----------------------------------------------------------------------------------------------
+
+# Escribe la instantánea de un CSV recién escrito. Las filas se pasan a texto y se
+# convierten igual que al leer el CSV, así la instantánea da exactamente lo mismo que el archivo
+def escribir_instantanea(ruta_csv, campo_nombres, filas, tipo):
+    valores = [tipo.desde_fila({campo: _texto_csv(fila.get(campo)) for campo in campo_nombres}).valores() for fila in filas]
+    _escribir(ruta_csv, os.stat(ruta_csv), valores)
+
+#----------------------------------------------------------------------------------------------
+
+# Texto con el que el módulo csv escribe un valor
+def _texto_csv(valor):
+    return "" if valor is None else str(valor)
+
+#----------------------------------------------------------------------------------------------
+
+# Escribe la instantánea de forma atómica con la firma del CSV al que corresponde.
+# Un error no es grave: en el próximo inicio se lee el CSV
+def _escribir(ruta_csv, estado, valores):
+    ruta = ruta_instantanea(ruta_csv)
+    cuerpo = marshal.dumps(valores)
+    cabecera = struct.pack(formato_cabecera, marca_instantanea, sys.version_info[0], sys.version_info[1],
+                           estado.st_ino, estado.st_size, estado.st_mtime_ns, zlib.crc32(cuerpo), len(cuerpo))
+    ruta_temporal = ruta + '.tmp'
+    try:
+        with open(ruta_temporal, 'wb') as archivo:
+            archivo.write(cabecera)
+            archivo.write(cuerpo)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(ruta_temporal, ruta)
+    except OSError as e:
+        print(f"No se pudo escribir la instantánea {ruta}: {e}")
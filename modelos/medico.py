@@ -2,12 +2,24 @@
 # Módulo de funciones sobre Medicos
 # --------------------------------------------------------------------------------------------
 
+from modelos.persistencia import registrar_coleccion, marcar_sucia, escribir_csv_atomico
+from modelos.repositorio import delegable
+from modelos.versiones import incrementar_version
+from modelos.concurrencia import lectura, escritura
+from modelos.multiproceso import registrar_recarga
+from modelos.instantanea import cargar_filas
+from modelos.registros import Medico
+from modelos.generador_datos import usa_datos_sinteticos, crear_archivo_medicos_sinteticos
 import requests
+import bisect
 import csv
+import itertools
 import os
 
 # Variables globales que usaremos en este módulo
 medicos = []
+medicos_por_id = {}   # Índice id -> médico, se mantiene a la par de la lista
+medicos_por_dni = {}  # Índice dni -> médico, se mantiene a la par de la lista
 id_medico = 0  # Variable para asignar IDs únicos a los médicos
 ruta_archivo_medicos = 'modelos\\medicos.csv'
 
@@ -23,6 +35,10 @@ def inicializar_medicos():
         if os.path.exists(ruta_archivo_medicos):
             print("El archivo medicos.csv ya existe. Cargando datos desde el archivo...")
             importar_datos_medicos_desde_csv()
+        elif usa_datos_sinteticos():
+            print("El archivo medicos.csv no existe. Generando datos sintéticos...")
+            crear_archivo_medicos_sinteticos(ruta_archivo_medicos, 10)
+            importar_datos_medicos_desde_csv()
         else:
             print("El archivo medicos.csv no existe. Cargando datos desde API...")
             url = 'https://randomuser.me/api/?results=10&inc=id,name,login,phone,email,password,nat,value&password=number,6&nat=es&value=number,8&phone=number,10'
@@ -90,92 +106,168 @@ def crear_archivo_medicos(respuesta):
 def importar_datos_medicos_desde_csv():
     global medicos
     global id_medico
-    medicos = []  # Limpiamos la lista de médicos antes de importar desde el archivo CSV
-    with open(ruta_archivo_medicos, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            # Convertimos el ID de cadena a entero
-            row['id'] = int(row['id'])
-            row['matricula'] = int(row['matricula'])
-            medicos.append(row) 
+    medicos_por_id.clear()
+    medicos_por_dni.clear()
+    # Se reemplaza la lista entera; las filas vienen de la instantánea o del CSV
+    medicos = cargar_filas(ruta_archivo_medicos, Medico)
+    for medico in medicos:
+        indexar_medico(medico)
     if len(medicos)>0:
         id_medico = medicos[-1]["id"]+1
     else:
         id_medico = 1
 
 #----------------------------------------------------------------------------------------------
+
      
 # Exporta la lista de médicos a un archivo CSV
 def exportar_a_csv():
-    with open(ruta_archivo_medicos, 'w', newline='',encoding='utf-8') as csvfile:
-        campo_nombres = ['id', 'dni', 'nombre', 'apellido', 'matricula', 'telefono', 'email', 'habilitado']
-        writer = csv.DictWriter(csvfile, fieldnames=campo_nombres)
-        writer.writeheader()
-        for medico in medicos:
-            writer.writerow(medico)
+    campo_nombres = ['id', 'dni', 'nombre', 'apellido', 'matricula', 'telefono', 'email', 'habilitado']
+    # Se copia con el cerrojo tomado y se escribe el archivo sin bloquear a los demás
+    with lectura("medicos"):
+        filas = [dict(medico) for medico in medicos]
+    escribir_csv_atomico(ruta_archivo_medicos, campo_nombres, filas, Medico)
+
+# El volcado a disco lo hace el módulo de persistencia en segundo plano
+registrar_coleccion("medicos", exportar_a_csv)
+
+#----------------------------------------------------------------------------------------------
+
+# Vuelve a cargar los médicos cuando otro proceso modificó el archivo
+def recargar_medicos(rutas_cambiadas):
+    with escritura("medicos"):
+        importar_datos_medicos_desde_csv()
+        incrementar_version("medicos")
+
+registrar_recarga("medicos", [ruta_archivo_medicos], recargar_medicos)
 
 #----------------------------------------------------------------------------------------------
       
-# Obtiene la lista completa de médicos
-def obtener_medicos():
-    return medicos
+# Obtiene la lista de médicos ordenada por ID. Sin argumentos devuelve la lista completa;
+# con 'despues_de' empieza después de ese ID, con 'habilitado' filtra por ese estado
+# y con 'limite' devuelve como máximo esa cantidad
+@delegable
+def obtener_medicos(limite=None, despues_de=None, habilitado=None):
+    if limite is None and despues_de is None and habilitado is None:
+        return medicos
+    inicio = 0 if despues_de is None else bisect.bisect_right(medicos, despues_de, key=lambda m: m["id"])
+    seleccion = itertools.islice(medicos, inicio, None)
+    if habilitado is not None:
+        seleccion = (medico for medico in seleccion if str(medico["habilitado"]).lower() == str(habilitado).lower())
+    # Se recorre solo hasta completar la página
+    return list(itertools.islice(seleccion, limite))
 
 #----------------------------------------------------------------------------------------------
 
 # Obtiene un médico específico por su ID
+@delegable
 def obtener_medico_por_id(id_medico):
-    for medico in medicos:
-        if medico["id"] == id_medico:
-            return medico
-    return None
+    return medicos_por_id.get(id_medico)
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene un médico específico por su DNI
+@delegable
+def obtener_medico_por_dni(dni):
+    return medicos_por_dni.get(dni)
+
+#----------------------------------------------------------------------------------------------
+
+# Agrega un médico a los índices por ID y DNI
+def indexar_medico(medico):
+    medicos_por_id[medico["id"]] = medico
+    medicos_por_dni[medico["dni"]] = medico
 
 #----------------------------------------------------------------------------------------------
 
 # Crea un nuevo médico y lo agrega a la lista
+@delegable
 def crear_medico(dni, nombre, apellido, matricula, telefono, email, habilitado):
     global id_medico
     habilitado = habilitado.lower() == 'true'
     
-    medicos.append({
-        "id": id_medico,
-        "dni": dni,
-        "nombre": nombre,
-        "apellido": apellido,
-        "matricula": matricula,
-        "telefono": telefono,
-        "email": email,
-        "habilitado": habilitado
-    })
-    id_medico += 1
-    exportar_a_csv()
+    with escritura("medicos"):
+        medicos.append(Medico(
+            id=id_medico,
+            dni=dni,
+            nombre=nombre,
+            apellido=apellido,
+            matricula=matricula,
+            telefono=telefono,
+            email=email,
+            habilitado=habilitado
+        ))
+        medico = medicos[-1]
+        indexar_medico(medico)
+        id_medico += 1
+        incrementar_version("medicos")
+    marcar_sucia("medicos")
  
-    return medicos[-1]
+    return medico
+
+#----------------------------------------------------------------------------------------------
+
+# Crea varios médicos de una vez; cada elemento tiene los mismos datos que recibe crear_medico
+@delegable
+def crear_medicos_en_lote(datos_medicos):
+    global id_medico
+    creados = []
+    with escritura("medicos"):
+        for dni, nombre, apellido, matricula, telefono, email, habilitado in datos_medicos:
+            medicos.append(Medico(
+                id=id_medico,
+                dni=dni,
+                nombre=nombre,
+                apellido=apellido,
+                matricula=matricula,
+                telefono=telefono,
+                email=email,
+                habilitado=habilitado.lower() == 'true'
+            ))
+            indexar_medico(medicos[-1])
+            id_medico += 1
+            creados.append(medicos[-1])
+        if creados:
+            incrementar_version("medicos")
+    # Una sola escritura del CSV para todo el lote
+    if creados:
+        marcar_sucia("medicos")
+    return creados
 
 #----------------------------------------------------------------------------------------------
 
 # Actualiza la información de un médico existente por su ID
+@delegable
 def actualizar_medico_por_id(id_medico, dni, nombre, apellido, matricula, telefono, email, habilitado):
-    for medico in medicos:
-        if medico["id"] == id_medico:
-            
-            medico["dni"] = dni
-            medico["nombre"] = nombre
-            medico["apellido"] = apellido
-            medico["matricula"] = matricula
-            medico["telefono"] = telefono
-            medico["email"] = email
-            medico["habilitado"] = habilitado
-            
-            exportar_a_csv()
-            return medico
-   
-    return None
+    with escritura("medicos"):
+        medico = medicos_por_id.get(id_medico)
+        if medico is None:
+            return None
+
+        # Si cambia el DNI se quita la entrada anterior del índice
+        if medico["dni"] != dni and medicos_por_dni.get(medico["dni"]) is medico:
+            del medicos_por_dni[medico["dni"]]
+
+        medico["dni"] = dni
+        medico["nombre"] = nombre
+        medico["apellido"] = apellido
+        medico["matricula"] = matricula
+        medico["telefono"] = telefono
+        medico["email"] = email
+        medico["habilitado"] = habilitado
+        medicos_por_dni[dni] = medico
+        incrementar_version("medicos")
+
+    marcar_sucia("medicos")
+    return medico
 
 #----------------------------------------------------------------------------------------------
 
 # Obtiene un médico habilitado específico por su ID
+@delegable
 def obtener_medico_habilitado(id_medico):
-    for medico in medicos:
-        if medico["id"] == id_medico and medico["habilitado"] == "true":
-            return medico
+    medico = medicos_por_id.get(id_medico)
+    # 'habilitado' puede venir como booleano (crear_medico) o como texto (CSV / PUT)
+    if medico is not None and str(medico["habilitado"]).lower() == "true":
+        return medico
     return None
@@ -0,0 +1,171 @@
+# -----------------------------------------------------------------
+# Módulo de coordinación entre varios procesos (workers) del servidor
+# -----------------------------------------------------------------
+# Detrás de un servidor WSGI con varios workers, cada proceso tiene su
+# propia copia de las colecciones en memoria. En modo multiproceso:
+#  - Las escrituras se hacen con un cerrojo exclusivo sobre un archivo
+#    compartido: antes de modificar se incorporan los cambios de los demás
+#    procesos y al terminar se vuelca a disco antes de soltar el cerrojo.
+#  - Cada proceso recuerda la firma (inodo, mtime y tamaño) de los archivos
+#    de cada colección tal como los cargó. Si la firma en disco cambia,
+#    recarga solo esa colección (los turnos, solo lo nuevo de la bitácora).
+
+from modelos.persistencia import volcar_todo
+import contextlib
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # En Windows no hay fcntl; se usa msvcrt
+    fcntl = None
+    import msvcrt
+
+# Variables globales que usaremos en este módulo
+ruta_archivo_cerrojo = 'modelos\\datos.lock'
+modo_multiproceso = False
+recargas = {}   # nombre -> (rutas de sus archivos, función que la recarga)
+firmas = {}     # ruta -> firma del archivo con la que coincide la memoria de este proceso
+cerrojo_firmas = threading.Lock()  # Una sola recarga a la vez dentro del proceso
+
+#----------------------------------------------------------------------------------------------
+
+# Activa o desactiva el modo multiproceso
+def configurar_multiproceso(activo):
+    global modo_multiproceso
+    modo_multiproceso = bool(activo)
+
+#----------------------------------------------------------------------------------------------
+
+# Registra los archivos de una colección y la función que la recarga.
+# La función recibe el conjunto de rutas que cambiaron
+def registrar_recarga(nombre, rutas, funcion_recarga):
+    recargas[nombre] = (rutas, funcion_recarga)
+
+#----------------------------------------------------------------------------------------------
+
+# Firma de un archivo en disco: cambia cuando se reemplaza o se le agregan datos
+def _firma(ruta):
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+
+#----------------------------------------------------------------------------------------------
+
+# Toma el cerrojo del archivo compartido; se abre un descriptor propio en cada
+# llamada para que también excluya a los otros hilos del mismo proceso
+def tomar_cerrojo_archivo(exclusivo=True):
+    archivo = open(ruta_archivo_cerrojo, 'a+b')
+    try:
+        if fcntl is not None:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+        else:
+            # msvcrt solo tiene cerrojos exclusivos, y LK_LOCK se rinde después de 10 intentos
+            archivo.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+    except BaseException:
+        archivo.close()
+        raise
+    return archivo
+
+#----------------------------------------------------------------------------------------------
+
+# Suelta el cerrojo del archivo compartido
+def soltar_cerrojo_archivo(archivo):
+    try:
+        if fcntl is None:
+            archivo.seek(0)
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+    finally:
+        archivo.close()
+
+#----------------------------------------------------------------------------------------------
+
+# Ejecuta el bloque con el cerrojo entre procesos tomado (no hace nada fuera del modo multiproceso)
+@contextlib.contextmanager
+def cerrojo_entre_procesos(exclusivo=True):
+    if not modo_multiproceso:
+        yield
+        return
+    archivo = tomar_cerrojo_archivo(exclusivo)
+    try:
+        yield
+    finally:
+        soltar_cerrojo_archivo(archivo)
+
+#----------------------------------------------------------------------------------------------
+
+# Recuerda las firmas actuales de todos los archivos: la memoria coincide con el disco.
+# Se llama después de cargar o de volcar con el cerrojo exclusivo tomado
+def registrar_firmas():
+    with cerrojo_firmas:
+        for rutas, _ in recargas.values():
+            for ruta in rutas:
+                firmas[ruta] = _firma(ruta)
+
+#----------------------------------------------------------------------------------------------
+
+# Devuelve las colecciones cuyos archivos cambiaron, con las rutas que cambiaron
+def _colecciones_cambiadas():
+    cambiadas = {}
+    for nombre, (rutas, _) in recargas.items():
+        rutas_cambiadas = {ruta for ruta in rutas if _firma(ruta) != firmas.get(ruta)}
+        if rutas_cambiadas:
+            cambiadas[nombre] = rutas_cambiadas
+    return cambiadas
+
+#----------------------------------------------------------------------------------------------
+
+# Recarga las colecciones que cambiaron en disco; se llama con el cerrojo de archivo tomado
+def _recargar_cambiadas():
+    with cerrojo_firmas:
+        for nombre, rutas_cambiadas in _colecciones_cambiadas().items():
+            rutas, funcion_recarga = recargas[nombre]
+            # La firma se toma antes de leer: si el archivo cambiara después, se vuelve a recargar
+            nuevas = {ruta: _firma(ruta) for ruta in rutas}
+            funcion_recarga(rutas_cambiadas)
+            firmas.update(nuevas)
+
+#----------------------------------------------------------------------------------------------
+
+# Incorpora los cambios de otros procesos antes de una lectura. Si ningún archivo
+# cambió no toma ningún cerrojo: solo compara las firmas
+def sincronizar_colecciones():
+    if not modo_multiproceso or not _colecciones_cambiadas():
+        return
+    with cerrojo_entre_procesos(exclusivo=False):
+        _recargar_cambiadas()
+
+#----------------------------------------------------------------------------------------------
+
+# Comienza una escritura: toma el cerrojo exclusivo e incorpora los cambios de otros procesos.
+# Devuelve lo que hay que pasarle a terminar_escritura, o None fuera del modo multiproceso
+def iniciar_escritura():
+    if not modo_multiproceso:
+        return None
+    archivo = tomar_cerrojo_archivo(exclusivo=True)
+    try:
+        _recargar_cambiadas()
+    except BaseException:
+        soltar_cerrojo_archivo(archivo)
+        raise
+    return archivo
+
+#----------------------------------------------------------------------------------------------
+
+# Termina una escritura: lo modificado ya está en disco, se recuerdan las firmas y se suelta el cerrojo
+def terminar_escritura(archivo):
+    if archivo is None:
+        return
+    try:
+        volcar_todo()
+        registrar_firmas()
+    finally:
+        soltar_cerrojo_archivo(archivo)
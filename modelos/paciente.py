@@ -2,12 +2,25 @@
 # Módulo de funciones sobre Pacientes
 # -----------------------------------------------------------------
 
+from modelos.persistencia import registrar_coleccion, marcar_sucia, escribir_csv_atomico
+from modelos.repositorio import delegable
+from modelos.versiones import incrementar_version
+from modelos.concurrencia import lectura, escritura
+from modelos.multiproceso import registrar_recarga
+from modelos.instantanea import cargar_filas
+from modelos.registros import Paciente
+from modelos.indice_pacientes import reconstruir_indice_pacientes, indexar_busqueda_paciente, desindexar_busqueda_paciente, buscar_ids_pacientes
+from modelos.generador_datos import usa_datos_sinteticos, crear_archivo_pacientes_sinteticos
 import requests
+import bisect
 import csv
+import heapq
 import os
 
 # Variables globales que usaremos en este módulo
 pacientes = []
+pacientes_por_id = {}   # Índice id -> paciente, se mantiene a la par de la lista
+pacientes_por_dni = {}  # Índice dni -> paciente, se mantiene a la par de la lista
 id_paciente = 0  # Variable para asignar IDs únicos a los usuarios
 ruta_archivo_pacientes = 'modelos\\pacientes.csv'
 
@@ -23,6 +36,10 @@ def inicializar_pacientes():
         if os.path.exists(ruta_archivo_pacientes):
             print("El archivo pacientes.csv ya existe. Cargando datos desde el archivo...")
             importar_datos_pacientes_desde_csv()
+        elif usa_datos_sinteticos():
+            print("El archivo pacientes.csv no existe. Generando datos sintéticos...")
+            crear_archivo_pacientes_sinteticos(ruta_archivo_pacientes, 50)
+            importar_datos_pacientes_desde_csv()
         else:
             print("El archivo pacientes.csv no existe. Cargando datos desde API...")
             url = 'https://randomuser.me/api/?results=50&inc=id,name,login,phone,email,location,password,nat,value&password=number,6&nat=es&value=number,8&phone=number,10'
@@ -91,13 +108,14 @@ def crear_archivo_pacientes(respuesta):
 def importar_datos_pacientes_desde_csv():
     global pacientes
     global id_paciente
-    pacientes = []  # Limpiamos la lista de pacientes antes de importar desde el archivo CSV
-    with open(ruta_archivo_pacientes, newline='',encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            # Convertimos el ID de cadena a entero
-            row['id'] = int(row['id'])
-            pacientes.append(row) 
+    pacientes_por_id.clear()
+    pacientes_por_dni.clear()
+    # Se reemplaza la lista entera; las filas vienen de la instantánea o del CSV
+    pacientes = cargar_filas(ruta_archivo_pacientes, Paciente)
+    for paciente in pacientes:
+        pacientes_por_id[paciente["id"]] = paciente
+        pacientes_por_dni[paciente["dni"]] = paciente
+    reconstruir_indice_pacientes(pacientes)
     if len(pacientes)>0:
         id_paciente = pacientes[-1]["id"]+1
     else:
@@ -105,87 +123,183 @@ def importar_datos_pacientes_desde_csv():
 
 #----------------------------------------------------------------------------------------------
 
+
 # Exporta la lista de pacientes a un archivo CSV
 def exportar_a_csv():
-    with open(ruta_archivo_pacientes, 'w', newline='',encoding='utf-8') as csvfile:
-        campo_nombres = ['id', 'dni', 'nombre', 'apellido', 'telefono', 'email', 'dir_calle','dir_numero']
-        writer = csv.DictWriter(csvfile, fieldnames=campo_nombres)
-        writer.writeheader()
-        for paciente in pacientes:
-            writer.writerow(paciente)
+    campo_nombres = ['id', 'dni', 'nombre', 'apellido', 'telefono', 'email', 'dir_calle','dir_numero']
+    # Se copia con el cerrojo tomado y se escribe el archivo sin bloquear a los demás
+    with lectura("pacientes"):
+        filas = [dict(paciente) for paciente in pacientes]
+    escribir_csv_atomico(ruta_archivo_pacientes, campo_nombres, filas, Paciente)
+
+# El volcado a disco lo hace el módulo de persistencia en segundo plano
+registrar_coleccion("pacientes", exportar_a_csv)
+
+#----------------------------------------------------------------------------------------------
+
+# Vuelve a cargar los pacientes cuando otro proceso modificó el archivo
+def recargar_pacientes(rutas_cambiadas):
+    with escritura("pacientes"):
+        importar_datos_pacientes_desde_csv()
+        incrementar_version("pacientes")
+
+registrar_recarga("pacientes", [ruta_archivo_pacientes], recargar_pacientes)
 
 #----------------------------------------------------------------------------------------------
 
-# Obtiene la lista completa de pacientes
-def obtener_pacientes():
-    return pacientes
+# Obtiene la lista de pacientes ordenada por ID. Sin argumentos devuelve la lista completa;
+# con 'despues_de' empieza después de ese ID y con 'limite' devuelve como máximo esa cantidad
+@delegable
+def obtener_pacientes(limite=None, despues_de=None):
+    if limite is None and despues_de is None:
+        return pacientes
+    inicio = 0 if despues_de is None else bisect.bisect_right(pacientes, despues_de, key=lambda p: p["id"])
+    return pacientes[inicio:] if limite is None else pacientes[inicio:inicio + limite]
 
 #----------------------------------------------------------------------------------------------
 
 # Obtiene un paciente específico por su ID
+@delegable
 def obtener_paciente_por_id(id_paciente):
-    for paciente in pacientes:
-        if paciente["id"] == id_paciente:
-            return paciente
+    return pacientes_por_id.get(id_paciente)
+
+#----------------------------------------------------------------------------------------------
+
+# Agrega un paciente a los índices por ID y DNI y al de búsqueda
+def indexar_paciente(paciente):
+    pacientes_por_id[paciente["id"]] = paciente
+    pacientes_por_dni[paciente["dni"]] = paciente
+    indexar_busqueda_paciente(paciente)
+
+#----------------------------------------------------------------------------------------------
 
-    return None
+# Quita un paciente de los índices por ID y DNI y del de búsqueda
+def desindexar_paciente(paciente):
+    pacientes_por_id.pop(paciente["id"], None)
+    if pacientes_por_dni.get(paciente["dni"]) is paciente:
+        del pacientes_por_dni[paciente["dni"]]
+    desindexar_busqueda_paciente(paciente)
 
 #----------------------------------------------------------------------------------------------
 
 # Crea un nuevo paciente y lo agrega a la lista
+@delegable
 def crear_paciente(dni,nombre, apellido, telefono, email,dir_calle,dir_numero):
     global id_paciente
-    # Agrega el paciente a la lista con un ID único
-    pacientes.append({
-        "id": id_paciente,
-        "dni": dni,
-        "nombre": nombre,
-        "apellido": apellido,
-        "telefono": telefono,
-        "email": email,
-        "dir_calle": dir_calle,
-        "dir_numero": dir_numero
-    })
-    id_paciente += 1
-    exportar_a_csv()
-    return pacientes[-1]
+    with escritura("pacientes"):
+        # Agrega el paciente a la lista con un ID único
+        pacientes.append(Paciente(
+            id=id_paciente,
+            dni=dni,
+            nombre=nombre,
+            apellido=apellido,
+            telefono=telefono,
+            email=email,
+            dir_calle=dir_calle,
+            dir_numero=dir_numero
+        ))
+        paciente = pacientes[-1]
+        indexar_paciente(paciente)
+        id_paciente += 1
+        incrementar_version("pacientes")
+    marcar_sucia("pacientes")
+    return paciente
+
+#----------------------------------------------------------------------------------------------
+
+# Crea varios pacientes de una vez; cada elemento tiene los mismos datos que recibe crear_paciente
+@delegable
+def crear_pacientes_en_lote(datos_pacientes):
+    global id_paciente
+    with escritura("pacientes"):
+        creados = []
+        for dni, nombre, apellido, telefono, email, dir_calle, dir_numero in datos_pacientes:
+            pacientes.append(Paciente(
+                id=id_paciente,
+                dni=dni,
+                nombre=nombre,
+                apellido=apellido,
+                telefono=telefono,
+                email=email,
+                dir_calle=dir_calle,
+                dir_numero=dir_numero
+            ))
+            indexar_paciente(pacientes[-1])
+            id_paciente += 1
+            creados.append(pacientes[-1])
+        if creados:
+            incrementar_version("pacientes")
+    # Una sola escritura del CSV para todo el lote
+    if creados:
+        marcar_sucia("pacientes")
+    return creados
 
 #----------------------------------------------------------------------------------------------
 
 # Actualiza la información de un paciente existente por su ID
+@delegable
 def actualizar_paciente_por_id(id_paciente,dni, nombre, apellido, telefono, email,dir_calle,dir_numero):
-    for paciente in pacientes:
-        if paciente["id"] == id_paciente:
-            paciente["dni"] = dni
-            paciente["nombre"] = nombre
-            paciente["apellido"] = apellido
-            paciente["telefono"] = telefono
-            paciente["email"] = email
-            paciente["dir_calle"] = dir_calle
-            paciente["dir_numero"] = dir_numero
-            
-            exportar_a_csv()
-            return paciente
-    # Devuelve None si no se encuentra el paciente
-    return None
+    with escritura("pacientes"):
+        paciente = pacientes_por_id.get(id_paciente)
+        # Devuelve None si no se encuentra el paciente
+        if paciente is None:
+            return None
+
+        # Si cambia el DNI se quita la entrada anterior del índice
+        if paciente["dni"] != dni and pacientes_por_dni.get(paciente["dni"]) is paciente:
+            del pacientes_por_dni[paciente["dni"]]
+        # Las palabras de búsqueda se quitan con los datos anteriores y se vuelven a agregar con los nuevos
+        desindexar_busqueda_paciente(paciente)
+
+        paciente["dni"] = dni
+        paciente["nombre"] = nombre
+        paciente["apellido"] = apellido
+        paciente["telefono"] = telefono
+        paciente["email"] = email
+        paciente["dir_calle"] = dir_calle
+        paciente["dir_numero"] = dir_numero
+        pacientes_por_dni[dni] = paciente
+        indexar_busqueda_paciente(paciente)
+        incrementar_version("pacientes")
+
+    marcar_sucia("pacientes")
+    return paciente
 
 #----------------------------------------------------------------------------------------------
 
 # Elimina un paciente por su ID
+@delegable
 def eliminar_paciente_por_id(id_paciente):
-    global pacientes
-    for paciente in pacientes:
-        if paciente["id"] == id_paciente:
+    with escritura("pacientes"):
+        paciente = pacientes_por_id.get(id_paciente)
+        if paciente is None:
+            return False
+        # La lista está ordenada por ID, así que la posición se busca por bisección
+        posicion = bisect.bisect_left(pacientes, id_paciente, key=lambda p: p["id"])
+        if posicion < len(pacientes) and pacientes[posicion] is paciente:
+            del pacientes[posicion]
+        else:
             pacientes.remove(paciente)
-            exportar_a_csv()  
-            return True  
-    return False  
+        desindexar_paciente(paciente)
+        incrementar_version("pacientes")
+    marcar_sucia("pacientes")
+    return True
 
 #----------------------------------------------------------------------------------------------
 
 # Obtiene un paciente por su DNI
+@delegable
 def obtener_paciente_por_dni(dni):
-    for paciente in pacientes:
-        if paciente["dni"] == dni:
-            return paciente
-    return None    
\ No newline at end of file
+    return pacientes_por_dni.get(dni)    
+#----------------------------------------------------------------------------------------------
+
+# Busca pacientes por prefijos de palabras de su nombre, apellido, email o DNI, sin distinguir
+# acentos ni mayúsculas ('per jua' encuentra a 'Juan Pérez'). Devuelve los pacientes ordenados
+# por ID; con 'despues_de' empieza después de ese ID y con 'limite' devuelve como máximo esa cantidad
+@delegable
+def buscar_pacientes(texto, limite=None, despues_de=None):
+    ids = buscar_ids_pacientes(texto)
+    if despues_de is not None:
+        ids = [id_paciente for id_paciente in ids if id_paciente > despues_de]
+    ids = sorted(ids) if limite is None else heapq.nsmallest(limite, ids)
+    return [pacientes_por_id[id_paciente] for id_paciente in ids]
@@ -0,0 +1,124 @@
+# -----------------------------------------------------------------
+# Módulo de persistencia diferida (write-behind) de las colecciones
+# -----------------------------------------------------------------
+# Los modelos ya no reescriben su CSV dentro de la solicitud: marcan la
+# colección como sucia y un hilo en segundo plano agrupa las escrituras
+# de una ráfaga en un único volcado. Cada volcado escribe un archivo
+# temporal y lo renombra, así una caída nunca deja un CSV truncado.
+
+from modelos.instantanea import escribir_instantanea
+import atexit
+import csv
+import os
+import signal
+import sys
+import threading
+import time
+
+# Variables globales que usaremos en este módulo
+colecciones = {}            # nombre -> función que vuelca la colección a disco
+colecciones_sucias = set()  # colecciones con cambios pendientes de volcar
+retardo_volcado = 0.5       # Segundos que se espera para agrupar escrituras
+modo_sincronico = False     # Si es True se vuelca dentro de la misma llamada
+
+cerrojo_sucias = threading.Lock()     # Protege colecciones_sucias
+cerrojo_volcado = threading.RLock()   # Evita dos volcados simultáneos
+evento_cambios = threading.Event()
+hilo_volcado = None
+pid_hilo_volcado = None
+
+#----------------------------------------------------------------------------------------------
+
+# Configura el retardo de agrupación y si el volcado es sincrónico
+def configurar_persistencia(retardo=None, sincronico=None):
+    global retardo_volcado, modo_sincronico
+    if retardo is not None:
+        retardo_volcado = float(retardo)
+    if sincronico is not None:
+        modo_sincronico = bool(sincronico)
+
+#----------------------------------------------------------------------------------------------
+
+# Registra la función que vuelca una colección a disco
+def registrar_coleccion(nombre, funcion_volcado):
+    colecciones[nombre] = funcion_volcado
+
+#----------------------------------------------------------------------------------------------
+
+# Marca una colección como modificada para que se vuelque en segundo plano
+def marcar_sucia(nombre):
+    with cerrojo_sucias:
+        colecciones_sucias.add(nombre)
+    if modo_sincronico:
+        volcar_todo()
+    else:
+        _iniciar_hilo_volcado()
+        evento_cambios.set()
+
+#----------------------------------------------------------------------------------------------
+
+# Vuelca ahora todas las colecciones sucias
+def volcar_todo():
+    with cerrojo_volcado:
+        with cerrojo_sucias:
+            pendientes = list(colecciones_sucias)
+            colecciones_sucias.clear()
+        for nombre in pendientes:
+            try:
+                colecciones[nombre]()
+            except Exception as e:
+                print(f"Error al volcar la colección {nombre}: {e}")
+                # Se vuelve a marcar para reintentar en el próximo volcado
+                with cerrojo_sucias:
+                    colecciones_sucias.add(nombre)
+
+#----------------------------------------------------------------------------------------------
+
+# Inicia el hilo de volcado si no existe en este proceso (por ejemplo, después de un fork)
+def _iniciar_hilo_volcado():
+    global hilo_volcado, pid_hilo_volcado
+    if hilo_volcado is not None and pid_hilo_volcado == os.getpid() and hilo_volcado.is_alive():
+        return
+    with cerrojo_sucias:
+        if hilo_volcado is not None and pid_hilo_volcado == os.getpid() and hilo_volcado.is_alive():
+            return
+        hilo_volcado = threading.Thread(target=_bucle_volcado, name="volcado-csv", daemon=True)
+        pid_hilo_volcado = os.getpid()
+        hilo_volcado.start()
+
+#----------------------------------------------------------------------------------------------
+
+# Espera cambios, deja pasar retardo_volcado para agrupar la ráfaga y vuelca
+def _bucle_volcado():
+    while True:
+        evento_cambios.wait()
+        evento_cambios.clear()
+        if retardo_volcado > 0:
+            time.sleep(retardo_volcado)
+        volcar_todo()
+
+#----------------------------------------------------------------------------------------------
+
+# Escribe un CSV completo de forma atómica: archivo temporal, fsync y renombrado.
+# Con 'tipo' (la clase de registro con la que se lee, ver modelos/registros.py) escribe también su instantánea binaria
+def escribir_csv_atomico(ruta, campo_nombres, filas, tipo=None):
+    ruta_temporal = ruta + '.tmp'
+    with open(ruta_temporal, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=campo_nombres)
+        writer.writeheader()
+        for fila in filas:
+            writer.writerow(fila)
+        csvfile.flush()
+        os.fsync(csvfile.fileno())
+    os.replace(ruta_temporal, ruta)
+    if tipo is not None:
+        escribir_instantanea(ruta, campo_nombres, filas, tipo)
+
+#----------------------------------------------------------------------------------------------
+
+# Asegura que los cambios pendientes se vuelquen al terminar el proceso,
+# tanto en una salida normal como al recibir SIGTERM
+def instalar_volcado_al_terminar():
+    atexit.register(volcar_todo)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
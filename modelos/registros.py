@@ -0,0 +1,165 @@
+# -----------------------------------------------------------------
+# Módulo de registros compactos de las colecciones
+# -----------------------------------------------------------------
+# Médicos, pacientes, horarios de agenda y turnos se guardan en memoria
+# como objetos con __slots__ en lugar de diccionarios: cada registro ocupa
+# solo sus campos, sin la tabla de un dict. Los valores que se repiten
+# entre registros (horas, fechas, nombres, calles, 'True'/'False' y los IDs
+# de médico de agenda y turnos) se internan, así todos los registros apuntan
+# al mismo objeto.
+#
+# Los registros se leen y escriben como el diccionario que reemplazan
+# (registro["campo"], get, keys, dict(registro)), por lo que el resto del
+# código no cambia. A JSON se pasan recién al responder (ver
+# controladores/json_registros.py), con la misma forma que antes.
+
+from collections.abc import Mapping
+import sys
+
+# Variables globales que usaremos en este módulo
+enteros = {}  # Enteros internados: un solo objeto por valor (los int > 256 no se comparten solos)
+
+#----------------------------------------------------------------------------------------------
+
+# Interna una cadena o un entero para compartirlo entre registros; otros valores quedan igual
+def internar(valor):
+    if type(valor) is str:
+        return sys.intern(valor)
+    if type(valor) is int:
+        return enteros.setdefault(valor, valor)
+    return valor
+
+#----------------------------------------------------------------------------------------------
+
+# Base de los registros: un Mapping de solo los campos de la clase, que además permite
+# modificar un campo existente con registro["campo"] = valor
+class Registro(Mapping):
+    __slots__ = ()
+    campos = ()                 # Nombres de los campos, en el orden de las columnas del CSV
+    campos_internados = frozenset()
+    conjunto_campos = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.conjunto_campos = frozenset(cls.campos)
+
+    def __getitem__(self, campo):
+        if campo not in self.conjunto_campos:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __setitem__(self, campo, valor):
+        if campo not in self.conjunto_campos:
+            raise KeyError(campo)
+        setattr(self, campo, internar(valor) if campo in self.campos_internados else valor)
+
+    def __contains__(self, campo):
+        return campo in self.conjunto_campos
+
+    def __iter__(self):
+        return iter(self.campos)
+
+    def __len__(self):
+        return len(self.campos)
+
+    def get(self, campo, defecto=None):
+        return getattr(self, campo) if campo in self.conjunto_campos else defecto
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.a_dict()!r})"
+
+    # Diccionario con los campos, para serializar a JSON
+    def a_dict(self):
+        return {campo: getattr(self, campo) for campo in self.campos}
+
+    # Valores de los campos en orden, para la instantánea binaria
+    def valores(self):
+        return tuple(getattr(self, campo) for campo in self.campos)
+
+#----------------------------------------------------------------------------------------------
+
+# Médico; 'habilitado' es booleano si se creó por la API o texto si vino del CSV
+class Medico(Registro):
+    __slots__ = ('id', 'dni', 'nombre', 'apellido', 'matricula', 'telefono', 'email', 'habilitado')
+    campos = __slots__
+    campos_internados = frozenset({'habilitado'})
+
+    def __init__(self, id, dni, nombre, apellido, matricula, telefono, email, habilitado):
+        self.id = id
+        self.dni = dni
+        self.nombre = nombre
+        self.apellido = apellido
+        self.matricula = matricula
+        self.telefono = telefono
+        self.email = email
+        self.habilitado = internar(habilitado)
+
+    # Convierte una fila leída del CSV: el ID y la matrícula de cadena a entero
+    @classmethod
+    def desde_fila(cls, fila):
+        return cls(int(fila['id']), fila.get('dni'), fila.get('nombre'), fila.get('apellido'), int(fila['matricula']),
+                   fila.get('telefono'), fila.get('email'), fila.get('habilitado'))
+
+#----------------------------------------------------------------------------------------------
+
+# Paciente
+class Paciente(Registro):
+    __slots__ = ('id', 'dni', 'nombre', 'apellido', 'telefono', 'email', 'dir_calle', 'dir_numero')
+    campos = __slots__
+    campos_internados = frozenset({'nombre', 'apellido', 'dir_calle'})
+
+    def __init__(self, id, dni, nombre, apellido, telefono, email, dir_calle, dir_numero):
+        self.id = id
+        self.dni = dni
+        self.nombre = internar(nombre)
+        self.apellido = internar(apellido)
+        self.telefono = telefono
+        self.email = email
+        self.dir_calle = internar(dir_calle)
+        self.dir_numero = dir_numero
+
+    # Convierte una fila leída del CSV: el ID de cadena a entero
+    @classmethod
+    def desde_fila(cls, fila):
+        return cls(int(fila['id']), fila.get('dni'), fila.get('nombre'), fila.get('apellido'), fila.get('telefono'),
+                   fila.get('email'), fila.get('dir_calle'), fila.get('dir_numero'))
+
+#----------------------------------------------------------------------------------------------
+
+# Horario de un médico para un día de la semana
+class Horario(Registro):
+    __slots__ = ('id_medico', 'dia_numero', 'hora_inicio', 'hora_fin', 'fecha_actualizacion')
+    campos = __slots__
+    campos_internados = frozenset({'id_medico', 'hora_inicio', 'hora_fin', 'fecha_actualizacion'})
+
+    def __init__(self, id_medico, dia_numero, hora_inicio, hora_fin, fecha_actualizacion):
+        self.id_medico = internar(id_medico)
+        self.dia_numero = dia_numero
+        self.hora_inicio = internar(hora_inicio)
+        self.hora_fin = internar(hora_fin)
+        self.fecha_actualizacion = internar(fecha_actualizacion)
+
+    # Convierte un horario leído del CSV: el ID del médico y el día de cadena a entero
+    @classmethod
+    def desde_fila(cls, fila):
+        return cls(int(fila['id_medico']), int(fila['dia_numero']), fila.get('hora_inicio'), fila.get('hora_fin'),
+                   fila.get('fecha_actualizacion'))
+
+#----------------------------------------------------------------------------------------------
+
+# Turno de un paciente con un médico
+class Turno(Registro):
+    __slots__ = ('id_medico', 'id_paciente', 'hora_turno', 'fecha_solicitud')
+    campos = __slots__
+    campos_internados = frozenset({'id_medico', 'hora_turno', 'fecha_solicitud'})
+
+    def __init__(self, id_medico, id_paciente, hora_turno, fecha_solicitud):
+        self.id_medico = internar(id_medico)
+        self.id_paciente = id_paciente
+        self.hora_turno = internar(hora_turno)
+        self.fecha_solicitud = internar(fecha_solicitud)
+
+    # Convierte una fila leída del CSV: los IDs de cadena a entero
+    @classmethod
+    def desde_fila(cls, fila):
+        return cls(int(fila['id_medico']), int(fila['id_paciente']), fila.get('hora_turno'), fila.get('fecha_solicitud'))
@@ -0,0 +1,49 @@
+# -----------------------------------------------------------------
+# Módulo de selección del backend de almacenamiento
+# -----------------------------------------------------------------
+# Las funciones de los modelos (obtener_*, crear_*, actualizar_*,
+# eliminar_*) se marcan con @delegable. Con el backend "csv" se ejecuta
+# la implementación en memoria del propio modelo; con "sqlite" la llamada
+# se redirige a la función del mismo nombre en repositorio_sqlite.
+
+import functools
+
+# Variables globales que usaremos en este módulo
+backends_disponibles = ["csv", "sqlite"]
+backend = "csv"        # Backend activo
+implementacion = None  # Módulo que implementa el backend activo cuando no es "csv"
+
+#----------------------------------------------------------------------------------------------
+
+# Selecciona el backend de almacenamiento; debe llamarse al iniciar, antes de atender solicitudes
+def configurar_backend(nombre, ruta_sqlite=None):
+    global backend, implementacion
+    if nombre not in backends_disponibles:
+        raise ValueError(f"Backend inválido: {nombre}. Debe ser uno de {backends_disponibles}")
+    if nombre == "sqlite":
+        from modelos import repositorio_sqlite
+        repositorio_sqlite.inicializar_base(ruta_sqlite)
+        implementacion = repositorio_sqlite
+    else:
+        implementacion = None
+    backend = nombre
+
+#----------------------------------------------------------------------------------------------
+
+# Indica si los datos viven en las listas en memoria respaldadas por CSV
+def usa_backend_csv():
+    return backend == "csv"
+
+#----------------------------------------------------------------------------------------------
+
+# Decorador que redirige la función al backend activo
+def delegable(funcion):
+    nombre = funcion.__name__
+
+    @functools.wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        if implementacion is None:
+            return funcion(*args, **kwargs)
+        return getattr(implementacion, nombre)(*args, **kwargs)
+
+    return envoltorio
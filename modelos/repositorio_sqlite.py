@@ -0,0 +1,531 @@
+# -----------------------------------------------------------------
+# Módulo de almacenamiento en SQLite
+# -----------------------------------------------------------------
+# Implementa las mismas funciones que los modelos en memoria, con el mismo
+# nombre y los mismos valores de retorno. Los datos no se cargan en RAM:
+# cada consulta usa los índices de la base. La base trabaja en modo WAL,
+# así varios lectores pueden consultar mientras otro escribe.
+
+from datetime import datetime, timedelta
+from modelos import medico, paciente, agenda_medico, turno
+from modelos.indice_turnos import limpiar_indices
+from modelos.generador_datos import usa_datos_sinteticos, crear_archivo_medicos_sinteticos, crear_archivo_pacientes_sinteticos
+from modelos.indice_pacientes import limpiar_indice_pacientes, palabras_de_texto, largo_minimo
+from modelos.disponibilidad import fechas_ventana, dia_numero_de_fecha, slots_del_horario, minutos_del_dia, hora_desde_minutos, bit_de_hora, mascara_del_horario
+import os
+import sqlite3
+import threading
+
+# Variables globales que usaremos en este módulo
+ruta_base = 'modelos\\api.sqlite3'
+conexiones = threading.local()  # Una conexión por hilo (y por proceso)
+
+esquema = """
+CREATE TABLE IF NOT EXISTS medicos (
+    id INTEGER PRIMARY KEY,
+    dni TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    apellido TEXT NOT NULL,
+    matricula INTEGER NOT NULL,
+    telefono TEXT NOT NULL,
+    email TEXT NOT NULL,
+    habilitado INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_medicos_dni ON medicos (dni);
+
+CREATE TABLE IF NOT EXISTS pacientes (
+    id INTEGER PRIMARY KEY,
+    dni TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    apellido TEXT NOT NULL,
+    telefono TEXT NOT NULL,
+    email TEXT NOT NULL,
+    dir_calle TEXT NOT NULL,
+    dir_numero TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pacientes_dni ON pacientes (dni);
+
+CREATE TABLE IF NOT EXISTS agenda (
+    id_medico INTEGER NOT NULL,
+    dia_numero INTEGER NOT NULL,
+    hora_inicio TEXT NOT NULL,
+    hora_fin TEXT NOT NULL,
+    fecha_actualizacion TEXT NOT NULL,
+    PRIMARY KEY (id_medico, dia_numero)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS turnos (
+    id INTEGER PRIMARY KEY,
+    id_medico INTEGER NOT NULL,
+    id_paciente INTEGER NOT NULL,
+    hora_turno TEXT NOT NULL,
+    fecha_solicitud TEXT NOT NULL,
+    inicio TEXT NOT NULL  -- 'AAAA-MM-DD HH:MM', ordenable como texto
+);
+CREATE INDEX IF NOT EXISTS idx_turnos_medico_inicio ON turnos (id_medico, inicio);
+CREATE INDEX IF NOT EXISTS idx_turnos_paciente_medico ON turnos (id_paciente, id_medico);
+CREATE INDEX IF NOT EXISTS idx_turnos_horario ON turnos (id_medico, fecha_solicitud, hora_turno);
+
+CREATE TABLE IF NOT EXISTS versiones (
+    coleccion TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO versiones (coleccion, version) VALUES ('medicos', 0), ('pacientes', 0), ('agenda', 0), ('turnos', 0);
+"""
+
+# Cada tabla incrementa su versión con triggers, dentro de la misma transacción que la
+# modifica; así la versión es correcta aunque escriban otros procesos sobre la misma base
+for tabla in ["medicos", "pacientes", "agenda", "turnos"]:
+    for operacion in ["INSERT", "UPDATE", "DELETE"]:
+        esquema += f"""
+CREATE TRIGGER IF NOT EXISTS version_{tabla}_{operacion.lower()} AFTER {operacion} ON {tabla}
+BEGIN UPDATE versiones SET version = version + 1 WHERE coleccion = '{tabla}'; END;"""
+
+# Consultas parametrizadas: sqlite3 guarda la sentencia preparada en la caché de cada conexión
+columnas_medico = "id, dni, nombre, apellido, matricula, telefono, email, habilitado"
+columnas_paciente = "id, dni, nombre, apellido, telefono, email, dir_calle, dir_numero"
+columnas_agenda = "id_medico, dia_numero, hora_inicio, hora_fin, fecha_actualizacion"
+columnas_turno = "id_medico, id_paciente, hora_turno, fecha_solicitud"
+
+sql_version = "SELECT version FROM versiones WHERE coleccion = ?"
+sql_medicos = f"SELECT {columnas_medico} FROM medicos ORDER BY id"
+sql_medicos_pagina = f"SELECT {columnas_medico} FROM medicos WHERE id > ? AND (? IS NULL OR habilitado = ?) ORDER BY id LIMIT ?"
+sql_medico_por_id = f"SELECT {columnas_medico} FROM medicos WHERE id = ?"
+sql_medico_por_dni = f"SELECT {columnas_medico} FROM medicos WHERE dni = ? LIMIT 1"
+sql_medico_habilitado = f"SELECT {columnas_medico} FROM medicos WHERE id = ? AND habilitado = 1"
+sql_insertar_medico = "INSERT INTO medicos (id, dni, nombre, apellido, matricula, telefono, email, habilitado) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+sql_actualizar_medico = "UPDATE medicos SET dni = ?, nombre = ?, apellido = ?, matricula = ?, telefono = ?, email = ?, habilitado = ? WHERE id = ?"
+
+sql_pacientes = f"SELECT {columnas_paciente} FROM pacientes ORDER BY id"
+sql_pacientes_pagina = f"SELECT {columnas_paciente} FROM pacientes WHERE id > ? ORDER BY id LIMIT ?"
+sql_paciente_por_id = f"SELECT {columnas_paciente} FROM pacientes WHERE id = ?"
+sql_paciente_por_dni = f"SELECT {columnas_paciente} FROM pacientes WHERE dni = ? LIMIT 1"
+sql_insertar_paciente = "INSERT INTO pacientes (id, dni, nombre, apellido, telefono, email, dir_calle, dir_numero) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+sql_actualizar_paciente = "UPDATE pacientes SET dni = ?, nombre = ?, apellido = ?, telefono = ?, email = ?, dir_calle = ?, dir_numero = ? WHERE id = ?"
+sql_eliminar_paciente = "DELETE FROM pacientes WHERE id = ?"
+# Cada palabra buscada agrega la condición 'palabras LIKE ?' con '% palabra%'
+sql_buscar_pacientes = f"SELECT {columnas_paciente} FROM pacientes WHERE id > ? AND {{condiciones}} ORDER BY id LIMIT ?"
+sql_palabras_paciente = "(' ' || palabras_busqueda(nombre, apellido, email, dni))"
+
+sql_agenda = f"SELECT {columnas_agenda} FROM agenda ORDER BY id_medico, dia_numero"
+sql_agenda_pagina = f"SELECT {columnas_agenda} FROM agenda WHERE (id_medico, dia_numero) > (?, ?) AND (? IS NULL OR id_medico = ?) ORDER BY id_medico, dia_numero LIMIT ?"
+sql_agenda_por_medico = f"SELECT {columnas_agenda} FROM agenda WHERE id_medico = ? ORDER BY dia_numero"
+sql_agenda_por_dia = f"SELECT {columnas_agenda} FROM agenda WHERE id_medico = ? AND dia_numero = ?"
+sql_insertar_agenda = "INSERT OR REPLACE INTO agenda (id_medico, dia_numero, hora_inicio, hora_fin, fecha_actualizacion) VALUES (?, ?, ?, ?, ?)"
+sql_actualizar_agenda = "UPDATE agenda SET hora_inicio = ?, hora_fin = ?, fecha_actualizacion = ? WHERE id_medico = ? AND dia_numero = ?"
+sql_eliminar_agenda = "DELETE FROM agenda WHERE id_medico = ? AND dia_numero = ?"
+
+sql_turnos_por_medico = f"SELECT {columnas_turno} FROM turnos WHERE id_medico = ? ORDER BY id"
+sql_turnos_pendientes = f"SELECT {columnas_turno} FROM turnos WHERE id_medico = ? AND inicio > ? ORDER BY inicio"
+sql_turnos_por_paciente = f"SELECT {columnas_turno} FROM turnos WHERE id_paciente = ? ORDER BY id"
+sql_turno_en_horario = "SELECT 1 FROM turnos WHERE id_medico = ? AND fecha_solicitud = ? AND hora_turno = ? LIMIT 1"
+sql_turno_medico_paciente = "SELECT 1 FROM turnos WHERE id_paciente = ? AND id_medico = ? LIMIT 1"
+sql_turno_pendiente_paciente = f"SELECT {columnas_turno} FROM turnos WHERE id_paciente = ? AND id_medico = ? AND inicio > ? ORDER BY inicio LIMIT 1"
+sql_insertar_turno = "INSERT INTO turnos (id_medico, id_paciente, hora_turno, fecha_solicitud, inicio) VALUES (?, ?, ?, ?, ?)"
+sql_eliminar_turnos = "DELETE FROM turnos WHERE id_medico = ? AND id_paciente = ?"
+sql_turnos_entre = f"SELECT {columnas_turno} FROM turnos WHERE id_medico = ? AND inicio >= ? AND inicio < ? ORDER BY inicio, id"
+sql_contar_turnos_por_medico = "SELECT id_medico, COUNT(*) FROM turnos WHERE inicio >= ? AND inicio < ? GROUP BY id_medico"
+sql_horarios_ocupados = "SELECT fecha_solicitud, hora_turno FROM turnos WHERE id_medico = ? AND inicio >= ? AND inicio < ?"
+sql_horarios_ocupados_todos = "SELECT id_medico, fecha_solicitud, hora_turno FROM turnos WHERE inicio >= ? AND inicio < ?"
+
+#----------------------------------------------------------------------------------------------
+
+# Crea el esquema y, si la base está vacía, importa los CSV existentes
+def inicializar_base(ruta=None):
+    global ruta_base
+    if ruta:
+        ruta_base = ruta
+    conexion = _conexion()
+    conexion.executescript(esquema)
+    if conexion.execute("SELECT COUNT(*) FROM medicos").fetchone()[0] == 0:
+        importar_desde_csv()
+
+#----------------------------------------------------------------------------------------------
+
+# Devuelve la conexión del hilo actual, abriéndola si hace falta
+def _conexion():
+    conexion = getattr(conexiones, "conexion", None)
+    if conexion is None or conexiones.pid != os.getpid():
+        # isolation_level=None: las transacciones se abren explícitamente con BEGIN IMMEDIATE
+        conexion = sqlite3.connect(ruta_base, isolation_level=None, cached_statements=128, timeout=30)
+        conexion.row_factory = sqlite3.Row
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.execute("PRAGMA foreign_keys=ON")
+        # Las palabras normalizadas de un paciente, como en el índice de búsqueda en memoria
+        conexion.create_function("palabras_busqueda", 4, _palabras_busqueda, deterministic=True)
+        conexiones.conexion = conexion
+        conexiones.pid = os.getpid()
+    return conexion
+
+#----------------------------------------------------------------------------------------------
+
+# Ejecuta una función de escritura dentro de una transacción inmediata
+def _transaccion(funcion, *args):
+    conexion = _conexion()
+    conexion.execute("BEGIN IMMEDIATE")
+    try:
+        resultado = funcion(conexion, *args)
+        conexion.execute("COMMIT")
+        return resultado
+    except Exception:
+        conexion.execute("ROLLBACK")
+        raise
+
+#----------------------------------------------------------------------------------------------
+
+# Importa una única vez los CSV existentes, reutilizando los importadores de cada modelo
+def importar_desde_csv():
+    print("Base SQLite vacía, importando datos desde los archivos CSV..")
+    filas_medicos, filas_pacientes, filas_agenda, filas_turnos = [], [], [], []
+    # Con datos sintéticos, los médicos y pacientes que faltan se generan como en el backend csv
+    if usa_datos_sinteticos():
+        if not os.path.exists(medico.ruta_archivo_medicos):
+            print("El archivo medicos.csv no existe. Generando datos sintéticos...")
+            crear_archivo_medicos_sinteticos(medico.ruta_archivo_medicos, 10)
+        if not os.path.exists(paciente.ruta_archivo_pacientes):
+            print("El archivo pacientes.csv no existe. Generando datos sintéticos...")
+            crear_archivo_pacientes_sinteticos(paciente.ruta_archivo_pacientes, 50)
+    if os.path.exists(medico.ruta_archivo_medicos):
+        medico.importar_datos_medicos_desde_csv()
+        filas_medicos = [(m["id"], m["dni"], m["nombre"], m["apellido"], m["matricula"], m["telefono"], m["email"], _a_entero_habilitado(m["habilitado"])) for m in medico.medicos]
+    if os.path.exists(paciente.ruta_archivo_pacientes):
+        paciente.importar_datos_pacientes_desde_csv()
+        filas_pacientes = [(p["id"], p["dni"], p["nombre"], p["apellido"], p["telefono"], p["email"], p["dir_calle"], p["dir_numero"]) for p in paciente.pacientes]
+    if os.path.exists(agenda_medico.ruta_archivo_agenda):
+        filas_agenda = [(a["id_medico"], a["dia_numero"], a["hora_inicio"], a["hora_fin"], a["fecha_actualizacion"]) for a in agenda_medico.cargar_agenda_desde_archivo()]
+    elif usa_datos_sinteticos():
+        # Sin archivo de agenda, los médicos habilitados reciben el horario predeterminado
+        filas_agenda = [(a["id_medico"], a["dia_numero"], a["hora_inicio"], a["hora_fin"], a["fecha_actualizacion"]) for a in agenda_medico.horarios_predeterminados(medico.medicos)]
+    if os.path.exists(turno.ruta_archivo_turnos):
+        turno.importar_datos_turnos_desde_csv()
+        filas_turnos = [(t["id_medico"], t["id_paciente"], t["hora_turno"], t["fecha_solicitud"], _inicio(t["fecha_solicitud"], t["hora_turno"])) for t in turno.turnos]
+
+    def insertar(conexion):
+        conexion.executemany(sql_insertar_medico, filas_medicos)
+        conexion.executemany(sql_insertar_paciente, filas_pacientes)
+        conexion.executemany(sql_insertar_agenda, filas_agenda)
+        conexion.executemany(sql_insertar_turno, filas_turnos)
+    _transaccion(insertar)
+
+    # Las listas en memoria solo se usaron para la migración
+    medico.medicos.clear()
+    medico.medicos_por_id.clear()
+    medico.medicos_por_dni.clear()
+    paciente.pacientes.clear()
+    paciente.pacientes_por_id.clear()
+    paciente.pacientes_por_dni.clear()
+    limpiar_indice_pacientes()
+    turno.turnos.clear()
+    limpiar_indices()
+
+#----------------------------------------------------------------------------------------------
+
+# Palabras normalizadas del nombre, apellido, email y DNI, separadas por espacios
+def _palabras_busqueda(*campos):
+    return " ".join(palabra for campo in campos if campo for palabra in palabras_de_texto(campo))
+
+#----------------------------------------------------------------------------------------------
+
+# Convierte el valor de 'habilitado' (booleano o texto) a 0/1
+def _a_entero_habilitado(habilitado):
+    return 1 if str(habilitado).lower() == "true" else 0
+
+#----------------------------------------------------------------------------------------------
+
+# Convierte fecha 'DD-MM-AAAA' y hora 'HH:MM' al formato ordenable 'AAAA-MM-DD HH:MM'
+def _inicio(fecha_turno, hora_turno):
+    return datetime.strptime(fecha_turno + " " + hora_turno, "%d-%m-%Y %H:%M").strftime("%Y-%m-%d %H:%M")
+
+#----------------------------------------------------------------------------------------------
+
+# Convierte un rango de fechas 'DD-MM-AAAA' incluidas al rango [desde, hasta) de la columna 'inicio'.
+# Sin fecha el rango queda abierto: '' va antes y '~' después de cualquier inicio
+def _rango_inicio(fecha_desde, fecha_hasta):
+    desde = "" if fecha_desde is None else _inicio(fecha_desde, "00:00")
+    if fecha_hasta is None:
+        return desde, "~"
+    hasta = datetime.strptime(fecha_hasta, "%d-%m-%Y") + timedelta(days=1)
+    return desde, hasta.strftime("%Y-%m-%d %H:%M")
+
+#----------------------------------------------------------------------------------------------
+
+# Momento actual en el formato de la columna 'inicio'
+def _ahora():
+    return datetime.now().strftime("%Y-%m-%d %H:%M")
+
+#----------------------------------------------------------------------------------------------
+
+# Límite para una consulta paginada; en SQLite LIMIT -1 significa sin límite
+def _limite(limite):
+    return -1 if limite is None else limite
+
+#----------------------------------------------------------------------------------------------
+
+# ID a partir del cual empieza una página; los IDs son siempre mayores que -1
+def _desde(despues_de):
+    return -1 if despues_de is None else despues_de
+
+#----------------------------------------------------------------------------------------------
+
+# Convierte filas de la base a diccionarios como los de los modelos en memoria
+def _a_dicts(filas):
+    return [dict(fila) for fila in filas]
+
+def _a_dict(fila):
+    return dict(fila) if fila is not None else None
+
+def _medico_a_dict(fila):
+    if fila is None:
+        return None
+    medico_dict = dict(fila)
+    medico_dict["habilitado"] = bool(medico_dict["habilitado"])
+    return medico_dict
+
+# -----------------------------------------------------------------
+# Médicos
+# -----------------------------------------------------------------
+
+def obtener_medicos(limite=None, despues_de=None, habilitado=None):
+    if limite is None and despues_de is None and habilitado is None:
+        return [_medico_a_dict(fila) for fila in _conexion().execute(sql_medicos)]
+    filtro = None if habilitado is None else _a_entero_habilitado(habilitado)
+    filas = _conexion().execute(sql_medicos_pagina, (_desde(despues_de), filtro, filtro, _limite(limite)))
+    return [_medico_a_dict(fila) for fila in filas]
+
+def obtener_medico_por_id(id_medico):
+    return _medico_a_dict(_conexion().execute(sql_medico_por_id, (id_medico,)).fetchone())
+
+def obtener_medico_por_dni(dni):
+    return _medico_a_dict(_conexion().execute(sql_medico_por_dni, (dni,)).fetchone())
+
+def obtener_medico_habilitado(id_medico):
+    return _medico_a_dict(_conexion().execute(sql_medico_habilitado, (id_medico,)).fetchone())
+
+def crear_medico(dni, nombre, apellido, matricula, telefono, email, habilitado):
+    def insertar(conexion):
+        cursor = conexion.execute(sql_insertar_medico, (None, dni, nombre, apellido, matricula, telefono, email, _a_entero_habilitado(habilitado)))
+        return cursor.lastrowid
+    return obtener_medico_por_id(_transaccion(insertar))
+
+def crear_medicos_en_lote(datos_medicos):
+    def insertar(conexion):
+        return [conexion.execute(sql_insertar_medico, (None, dni, nombre, apellido, matricula, telefono, email, _a_entero_habilitado(habilitado))).lastrowid
+                for dni, nombre, apellido, matricula, telefono, email, habilitado in datos_medicos]
+    # Todo el lote se confirma en una única transacción
+    return [obtener_medico_por_id(id_medico) for id_medico in _transaccion(insertar)]
+
+def actualizar_medico_por_id(id_medico, dni, nombre, apellido, matricula, telefono, email, habilitado):
+    def actualizar(conexion):
+        return conexion.execute(sql_actualizar_medico, (dni, nombre, apellido, matricula, telefono, email, _a_entero_habilitado(habilitado), id_medico)).rowcount
+    if _transaccion(actualizar) == 0:
+        return None
+    return obtener_medico_por_id(id_medico)
+
+# -----------------------------------------------------------------
+# Pacientes
+# -----------------------------------------------------------------
+
+def obtener_pacientes(limite=None, despues_de=None):
+    if limite is None and despues_de is None:
+        return _a_dicts(_conexion().execute(sql_pacientes))
+    return _a_dicts(_conexion().execute(sql_pacientes_pagina, (_desde(despues_de), _limite(limite))))
+
+def obtener_paciente_por_id(id_paciente):
+    return _a_dict(_conexion().execute(sql_paciente_por_id, (id_paciente,)).fetchone())
+
+def obtener_paciente_por_dni(dni):
+    return _a_dict(_conexion().execute(sql_paciente_por_dni, (dni,)).fetchone())
+
+def crear_paciente(dni, nombre, apellido, telefono, email, dir_calle, dir_numero):
+    def insertar(conexion):
+        return conexion.execute(sql_insertar_paciente, (None, dni, nombre, apellido, telefono, email, dir_calle, dir_numero)).lastrowid
+    return obtener_paciente_por_id(_transaccion(insertar))
+
+def crear_pacientes_en_lote(datos_pacientes):
+    def insertar(conexion):
+        return [conexion.execute(sql_insertar_paciente, (None, *datos)).lastrowid for datos in datos_pacientes]
+    # Todo el lote se confirma en una única transacción
+    return [obtener_paciente_por_id(id_paciente) for id_paciente in _transaccion(insertar)]
+
+def actualizar_paciente_por_id(id_paciente, dni, nombre, apellido, telefono, email, dir_calle, dir_numero):
+    def actualizar(conexion):
+        return conexion.execute(sql_actualizar_paciente, (dni, nombre, apellido, telefono, email, dir_calle, dir_numero, id_paciente)).rowcount
+    if _transaccion(actualizar) == 0:
+        return None
+    return obtener_paciente_por_id(id_paciente)
+
+def eliminar_paciente_por_id(id_paciente):
+    return _transaccion(lambda conexion: conexion.execute(sql_eliminar_paciente, (id_paciente,)).rowcount) > 0
+
+def buscar_pacientes(texto, limite=None, despues_de=None):
+    # Sin índice invertido en la base: se recorre la tabla comparando las palabras normalizadas
+    prefijos = sorted({palabra for palabra in palabras_de_texto(texto) if len(palabra) >= largo_minimo})
+    if not prefijos:
+        return []
+    condiciones = " AND ".join(f"{sql_palabras_paciente} LIKE ?" for _ in prefijos)
+    parametros = (_desde(despues_de), *(f"% {prefijo}%" for prefijo in prefijos), _limite(limite))
+    return _a_dicts(_conexion().execute(sql_buscar_pacientes.format(condiciones=condiciones), parametros))
+
+# -----------------------------------------------------------------
+# Agenda
+# -----------------------------------------------------------------
+
+def obtener_agenda_medicos():
+    return _a_dicts(_conexion().execute(sql_agenda))
+
+def obtener_agenda_ordenada_medicos(limite=None, despues_de=None, id_medico=None):
+    if limite is None and despues_de is None and id_medico is None:
+        return _a_dicts(_conexion().execute(sql_agenda))
+    id_desde, dia_desde = despues_de if despues_de is not None else (-1, -1)
+    return _a_dicts(_conexion().execute(sql_agenda_pagina, (id_desde, dia_desde, id_medico, id_medico, _limite(limite))))
+
+def obtener_agenda_medico_por_id(id_medico):
+    return _a_dicts(_conexion().execute(sql_agenda_por_medico, (id_medico,)))
+
+def crear_agenda_medico(id_medico, dia_numero, hora_inicio, hora_fin):
+    if datetime.strptime(hora_inicio, "%H:%M") >= datetime.strptime(hora_fin, "%H:%M"):
+        return {"error": "La hora de inicio debe ser menor a la hora de fin"}
+    nuevo_horario = {
+        "id_medico": id_medico,
+        "dia_numero": dia_numero,
+        "hora_inicio": hora_inicio,
+        "hora_fin": hora_fin,
+        "fecha_actualizacion": datetime.now().strftime("%d-%m-%Y")
+    }
+    def insertar(conexion):
+        if conexion.execute(sql_agenda_por_dia, (id_medico, dia_numero)).fetchone() is not None:
+            return False
+        conexion.execute(sql_insertar_agenda, (id_medico, dia_numero, hora_inicio, hora_fin, nuevo_horario["fecha_actualizacion"]))
+        return True
+    if not _transaccion(insertar):
+        return {"error": "El día indicado ya está agendado"}
+    return nuevo_horario
+
+def eliminar_dia_agenda_medico_por_id(id_medico, dia_numero):
+    return _transaccion(lambda conexion: conexion.execute(sql_eliminar_agenda, (id_medico, dia_numero)).rowcount) > 0
+
+def actualizar_agenda_por_dia(id_medico, dia_numero, hora_inicio, hora_fin):
+    if datetime.strptime(hora_inicio, "%H:%M") >= datetime.strptime(hora_fin, "%H:%M"):
+        return {"error": "La hora de inicio debe ser menor a la de fin"}
+    fecha_actualizacion = datetime.now().strftime("%d-%m-%Y")
+    if _transaccion(lambda conexion: conexion.execute(sql_actualizar_agenda, (hora_inicio, hora_fin, fecha_actualizacion, id_medico, dia_numero)).rowcount) == 0:
+        return None
+    return obtener_agenda_medico_por_id(id_medico)
+
+def obtener_dia_agenda(id_medico, fecha_turno):
+    dia_turno = int(datetime.strptime(fecha_turno, "%d-%m-%Y").strftime('%w'))
+    return _a_dict(_conexion().execute(sql_agenda_por_dia, (id_medico, dia_turno)).fetchone())
+
+def obtener_hora_agenda(id_medico, hora_turno, fecha_turno):
+    dia_turno = int(datetime.strptime(fecha_turno, "%d-%m-%Y").strftime('%w'))
+    horario = _a_dict(_conexion().execute(sql_agenda_por_dia, (id_medico, dia_turno)).fetchone())
+    # La hora se compara en la grilla de 15 minutos, con la misma máscara que el backend csv
+    if horario is None or not bit_de_hora(hora_turno) & mascara_del_horario(horario["hora_inicio"], horario["hora_fin"]):
+        return None
+    return horario
+
+# -----------------------------------------------------------------
+# Turnos
+# -----------------------------------------------------------------
+
+def obtener_turno_por_id_medico(id_medico):
+    return _a_dicts(_conexion().execute(sql_turnos_por_medico, (id_medico,)))
+
+def obtener_turno_pendiente_por_id(id_medico):
+    return _a_dicts(_conexion().execute(sql_turnos_pendientes, (id_medico, _ahora())))
+
+def obtener_turnos_por_rango(id_medico, fecha_desde, fecha_hasta):
+    return _a_dicts(_conexion().execute(sql_turnos_entre, (id_medico, *_rango_inicio(fecha_desde, fecha_hasta))))
+
+# En SQLite no hay archivo de turnos: la tabla tiene todo el historial
+def obtener_historial_turnos(id_medico, fecha_desde=None, fecha_hasta=None):
+    return _a_dicts(_conexion().execute(sql_turnos_entre, (id_medico, *_rango_inicio(fecha_desde, fecha_hasta))))
+
+def contar_turnos_por_medico(fecha_desde=None, fecha_hasta=None):
+    return dict(_conexion().execute(sql_contar_turnos_por_medico, _rango_inicio(fecha_desde, fecha_hasta)).fetchall())
+
+def obtener_turno_por_paciente(id_paciente):
+    return _a_dicts(_conexion().execute(sql_turnos_por_paciente, (id_paciente,)))
+
+def obtener_turno_dado(id_medico, hora_turno, fecha_turno):
+    return _conexion().execute(sql_turno_en_horario, (id_medico, fecha_turno, hora_turno)).fetchone() is not None
+
+def obtener_paciente_turno(id_medico, id_paciente, hora_turno, fecha_turno):
+    return _a_dict(_conexion().execute(sql_turno_pendiente_paciente, (id_paciente, id_medico, _ahora())).fetchone())
+
+def crear_turno(id_medico, id_paciente, fecha_turno, hora_turno):
+    def insertar(conexion):
+        if conexion.execute(sql_turno_medico_paciente, (id_paciente, id_medico)).fetchone() is not None:
+            return False, {"error": "El paciente ya tiene un turno con el médico"}
+        # Dentro de la transacción inmediata ningún otro proceso puede tomar el horario
+        if conexion.execute(sql_turno_en_horario, (id_medico, fecha_turno, hora_turno)).fetchone() is not None:
+            return False, {"error": "El medico ya tiene un turno a esa hora"}
+        conexion.execute(sql_insertar_turno, (id_medico, id_paciente, hora_turno, fecha_turno, _inicio(fecha_turno, hora_turno)))
+        return True, {"message": "Turno creado correctamente"}
+    return _transaccion(insertar)
+
+def crear_turnos_en_lote(solicitudes):
+    def insertar(conexion):
+        resultados = []
+        for id_medico, id_paciente, fecha_turno, hora_turno in solicitudes:
+            if conexion.execute(sql_turno_medico_paciente, (id_paciente, id_medico)).fetchone() is not None:
+                resultados.append((False, {"error": "El paciente ya tiene un turno con el médico"}))
+                continue
+            if conexion.execute(sql_turno_en_horario, (id_medico, fecha_turno, hora_turno)).fetchone() is not None:
+                resultados.append((False, {"error": "El medico ya tiene un turno a esa hora"}))
+                continue
+            conexion.execute(sql_insertar_turno, (id_medico, id_paciente, hora_turno, fecha_turno, _inicio(fecha_turno, hora_turno)))
+            resultados.append((True, {"message": "Turno creado correctamente"}))
+        return resultados
+    # Todo el lote se confirma en una única transacción
+    return _transaccion(insertar)
+
+def eliminar_turno_por_id(id_medico, id_paciente):
+    return _transaccion(lambda conexion: conexion.execute(sql_eliminar_turnos, (id_medico, id_paciente)).rowcount) > 0
+
+def obtener_disponibilidad(id_medico):
+    # Sin estructura en memoria: una consulta por agenda y otra por los turnos de la ventana
+    conexion = _conexion()
+    ahora = datetime.now()
+    minuto_actual = ahora.hour * 60 + ahora.minute
+    fechas = fechas_ventana(ahora.date())
+    horarios = {fila["dia_numero"]: (minutos_del_dia(fila["hora_inicio"]), minutos_del_dia(fila["hora_fin"]))
+                for fila in conexion.execute(sql_agenda_por_medico, (id_medico,))}
+    desde = fechas[0].strftime("%Y-%m-%d")
+    hasta = (fechas[-1] + timedelta(days=1)).strftime("%Y-%m-%d")
+    ocupados = {(fila["fecha_solicitud"], fila["hora_turno"]) for fila in conexion.execute(sql_horarios_ocupados, (id_medico, desde, hasta))}
+
+    disponibilidad = []
+    for fecha in fechas:
+        horario = horarios.get(dia_numero_de_fecha(fecha))
+        if horario is None:
+            continue
+        fecha_turno = fecha.strftime("%d-%m-%Y")
+        horas = [hora_desde_minutos(minuto) for minuto in slots_del_horario(*horario)
+                 if (fecha_turno, hora_desde_minutos(minuto)) not in ocupados
+                 and (fecha != ahora.date() or minuto > minuto_actual)]
+        disponibilidad.append({"fecha": fecha_turno, "horas": horas})
+    return disponibilidad
+
+def obtener_ocupados_en_fechas(fechas_turno):
+    # Una sola consulta con los turnos de todas las fechas, que se pasan a máscaras en una pasada
+    fechas = sorted(datetime.strptime(fecha_turno, "%d-%m-%Y") for fecha_turno in fechas_turno)
+    if not fechas:
+        return {}
+    vigentes = set(fechas_turno)
+    desde = fechas[0].strftime("%Y-%m-%d")
+    hasta = (fechas[-1] + timedelta(days=1)).strftime("%Y-%m-%d")
+    resultado = {}
+    for id_medico, fecha_turno, hora_turno in _conexion().execute(sql_horarios_ocupados_todos, (desde, hasta)):
+        if fecha_turno in vigentes:
+            de_medico = resultado.setdefault(id_medico, {})
+            de_medico[fecha_turno] = de_medico.get(fecha_turno, 0) | bit_de_hora(hora_turno)
+    return resultado
+
+# -----------------------------------------------------------------
+# Versiones
+# -----------------------------------------------------------------
+
+def obtener_version(nombre):
+    return _conexion().execute(sql_version, (nombre,)).fetchone()[0]
@@ -4,9 +4,20 @@
 
 # Importaciones necesarias
 from flask import Blueprint, jsonify, request
-from datetime import datetime
+from datetime import date
+from modelos.indice_turnos import reconstruir_indices, indexar_turno, desindexar_turno, turnos_de_medico, turnos_de_paciente, turnos_de_medico_paciente, turno_en_horario, turnos_de_medico_desde, normalizar_fecha, normalizar_hora, turnos_de_medico_entre, contar_turnos_por_medico_entre, inicio_de_turno, minutos_actuales, minutos_desde_fecha_hora
+from modelos.bitacora_turnos import registrar_alta, registrar_altas, registrar_baja, leer_bitacora, leer_bitacora_nueva, rotar_bitacora, descartar_bitacora_anterior, necesita_checkpoint, cerrar_bitacora, ruta_archivo_bitacora
+from modelos.persistencia import registrar_coleccion, marcar_sucia, escribir_csv_atomico
+from modelos.repositorio import delegable
+from modelos.versiones import incrementar_version
+from modelos.concurrencia import lectura, escritura
+from modelos.multiproceso import registrar_recarga
+from modelos.instantanea import cargar_filas
+from modelos.registros import Turno
+from modelos.disponibilidad import ocupar_slot, liberar_slot, cargar_ocupados, slot_ocupado
+from modelos.archivo_turnos import necesita_archivar, marcar_archivado, escribir_en_segmentos, turnos_archivados, mes_de_fecha
+import heapq
 import requests
-import csv
 import os
 
 # Variables globales
@@ -17,135 +28,346 @@ ruta_archivo_turnos = 'modelos\\turnos.csv'
 #----------------------------------------------------------------------------------------------
 
 # Función para importar datos de turnos desde un archivo CSV
+# y reproducir encima los registros de la bitácora posteriores al último checkpoint
 def importar_datos_turnos_desde_csv():
-    global turnos    
+    # Se compacta lo reproducido para que el próximo inicio no lo repita,
+    # y con el archivo activo se sacan los turnos que ya pasaron
+    if _cargar_turnos() or necesita_archivar():
+        checkpoint_turnos()
+
+#----------------------------------------------------------------------------------------------
+
+# Carga turnos.csv y reproduce la bitácora encima, sin compactar.
+# Devuelve si había registros en la bitácora
+def _cargar_turnos():
     if os.path.exists(ruta_archivo_turnos):  
         print("Importando datos de turnos desde el archivo CSV")
-        turnos = []  # Limpiamos la lista de turnos antes de importar desde el archivo CSV
-        with open(ruta_archivo_turnos, newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                # Convertimos el ID de cadena a entero
-                row['id_medico'] = int(row['id_medico'])
-                row['id_paciente'] = int(row['id_paciente'])
-                turnos.append(row) 
+        # Se modifica la lista en el lugar; las filas vienen de la instantánea o del CSV
+        turnos[:] = cargar_filas(ruta_archivo_turnos, Turno)
+        _normalizar_horarios(turnos)
     else:
         print("No existe el archivo de turnos, creando..")
-        turnos = []  
-        exportar_a_csv()
-        
+        turnos.clear()
+        exportar_a_csv([])
+    reconstruir_indices(turnos)
+    cargar_ocupados(turnos)
+
+    registros = leer_bitacora()
+    if registros:
+        print(f"Reproduciendo {len(registros)} registros de la bitácora de turnos")
+        _reproducir_registros(registros)
+    return bool(registros)
+
+#----------------------------------------------------------------------------------------------
+
+# Pasa la fecha y la hora de cada turno a su forma normal ('9:00' -> '09:00'), como se guardan
+# los turnos nuevos: los índices y las máscaras de horarios ocupados usan esa forma como clave
+def _normalizar_horarios(lista):
+    for turno in lista:
+        fecha_turno = normalizar_fecha(turno["fecha_solicitud"])
+        if fecha_turno != turno["fecha_solicitud"]:
+            turno["fecha_solicitud"] = fecha_turno
+        hora_turno = normalizar_hora(turno["hora_turno"])
+        if hora_turno != turno["hora_turno"]:
+            turno["hora_turno"] = hora_turno
+
+#----------------------------------------------------------------------------------------------
+
+
+# Aplica en memoria las altas y bajas leídas de la bitácora
+def _reproducir_registros(registros):
+    for registro in registros:
+        if registro["operacion"] == "alta":
+            fecha_turno, hora_turno = normalizar_fecha(registro["fecha_solicitud"]), normalizar_hora(registro["hora_turno"])
+            # Un alta que ya está en el CSV (checkpoint interrumpido) no se repite
+            existente = turno_en_horario(registro["id_medico"], fecha_turno, hora_turno)
+            if existente is not None and existente["id_paciente"] == registro["id_paciente"]:
+                continue
+            turno = Turno(
+                id_medico=registro["id_medico"],
+                id_paciente=registro["id_paciente"],
+                hora_turno=hora_turno,
+                fecha_solicitud=fecha_turno
+            )
+            turnos.append(turno)
+            indexar_turno(turno)
+            ocupar_slot(turno["id_medico"], turno["fecha_solicitud"], turno["hora_turno"])
+        else:
+            _quitar_turnos(registro["id_medico"], registro["id_paciente"])
+
+#----------------------------------------------------------------------------------------------
+
+# Incorpora los cambios que otro proceso hizo en disco. Si solo se agregaron
+# registros a la bitácora se reproducen esos; si hubo un checkpoint se recarga todo
+def recargar_turnos(rutas_cambiadas):
+    with escritura("turnos"):
+        registros = None
+        if ruta_archivo_turnos not in rutas_cambiadas:
+            registros = leer_bitacora_nueva()
+        if registros is None:
+            # El archivo abierto para agregar puede ser la bitácora que el otro proceso rotó
+            cerrar_bitacora()
+            _cargar_turnos()
+        else:
+            _reproducir_registros(registros)
+        incrementar_version("turnos")
+
+registrar_recarga("turnos", [ruta_archivo_turnos, ruta_archivo_bitacora], recargar_turnos)
+
 
 #----------------------------------------------------------------------------------------------  
 
-# Función para exportar datos de turnos a un archivo CSV
-def exportar_a_csv():
-    with open(ruta_archivo_turnos, 'w', newline='', encoding='utf-8') as csvfile:
-        campo_nombres = ['id_medico', 'id_paciente', 'hora_turno', 'fecha_solicitud']
-        writer = csv.DictWriter(csvfile, fieldnames=campo_nombres)
-        writer.writeheader()
-        for turno in turnos:
-            writer.writerow(turno)
-        
+# Función para exportar datos de turnos a un archivo CSV.
+# Recibe la copia de la lista a escribir, o la toma con el cerrojo de lectura si no se pasa
+def exportar_a_csv(filas=None):
+    if filas is None:
+        with lectura("turnos"):
+            filas = list(turnos)
+    campo_nombres = ['id_medico', 'id_paciente', 'hora_turno', 'fecha_solicitud']
+    escribir_csv_atomico(ruta_archivo_turnos, campo_nombres, filas, Turno)
+
+#----------------------------------------------------------------------------------------------
+
+# Compacta los turnos en memoria en turnos.csv y descarta la bitácora ya incluida.
+# La bitácora se rota antes de copiar la lista, así los registros que lleguen
+# durante la escritura quedan en la bitácora nueva y no se pierden.
+# Con el archivo activo, el primer checkpoint de cada día archiva antes los turnos pasados.
+def checkpoint_turnos():
+    if necesita_archivar():
+        archivar_turnos_pasados()
+    # Con el cerrojo tomado ningún alta puede quedar entre la rotación y la copia
+    with lectura("turnos"):
+        rotar_bitacora()
+        filas = list(turnos)
+    exportar_a_csv(filas)
+    descartar_bitacora_anterior()
+
+# El checkpoint lo hace el módulo de persistencia en segundo plano
+registrar_coleccion("turnos", checkpoint_turnos)
+
+#----------------------------------------------------------------------------------------------
+
+# Archiva en los segmentos mensuales los turnos de días anteriores a hoy y los quita de memoria.
+# Los segmentos se escriben antes de quitar los turnos: si el proceso se corta en el medio,
+# los turnos siguen en turnos.csv y el próximo archivado no los repite en el segmento.
+# La quita no va a la bitácora: el checkpoint que sigue reescribe turnos.csv sin ellos.
+# Devuelve la cantidad de turnos archivados
+def archivar_turnos_pasados():
+    hoy = date.today()
+    corte = minutos_desde_fecha_hora(hoy.strftime("%d-%m-%Y"), "00:00")
+    with escritura("turnos"):
+        pasados = [turno for turno in turnos if inicio_de_turno(turno) < corte]
+        if pasados:
+            print(f"Archivando {len(pasados)} turnos anteriores al {hoy.strftime('%d-%m-%Y')}")
+            escribir_en_segmentos(pasados)
+            _quitar_de_memoria(pasados)
+            incrementar_version("turnos")
+    marcar_archivado(hoy)
+    return len(pasados)
+
+#----------------------------------------------------------------------------------------------
+
+# Pide un checkpoint si la bitácora alcanzó el umbral de registros o si cambió el día y hay que archivar
+def _compactar_si_corresponde():
+    if necesita_checkpoint() or necesita_archivar():
+        marcar_sucia("turnos")
+
 #----------------------------------------------------------------------------------------------
 
 # Función para obtener los turnos de un médico por su ID
+@delegable
 def obtener_turno_por_id_medico(id_medico):
-    turnos_medico = []
-    for turno in turnos:
-        if turno["id_medico"] == id_medico:
-            turnos_medico.append(turno)
-    return turnos_medico
+    return list(turnos_de_medico(id_medico))
 
 #----------------------------------------------------------------------------------------------
 
 # Función para obtener los turnos pendientes de un médico por su ID
+@delegable
 def obtener_turno_pendiente_por_id(id_medico):
-    turnos_pendientes = []
-    hoy = datetime.now()
+    # Los turnos del médico están ordenados por inicio: basta buscar el momento actual
+    return list(turnos_de_medico_desde(id_medico, minutos_actuales()))
+#----------------------------------------------------------------------------------------------
+
+# Función para obtener los turnos de un médico entre dos fechas 'DD-MM-AAAA' (ambas incluidas), en orden cronológico
+@delegable
+def obtener_turnos_por_rango(id_medico, fecha_desde, fecha_hasta):
+    desde, hasta = _rango_en_minutos(fecha_desde, fecha_hasta)
+    return list(turnos_de_medico_entre(id_medico, desde, hasta))
+
+#----------------------------------------------------------------------------------------------
+
+# Función para obtener el historial de turnos de un médico entre dos fechas 'DD-MM-AAAA' (ambas incluidas;
+# sin fecha el rango queda abierto de ese lado), en orden cronológico. A diferencia de las demás
+# consultas, incluye los turnos ya archivados, que se leen de los segmentos de los meses pedidos
+@delegable
+def obtener_historial_turnos(id_medico, fecha_desde=None, fecha_hasta=None):
+    desde, hasta = _rango_en_minutos(fecha_desde, fecha_hasta)
+
+    def en_rango(turno):
+        if turno["id_medico"] != id_medico:
+            return False
+        inicio = minutos_desde_fecha_hora(turno["fecha_solicitud"], turno["hora_turno"])
+        return (desde is None or inicio >= desde) and (hasta is None or inicio < hasta)
+
+    archivados = turnos_archivados(
+        None if fecha_desde is None else mes_de_fecha(fecha_desde),
+        None if fecha_hasta is None else mes_de_fecha(fecha_hasta),
+        en_rango
+    )
+    # Un turno que todavía está en memoria (archivado interrumpido) se muestra una sola vez
+    archivados = [turno for turno in archivados
+                  if turno_en_horario(id_medico, turno["fecha_solicitud"], turno["hora_turno"]) is None]
+    if not archivados:
+        return list(turnos_de_medico_entre(id_medico, desde, hasta))
+    archivados.sort(key=lambda turno: minutos_desde_fecha_hora(turno["fecha_solicitud"], turno["hora_turno"]))
+    return list(heapq.merge(archivados, turnos_de_medico_entre(id_medico, desde, hasta),
+                            key=lambda turno: minutos_desde_fecha_hora(turno["fecha_solicitud"], turno["hora_turno"])))
 
-    for turno in turnos:
-        # Convertir la fecha y hora del turno a objetos datetime
-        fecha_turno_dt = datetime.strptime(turno["fecha_solicitud"] + " " + turno["hora_turno"], "%d-%m-%Y %H:%M")
+#----------------------------------------------------------------------------------------------
+
+# Función para contar los turnos de cada médico entre dos fechas 'DD-MM-AAAA' (ambas incluidas;
+# sin fecha el rango queda abierto de ese lado). Devuelve {id_medico: cantidad}
+@delegable
+def contar_turnos_por_medico(fecha_desde=None, fecha_hasta=None):
+    return contar_turnos_por_medico_entre(*_rango_en_minutos(fecha_desde, fecha_hasta))
+
+#----------------------------------------------------------------------------------------------
 
-        # Verificar si la fecha es superior a la fecha actual
-        if fecha_turno_dt.date() > hoy.date():
-            turnos_pendientes.append(turno)
-        # Si la fecha es la misma que la fecha actual, verificar la hora
-        elif fecha_turno_dt.date() == hoy.date() and fecha_turno_dt.time() > hoy.time():
-            turnos_pendientes.append(turno)
+# Convierte un rango de fechas incluidas al rango de minutos [desde, hasta); None deja abierto ese lado
+def _rango_en_minutos(fecha_desde, fecha_hasta):
+    desde = None if fecha_desde is None else minutos_desde_fecha_hora(fecha_desde, "00:00")
+    hasta = None if fecha_hasta is None else minutos_desde_fecha_hora(fecha_hasta, "00:00") + 1440
+    return desde, hasta
 
-    return turnos_pendientes
 #----------------------------------------------------------------------------------------------
 
 # Función para eliminar un turno por su ID de médico y paciente
+@delegable
 def eliminar_turno_por_id(id_medico, id_paciente):
-    global turnos
-    aux_turnos = list(turnos) 
-    turnos = [turno for turno in turnos if not (turno["id_medico"] == id_medico and turno["id_paciente"] == id_paciente)]
-    if len(turnos) < len(aux_turnos):
-        exportar_a_csv()
-        return True
-    else:
+    with escritura("turnos"):
+        if not _quitar_turnos(id_medico, id_paciente):
+            return False
+        # La bitácora se escribe con el cerrojo tomado para que su orden sea el de la memoria
+        registrar_baja(id_medico, id_paciente)
+        incrementar_version("turnos")
+    _compactar_si_corresponde()
+    return True
+
+#----------------------------------------------------------------------------------------------
+
+# Quita de memoria los turnos de un paciente con un médico, sin persistir
+def _quitar_turnos(id_medico, id_paciente):
+    turnos_a_eliminar = list(turnos_de_medico_paciente(id_medico, id_paciente))
+    if not turnos_a_eliminar:
         return False
+    _quitar_de_memoria(turnos_a_eliminar)
+    return True
+
+#----------------------------------------------------------------------------------------------
+
+# Quita de la lista y de los índices los turnos dados, sin persistir
+def _quitar_de_memoria(turnos_a_eliminar):
+    for turno in turnos_a_eliminar:
+        inicio = inicio_de_turno(turno)
+        desindexar_turno(turno)
+        # La máscara tiene un bit por horario: si otro turno quedó a la misma hora
+        # (filas repetidas en un CSV editado a mano), el horario sigue ocupado
+        if not turnos_de_medico_entre(turno["id_medico"], inicio, inicio + 1):
+            liberar_slot(turno["id_medico"], turno["fecha_solicitud"], turno["hora_turno"])
+    # Se modifica la lista en el lugar para no romper las referencias existentes
+    ids_eliminados = {id(turno) for turno in turnos_a_eliminar}
+    turnos[:] = [turno for turno in turnos if id(turno) not in ids_eliminados]
     
 #----------------------------------------------------------------------------------------------
  
 # Función para crear un nuevo turno
+@delegable
 def crear_turno(id_medico, id_paciente, fecha_turno, hora_turno):
-    global turnos
-    
-    turno_medico = obtener_turno_por_id_medico(id_medico)
-    
-    if not any(turno["id_paciente"] == id_paciente for turno in turno_medico):
-        nuevo_turno = {
-            "id_medico": id_medico,
-            "id_paciente": id_paciente,
-            "fecha_solicitud": fecha_turno,
-            "hora_turno": hora_turno
-        }
+    # Se guarda la forma normal de la fecha y la hora: es la que usan las claves de los índices
+    fecha_turno, hora_turno = normalizar_fecha(fecha_turno), normalizar_hora(hora_turno)
+    with escritura("turnos"):
+        if turnos_de_medico_paciente(id_medico, id_paciente):
+            return False, {"error": "El paciente ya tiene un turno con el médico"}
+        # Se vuelve a revisar el horario con el cerrojo tomado: nunca se dan dos turnos iguales
+        if slot_ocupado(id_medico, fecha_turno, hora_turno) or turno_en_horario(id_medico, fecha_turno, hora_turno) is not None:
+            return False, {"error": "El medico ya tiene un turno a esa hora"}
+
+        nuevo_turno = Turno(
+            id_medico=id_medico,
+            id_paciente=id_paciente,
+            fecha_solicitud=fecha_turno,
+            hora_turno=hora_turno
+        )
         turnos.append(nuevo_turno)
-        exportar_a_csv()
-        return True, {"message": "Turno creado correctamente"}
-    else: 
-        return False, {"error": "El paciente ya tiene un turno con el médico"}
+        indexar_turno(nuevo_turno)
+        ocupar_slot(id_medico, fecha_turno, hora_turno)
+        registrar_alta(nuevo_turno)
+        incrementar_version("turnos")
+    _compactar_si_corresponde()
+    return True, {"message": "Turno creado correctamente"}
+
+#----------------------------------------------------------------------------------------------
+
+# Función para crear varios turnos juntos; recibe tuplas (id_medico, id_paciente, fecha, hora)
+# y devuelve un (creado, mensaje) por turno, como crear_turno. Se persiste con una sola escritura.
+@delegable
+def crear_turnos_en_lote(solicitudes):
+    resultados = []
+    nuevos_turnos = []
+    with escritura("turnos"):
+        for id_medico, id_paciente, fecha_turno, hora_turno in solicitudes:
+            fecha_turno, hora_turno = normalizar_fecha(fecha_turno), normalizar_hora(hora_turno)
+            if turnos_de_medico_paciente(id_medico, id_paciente):
+                resultados.append((False, {"error": "El paciente ya tiene un turno con el médico"}))
+                continue
+            if slot_ocupado(id_medico, fecha_turno, hora_turno) or turno_en_horario(id_medico, fecha_turno, hora_turno) is not None:
+                resultados.append((False, {"error": "El medico ya tiene un turno a esa hora"}))
+                continue
+            nuevo_turno = Turno(
+                id_medico=id_medico,
+                id_paciente=id_paciente,
+                fecha_solicitud=fecha_turno,
+                hora_turno=hora_turno
+            )
+            turnos.append(nuevo_turno)
+            indexar_turno(nuevo_turno)
+            ocupar_slot(id_medico, fecha_turno, hora_turno)
+            nuevos_turnos.append(nuevo_turno)
+            resultados.append((True, {"message": "Turno creado correctamente"}))
+
+        if nuevos_turnos:
+            registrar_altas(nuevos_turnos)
+            incrementar_version("turnos")
+    if nuevos_turnos:
+        _compactar_si_corresponde()
+    return resultados
 
 #----------------------------------------------------------------------------------------------
        
 # Función para obtener los turnos de un paciente por su ID
+@delegable
 def obtener_turno_por_paciente(id_paciente):
-    turnos_paciente = []
-    for turno in turnos:
-        if turno["id_paciente"] == id_paciente:
-            turnos_paciente.append(turno)
-    return turnos_paciente
+    return list(turnos_de_paciente(id_paciente))
 
 #----------------------------------------------------------------------------------------------
 
+# Indica si el médico ya tiene un turno en ese horario de 15 minutos; se responde con la máscara de la fecha
+@delegable
 def obtener_turno_dado(id_medico, hora_turno, fecha_turno):
-    for turno in turnos:
-        if turno["id_medico"] == id_medico and turno["hora_turno"] == hora_turno and turno["fecha_solicitud"] == fecha_turno:
-            return True
-    return False
+    return slot_ocupado(id_medico, fecha_turno, hora_turno)
 
 #----------------------------------------------------------------------------------------------
 
+@delegable
 def obtener_paciente_turno(id_medico, id_paciente, hora_turno, fecha_turno):
-    hoy = datetime.now()
-    hora_actual = hoy.strftime("%H:%M")
-
-    for turno in turnos:
-        # Convertir las cadenas a objetos datetime
-        fecha_solicitud_dt = datetime.strptime(turno["fecha_solicitud"], "%d-%m-%Y")
-        hora_turno_dt = datetime.strptime(turno["hora_turno"], "%H:%M")
-
-        # Comparar las fechas y horas
-        if (
-            turno["id_medico"] == id_medico
-            and turno["id_paciente"] == id_paciente
-            and (fecha_solicitud_dt.date() > hoy.date() or hora_turno_dt.time() > hoy.time())
-        ):
+    ahora = minutos_actuales()
+
+    # Solo se revisan los turnos del paciente con ese médico, con el inicio ya calculado
+    for turno in turnos_de_medico_paciente(id_medico, id_paciente):
+        if inicio_de_turno(turno) > ahora:
             return turno
 
     return None
 
 
+
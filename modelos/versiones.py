@@ -0,0 +1,43 @@
+# -----------------------------------------------------------------
+# Módulo de versiones de las colecciones
+# -----------------------------------------------------------------
+# Cada colección (medicos, pacientes, agenda, turnos) tiene un número de
+# versión que solo crece: las funciones que la modifican lo incrementan.
+# Los controladores lo usan para armar ETags y responder 304 cuando el
+# cliente ya tiene los datos actuales. Como las versiones en memoria
+# vuelven a cero al reiniciar, el ETag incluye además un token del proceso.
+
+from modelos.repositorio import delegable
+import os
+import threading
+import uuid
+
+# Variables globales que usaremos en este módulo
+versiones = {"medicos": 0, "pacientes": 0, "agenda": 0, "turnos": 0}
+token_proceso = uuid.uuid4().hex[:12]  # Cambia en cada arranque del servidor y en cada fork
+cerrojo_versiones = threading.Lock()
+
+#----------------------------------------------------------------------------------------------
+
+# Incrementa la versión de una colección; se llama después de cada modificación
+def incrementar_version(nombre):
+    with cerrojo_versiones:
+        versiones[nombre] += 1
+
+#----------------------------------------------------------------------------------------------
+
+# Obtiene la versión actual de una colección
+@delegable
+def obtener_version(nombre):
+    return versiones[nombre]
+
+#----------------------------------------------------------------------------------------------
+
+# Genera un token nuevo. Un proceso hijo de un fork no puede compartir el token del
+# padre: sus versiones avanzan por separado y dos procesos darían el mismo ETag a datos distintos
+def renovar_token_proceso():
+    global token_proceso
+    token_proceso = uuid.uuid4().hex[:12]
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=renovar_token_proceso)
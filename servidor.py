@@ -0,0 +1,120 @@
+# -----------------------------------------------------------------
+# Punto de entrada para producción con varios procesos (workers)
+# -----------------------------------------------------------------
+# El proceso padre carga todos los datos una sola vez, congela los objetos
+# para el recolector de basura y recién entonces hace fork de los workers.
+# Los workers comparten con el padre las páginas de memoria de los datos
+# (copy-on-write) mientras no las modifiquen, y arrancan sin volver a leer
+# los CSV. Todos atienden el mismo socket, abierto antes del fork. Como cada
+# worker puede escribir, se usa el modo multiproceso (API_MULTIPROCESO).
+#
+# Uso: python servidor.py   (API_HOST, API_PUERTO y API_WORKERS configuran el servidor)
+# Necesita os.fork: en Windows atiende un solo proceso.
+
+import gc
+
+# Sin recolecciones durante la carga: los objetos quedan juntos en memoria
+# y no se tocan sus encabezados antes de congelarlos
+gc.disable()
+
+import os
+import signal
+import sys
+from werkzeug.serving import make_server
+
+os.environ.setdefault("API_MULTIPROCESO", "1")
+
+from app import app
+from modelos.persistencia import volcar_todo
+from modelos.bitacora_turnos import cerrar_bitacora
+
+# Variables globales que usaremos en este módulo
+host = os.environ.get("API_HOST", "127.0.0.1")
+puerto = int(os.environ.get("API_PUERTO", 5000))
+cantidad_workers = int(os.environ.get("API_WORKERS", os.cpu_count() or 1))
+
+workers = set()     # PIDs de los workers vivos
+terminando = False
+
+#----------------------------------------------------------------------------------------------
+
+# Atiende solicitudes en un worker hasta recibir SIGTERM o SIGINT; nunca vuelve
+def servir_worker(servidor):
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    gc.enable()
+    codigo = 0
+    try:
+        servidor.serve_forever()
+    except (SystemExit, KeyboardInterrupt):
+        pass
+    except Exception as e:
+        print(f"Error en el worker {os.getpid()}: {e}")
+        codigo = 1
+    finally:
+        volcar_todo()
+        cerrar_bitacora()
+    # Sin pasar por el código del padre que quedó en la pila del fork
+    os._exit(codigo)
+
+#----------------------------------------------------------------------------------------------
+
+# Hace fork de un worker y devuelve su PID
+def iniciar_worker(servidor):
+    pid = os.fork()
+    if pid == 0:
+        servir_worker(servidor)
+    workers.add(pid)
+    return pid
+
+#----------------------------------------------------------------------------------------------
+
+# Pide a todos los workers que terminen
+def detener_workers(signum, frame):
+    global terminando
+    terminando = True
+    for pid in list(workers):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+#----------------------------------------------------------------------------------------------
+
+# Abre el socket, congela los datos cargados, inicia los workers y reemplaza los que terminen
+def main():
+    servidor = make_server(host, puerto, app, threaded=True)
+    print(f"Atendiendo en http://{host}:{puerto} con {cantidad_workers} workers")
+
+    if not hasattr(os, "fork"):
+        gc.enable()
+        servidor.serve_forever()
+        return
+
+    # Cada worker abre su propia bitácora; el padre no comparte el archivo abierto
+    cerrar_bitacora()
+    # Los objetos cargados pasan a la generación permanente: el recolector de los
+    # workers no los recorre y no ensucia sus páginas compartidas
+    gc.collect()
+    gc.freeze()
+
+    signal.signal(signal.SIGTERM, detener_workers)
+    signal.signal(signal.SIGINT, detener_workers)
+    for _ in range(cantidad_workers):
+        iniciar_worker(servidor)
+
+    while workers:
+        try:
+            pid, estado = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not terminando:
+            print(f"El worker {pid} terminó (estado {estado}), iniciando otro")
+            iniciar_worker(servidor)
+    servidor.server_close()
+
+if __name__ == '__main__':
+    main()